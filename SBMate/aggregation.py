@@ -0,0 +1,206 @@
+# aggregation.py
+"""
+Vectorized aggregation of metrics.
+Outcomes of entities are collected in a flat table
+(one row per entity, one row per entity x ontology
+for the specificity of consistent entities), and
+coverage, consistency and specificity of all models
+in the table are computed with grouped array operations.
+Results are the same as MetricCalculator, including
+rounding: grouped sums follow the summation of np.mean.
+
+Example
+-------
+table = EntityTable()
+table.addModel('BIOMD0000000012.xml', annotations, context)
+records = aggregate(table)
+"""
+
+from SBMate import context as mctx
+from SBMate import instrumentation as ins
+
+# metrics of each model, in column order
+METRIC_NAMES = ['annotatable_elements', 'annotated_elements', 'coverage',
+                'consistent_elements', 'consistency', 'specificity']
+# ontology codes of the entity x ontology rows
+ONTOLOGIES = list(mctx.ANALYZER_DICT.keys())
+ONT_TO_CODE = {one_ont: idx for idx, one_ont in enumerate(ONTOLOGIES)}
+
+
+class EntityTable(object):
+  """
+  Flat table of entity outcomes of one or more models.
+
+  Attributes
+  ----------
+  model_names: str-list
+      Name of each model, in order.
+  num_entities: int-list
+      Number of annotatable entities of each model.
+  entities: str-list
+      Entity ids, grouped by model.
+  annotated: bool-list
+      Whether each entity is annotated.
+  consistent: bool-list
+      Whether each entity is consistent.
+  term_entity: int-list
+      Position (in entities) of the entity of
+      each entity x ontology row; non-decreasing.
+  term_ontology: int-list
+      Ontology code (see ONTOLOGIES) of each row.
+  term_specificity: float-list
+      Specificity of each row.
+
+  Methods
+  -------
+  addModel (model_name, annotations, context)
+      Add the entities of a model.
+  extend (other)
+      Add the models of another table.
+  """
+
+  def __init__(self):
+    self.model_names = []
+    self.num_entities = []
+    self.entities = []
+    self.annotated = []
+    self.consistent = []
+    self.term_entity = []
+    self.term_ontology = []
+    self.term_specificity = []
+
+  def __len__(self):
+    return len(self.model_names)
+
+  def addModel(self, model_name, annotations, context):
+    """
+    Score the entities of a model and add their outcomes.
+    Entities are checked in the same order, and
+    specificity is computed for the same entities, as
+    MetricCalculator.
+
+    Parameters
+    ----------
+    model_name: str
+    annotations: sbml_annotation.SBMLAnnotation
+    context: context.ModelContext
+        Context of annotations.
+    """
+    offset = len(self.entities)
+    annotated_entities = set(context.annotated_entities)
+    consistent_positions = []
+    for idx, one_entity in enumerate(annotations.annotations):
+      is_annotated = one_entity in annotated_entities
+      is_consistent = is_annotated and context.isConsistent(one_entity)
+      self.entities.append(one_entity)
+      self.annotated.append(is_annotated)
+      self.consistent.append(is_consistent)
+      if is_consistent:
+        consistent_positions.append(offset + idx)
+    if consistent_positions:
+      with ins.stage('specificity'):
+        for one_position in consistent_positions:
+          for one_analyzer in context.getAnalyzers(self.entities[one_position]):
+            self.term_entity.append(one_position)
+            self.term_ontology.append(ONT_TO_CODE[one_analyzer.ontology])
+            self.term_specificity.append(one_analyzer.getSpecificity(one_analyzer.term_id))
+    self.model_names.append(model_name)
+    self.num_entities.append(len(self.entities) - offset)
+
+  def extend(self, other):
+    """
+    Add the models of another table,
+    e.g., scored in another process.
+
+    Parameters
+    ----------
+    other: EntityTable
+    """
+    offset = len(self.entities)
+    self.model_names.extend(other.model_names)
+    self.num_entities.extend(other.num_entities)
+    self.entities.extend(other.entities)
+    self.annotated.extend(other.annotated)
+    self.consistent.extend(other.consistent)
+    self.term_entity.extend([offset + one_position for one_position in other.term_entity])
+    self.term_ontology.extend(other.term_ontology)
+    self.term_specificity.extend(other.term_specificity)
+
+
+def getGroupMeans(values, groups, num_groups):
+  """
+  Means of values by group, summed as np.mean does,
+  so that results are identical to np.mean of each group.
+  Groups of the same size are reduced together,
+  as rows of one matrix.
+
+  Parameters
+  ----------
+  values: numpy.ndarray
+      Float values, sorted by group.
+  groups: numpy.ndarray
+      Group of each value, non-decreasing.
+  num_groups: int
+
+  Returns
+  -------
+  '': numpy.ndarray
+      Mean of each group; NaN for empty groups.
+  """
+  import numpy as np
+  sizes = np.bincount(groups, minlength=num_groups)
+  starts = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.intp)
+  res = np.full(num_groups, np.nan)
+  for one_size in np.unique(sizes[sizes > 0]):
+    group_idx = np.flatnonzero(sizes == one_size)
+    value_idx = starts[group_idx][:, None] + np.arange(one_size)
+    res[group_idx] = np.add.reduce(values[value_idx], axis=1) / one_size
+  return res
+
+
+def aggregate(table):
+  """
+  Compute the metrics of all models of a table.
+
+  Parameters
+  ----------
+  table: EntityTable
+
+  Returns
+  -------
+  '': dict-list
+      One dictionary of {metric name: value} per model,
+      as MetricCalculator.calculateRecord.
+  """
+  import numpy as np
+  num_models = len(table)
+  num_entities = np.asarray(table.num_entities, dtype=np.intp)
+  if not num_entities.all():
+    raise ValueError("Model has no annotatable entity: %s."
+                     % table.model_names[int(np.argmin(num_entities))])
+  entity_models = np.repeat(np.arange(num_models), num_entities)
+  annotated = np.asarray(table.annotated, dtype=bool)
+  consistent = np.asarray(table.consistent, dtype=bool)
+  num_annotated = np.bincount(entity_models[annotated], minlength=num_models)
+  num_consistent = np.bincount(entity_models[consistent], minlength=num_models)
+  entity_specificity = getGroupMeans(np.asarray(table.term_specificity, dtype=float),
+                                     np.asarray(table.term_entity, dtype=np.intp),
+                                     len(table.entities))
+  consistent_positions = np.flatnonzero(consistent)
+  model_specificity = getGroupMeans(entity_specificity[consistent_positions],
+                                    entity_models[consistent_positions],
+                                    num_models)
+  coverage = np.round(num_annotated / num_entities, 2)
+  with np.errstate(divide='ignore', invalid='ignore'):
+    consistency = np.round(num_consistent / num_annotated, 2)
+  specificity = np.round(model_specificity, 2)
+  records = []
+  for idx in range(num_models):
+    records.append(dict(zip(METRIC_NAMES,
+                            [int(num_entities[idx]),
+                             int(num_annotated[idx]) if num_annotated[idx] else None,
+                             coverage[idx],
+                             int(num_consistent[idx]) if num_consistent[idx] else None,
+                             consistency[idx] if num_annotated[idx] else None,
+                             specificity[idx] if num_consistent[idx] else None])))
+  return records
@@ -0,0 +1,138 @@
+# analysis_memo.py
+"""
+Bounded LRU memo of analyzers.
+Entities carrying the same annotation
+(same object type, ontology, terms and qualifiers)
+share one analyzer, so consistency and specificity
+are computed once per annotation pattern.
+A memo can be shared by all models of a batch.
+"""
+
+import collections
+import threading
+from SBMate import instrumentation as ins
+
+
+class AnalysisMemo(object):
+  """
+  LRU memo of {(object_type, ontology, terms, qualifiers): analyzer}.
+
+  Attributes
+  ----------
+  max_size: int
+      Maximum number of analyzers kept.
+  hits: int
+      Number of lookups answered by the memo.
+  misses: int
+      Number of analyzers created.
+
+  Methods
+  -------
+  getAnalyzer (analyzer_class, term_id, ontology, object_type, qualifier_dict)
+      Get a memoized analyzer, or create one.
+  getStats ()
+      Get hit/miss statistics.
+  """
+
+  def __init__(self, max_size=100000):
+    """
+    Parameters
+    ----------
+    max_size: int
+        Maximum number of analyzers kept.
+    """
+    self.max_size = max_size
+    self.hits = 0
+    self.misses = 0
+    self._analyzers = collections.OrderedDict()
+    self._lock = threading.Lock()
+
+  def getKey(self, term_id, ontology, object_type, qualifier_dict):
+    """
+    Key of an analyzer.
+    Only qualifiers of the analyzed terms are used,
+    as they alone determine the specificity weights.
+    Terms are kept in order, so averaged scores
+    are identical to those of a new analyzer.
+
+    Parameters
+    ----------
+    term_id: str-list
+    ontology: str
+    object_type: libsbml.AutoProperty
+    qualifier_dict: dict
+        Dictionary of {term: qualifier}.
+
+    Returns
+    -------
+    '': tuple
+    """
+    if isinstance(term_id, str):
+      terms = (term_id,)
+    else:
+      terms = tuple(term_id)
+    qualifiers = tuple([qualifier_dict.get(one_term) for one_term in terms])
+    return (object_type, ontology, terms, qualifiers)
+
+  def getAnalyzer(self, analyzer_class, term_id, ontology,
+                  object_type, qualifier_dict):
+    """
+    Get the memoized analyzer of the annotation,
+    or create (and memoize) one.
+
+    Parameters
+    ----------
+    analyzer_class: class
+        DAGAnalyzer or NonDAGAnalyzer.
+    term_id: str-list
+    ontology: str
+    object_type: libsbml.AutoProperty
+    qualifier_dict: dict
+        Dictionary of {term: qualifier}.
+
+    Returns
+    -------
+    '': DAGAnalyzer/NonDAGAnalyzer
+    """
+    key = (analyzer_class,) + self.getKey(term_id, ontology, object_type, qualifier_dict)
+    with self._lock:
+      analyzer = self._analyzers.get(key)
+      if analyzer is not None:
+        self._analyzers.move_to_end(key)
+        self.hits += 1
+        ins.count(ins.MEMO_HITS)
+        return analyzer
+    analyzer = analyzer_class(term_id=term_id,
+                              ontology=ontology,
+                              object_type=object_type,
+                              qualifier_dict=qualifier_dict)
+    ins.count(ins.MEMO_MISSES)
+    with self._lock:
+      self.misses += 1
+      self._analyzers[key] = analyzer
+      if len(self._analyzers) > self.max_size:
+        self._analyzers.popitem(last=False)
+    return analyzer
+
+  def getStats(self):
+    """
+    Returns
+    -------
+    '': dict
+        Dictionary with keys 'hits', 'misses',
+        'size' and 'hit_rate' (None if no lookups).
+    """
+    num_lookups = self.hits + self.misses
+    return {'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._analyzers),
+            'hit_rate': self.hits/num_lookups if num_lookups else None}
+
+  def clear(self):
+    """
+    Remove all analyzers and reset statistics.
+    """
+    with self._lock:
+      self._analyzers.clear()
+      self.hits = 0
+      self.misses = 0
@@ -0,0 +1,109 @@
+# budget.py
+"""
+Wall-clock time budgets of remote lookups.
+A model budget can be nested in a batch budget;
+the one ending first applies.
+When a budget runs out, remaining UniProt/KEGG terms
+are left unresolved instead of being queried,
+and metrics are marked as provisional.
+"""
+
+import time
+
+# columns added to metrics rows scored with a budget
+PROVISIONAL = 'provisional'
+UNRESOLVED_TERMS = 'unresolved_terms'
+
+
+class TimeBudget(object):
+  """
+  Time budget ending at a fixed (wall-clock) time,
+  so it can be shared by worker processes.
+
+  Attributes
+  ----------
+  deadline: float/None
+      time.time() value when the budget ends;
+      None if not limited.
+  parent: TimeBudget/None
+      Enclosing budget, e.g., of the batch.
+
+  Methods
+  -------
+  getRemaining ()
+      Seconds left, or None if not limited.
+  isExpired ()
+      Check whether no time is left.
+  getChild (seconds)
+      Create a nested budget starting now.
+  """
+
+  def __init__(self, seconds=None, parent=None):
+    """
+    Parameters
+    ----------
+    seconds: float/None
+        Length of the budget from now; None if not limited.
+    parent: TimeBudget/None
+    """
+    if seconds is not None and seconds < 0:
+      raise ValueError("Budget should not be negative.")
+    self.deadline = None if seconds is None else time.time() + seconds
+    self.parent = parent
+
+  def getRemaining(self):
+    """
+    Returns
+    -------
+    '': float/None
+        Seconds left (0.0 if expired), or None if not limited.
+    """
+    remaining = [self.deadline - time.time()] if self.deadline is not None else []
+    if self.parent is not None:
+      parent_remaining = self.parent.getRemaining()
+      if parent_remaining is not None:
+        remaining.append(parent_remaining)
+    if not remaining:
+      return None
+    return max(0.0, min(remaining))
+
+  def isExpired(self):
+    """
+    Returns
+    -------
+    '': bool
+        True if no time is left.
+    """
+    return self.getRemaining() == 0.0
+
+  def getChild(self, seconds=None):
+    """
+    Parameters
+    ----------
+    seconds: float/None
+
+    Returns
+    -------
+    '': TimeBudget
+        Budget of seconds from now, within this budget.
+    """
+    return TimeBudget(seconds=seconds, parent=self)
+
+
+def isProvisional(row):
+  """
+  Check whether a metrics row was scored
+  with unresolved terms.
+
+  Parameters
+  ----------
+  row: dict
+      Metrics row, {'index', 'columns', 'data'}.
+
+  Returns
+  -------
+  '': bool
+  """
+  if PROVISIONAL not in row['columns']:
+    return False
+  return bool(row['data'][0][row['columns'].index(PROVISIONAL)])
@@ -0,0 +1,221 @@
+# checkpoint.py
+"""
+Checkpoints of long batch runs.
+Rows of finished models and the validation cache
+are written periodically, so a crashed run can be resumed
+without scoring the finished models again.
+The checkpoint is a JSON-lines log: each save appends
+the rows finished and the validation results added since
+the previous save, so its cost does not grow with the run.
+Rows are stored with the content hash of their model file
+and the resolver mode, and are not used on resume
+if the file has changed, or if they were scored offline
+and the resumed run is online.
+"""
+
+import itertools
+import json
+import os
+import time
+from SBMate import manifest as mf
+from SBMate import uniprot_kegg_analyzer as uka
+
+CHECKPOINT_FORMAT = 3
+
+
+class BatchCheckpoint(object):
+  """
+  Checkpoint of a batch run.
+
+  Attributes
+  ----------
+  path: str
+      Location of the checkpoint (JSON lines) file.
+  every: int
+      Number of finished models between two saves.
+  interval: float
+      Maximum seconds between two saves.
+  rows: dict
+      Dictionary of {absolute file path: metrics row}
+      of the finished models.
+  hashes: dict
+      Dictionary of {absolute file path: content hash}
+      of the finished models (see manifest.getFileHash).
+  offline: dict
+      Dictionary of {absolute file path: bool},
+      True if the model was scored offline
+      (see uka.NonDAGAnalyzer.offline).
+
+  Methods
+  -------
+  getRow (file_path, offline)
+      Get the row of a finished model, or None.
+  add (file_path, row)
+      Record a finished model; save if it is time to.
+  save ()
+      Append new rows and validation results to path.
+  """
+
+  def __init__(self, path, resume=False, every=10, interval=60.0):
+    """
+    Parameters
+    ----------
+    path: str
+        Location of the checkpoint file.
+    resume: bool
+        If True, load finished models and
+        validation cache from an existing checkpoint.
+        Otherwise, the checkpoint starts empty.
+    every: int
+        Number of finished models between two saves.
+    interval: float
+        Maximum seconds between two saves.
+    """
+    self.path = path
+    self.every = every
+    self.interval = interval
+    self.rows = dict()
+    self.hashes = dict()
+    self.offline = dict()
+    self._unsaved = []
+    self._last_save = time.time()
+    # the file is rewritten by the first save (not appended to)
+    self._rewrite = True
+    # validation results saved so far: (results dict, number of entries)
+    self._saved_cache = (None, 0)
+    if resume and os.path.isfile(path):
+      self._load()
+
+  def _load(self):
+    """
+    Load rows and validation results of path.
+    A partial last line (from a crash while saving)
+    is ignored; the first save then rewrites the file.
+    """
+    with open(self.path) as f:
+      lines = f.read().split('\n')
+    records = []
+    for one_line in lines:
+      try:
+        records.append(json.loads(one_line))
+      except ValueError:
+        continue
+    if not records or records[0].get('format') != CHECKPOINT_FORMAT:
+      return
+    for one_record in records[1:]:
+      if 'row' in one_record:
+        self.rows[one_record['file']] = one_record['row']
+        self.hashes[one_record['file']] = one_record['hash']
+        self.offline[one_record['file']] = one_record['offline']
+      else:
+        uka.VALIDATION_CACHE.results.update(one_record['validation_cache'])
+
+  def getKey(self, file_path):
+    """
+    Parameters
+    ----------
+    file_path: str
+
+    Returns
+    -------
+    '': str
+        Absolute path of the file.
+    """
+    return os.path.abspath(file_path)
+
+  def getRow(self, file_path, offline=False):
+    """
+    Parameters
+    ----------
+    file_path: str
+    offline: bool
+        Resolver mode of the run; rows scored
+        offline are not used by an online run.
+
+    Returns
+    -------
+    '': dict/None
+        Row of the model; None if it is not finished,
+        or if the file has changed since.
+    """
+    key = self.getKey(file_path)
+    row = self.rows.get(key)
+    if row is None:
+      return None
+    if self.offline[key] and not offline:
+      return None
+    if not os.path.isfile(file_path) or mf.getFileHash(file_path) != self.hashes[key]:
+      return None
+    return row
+
+  def add(self, file_path, row):
+    """
+    Record a finished model, scored with
+    the current resolver mode.
+    The checkpoint is saved after every
+    'every' models or 'interval' seconds.
+
+    Parameters
+    ----------
+    file_path: str
+    row: dict
+        Metrics row, {'index', 'columns', 'data'}.
+    """
+    key = self.getKey(file_path)
+    self.rows[key] = row
+    self.hashes[key] = mf.getFileHash(file_path)
+    self.offline[key] = uka.NonDAGAnalyzer.offline
+    self._unsaved.append(key)
+    if len(self._unsaved) >= self.every or \
+       time.time() - self._last_save >= self.interval:
+      self.save()
+
+  def _getNewResults(self):
+    """
+    Validation results added since the last save.
+
+    Returns
+    -------
+    '': dict
+    """
+    results = uka.VALIDATION_CACHE.results
+    saved_results, num_saved = self._saved_cache
+    if saved_results is not results or num_saved > len(results):
+      num_saved = 0
+    self._saved_cache = (results, len(results))
+    return dict(itertools.islice(results.items(), num_saved, None))
+
+  def _getRecordLine(self, key):
+    return json.dumps({'file': key, 'hash': self.hashes[key],
+                       'offline': self.offline[key], 'row': self.rows[key]},
+                      default=mf.toJsonValue) + '\n'
+
+  def save(self):
+    """
+    Append the rows finished and the validation results
+    added since the last save. The first save writes
+    the whole checkpoint atomically instead.
+    """
+    if self._rewrite:
+      self._saved_cache = (None, 0)
+      lines = [json.dumps({'format': CHECKPOINT_FORMAT}) + '\n']
+      lines = lines + [self._getRecordLine(key) for key in self.rows]
+      mode = 'w'
+      path = '%s.%d.tmp' % (self.path, os.getpid())
+      os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+    else:
+      lines = [self._getRecordLine(key) for key in dict.fromkeys(self._unsaved)]
+      mode = 'a'
+      path = self.path
+    new_results = self._getNewResults()
+    if new_results:
+      lines.append(json.dumps({'validation_cache': new_results}) + '\n')
+    with open(path, mode) as f:
+      f.write(''.join(lines))
+      f.flush()
+      os.fsync(f.fileno())
+    if self._rewrite:
+      os.replace(path, self.path)
+      self._rewrite = False
+    self._unsaved = []
+    self._last_save = time.time()
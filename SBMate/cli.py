@@ -0,0 +1,526 @@
+# cli.py
+"""
+Command-line entry point (sbmate).
+Heavy modules (pandas, libsbml, ontology graphs)
+are imported only after the arguments are parsed,
+so that the command starts fast.
+
+Example
+-------
+sbmate models/ extra/*.xml --workers 4 --format csv --output metrics.csv
+sbmate models/ --shard 0/2 --shard-output shard0.json
+sbmate merge shard0.json shard1.json --format csv
+sbmate serve --port 8350 --cache lookups.json
+sbmate slice models/ --output corpus_slice.pickle
+sbmate models/ --ontology-slice corpus_slice.pickle
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+OUTPUT_FORMATS = ['report', 'csv', 'jsonl', 'parquet']
+# output of getMetrics for each format, if not 'table'
+FORMAT_TO_OUTPUT = {'report': 'report', 'parquet': 'arrow'}
+MODEL_FILE_EXTENSION = '.xml'
+
+
+def getModelFiles(inputs):
+  """
+  Expand files, directories and glob patterns
+  into a list of model files.
+  Directories are searched recursively for .xml files.
+  Duplicates are removed, keeping the first occurrence.
+
+  Parameters
+  ----------
+  inputs: str-list
+      Files, directories or glob patterns.
+
+  Returns
+  -------
+  file_list: str-list
+  """
+  file_list = []
+  seen = set()
+  for one_input in inputs:
+    if os.path.isdir(one_input):
+      matches = sorted(glob.glob(os.path.join(one_input, '**', '*' + MODEL_FILE_EXTENSION),
+                                 recursive=True))
+    elif os.path.isfile(one_input):
+      matches = [one_input]
+    else:
+      matches = sorted(one_file for one_file in glob.glob(one_input, recursive=True) \
+                       if os.path.isfile(one_file))
+    for one_file in matches:
+      if one_file not in seen:
+        seen.add(one_file)
+        file_list.append(one_file)
+  return file_list
+
+
+def parseShard(value):
+  """
+  Parse a shard argument 'I/N'.
+
+  Parameters
+  ----------
+  value: str
+
+  Returns
+  -------
+  '': (int, int)
+      (shard index, number of shards)
+  """
+  try:
+    shard_index, num_shards = [int(v) for v in value.split('/')]
+  except ValueError:
+    raise argparse.ArgumentTypeError("Shard should be I/N, e.g., 0/4.")
+  if num_shards < 1 or not 0 <= shard_index < num_shards:
+    raise argparse.ArgumentTypeError("Shard index should be in [0, N).")
+  return shard_index, num_shards
+
+
+def parseRate(value):
+  """
+  Parse a rate argument 'HOST=RATE'.
+
+  Parameters
+  ----------
+  value: str
+
+  Returns
+  -------
+  '': (str, float)
+  """
+  host, sep, rate = value.partition('=')
+  try:
+    rate = float(rate)
+  except ValueError:
+    sep = ''
+  if not sep or not host or rate <= 0:
+    raise argparse.ArgumentTypeError("Rate should be HOST=RATE (positive), e.g., www.genome.jp=3.")
+  return host, rate
+
+
+def getParser():
+  """
+  Returns
+  -------
+  parser: argparse.ArgumentParser
+  """
+  parser = argparse.ArgumentParser(prog='sbmate',
+      description='Annotation quality metrics calculator (coverage, consistency, specificity).')
+  parser.add_argument('inputs', nargs='+',
+      help='Model files (.xml), directories or glob patterns.')
+  parser.add_argument('-w', '--workers', type=int, default=1,
+      help='Number of worker processes (default: 1).')
+  parser.add_argument('--pipeline', action='store_true',
+      help='Overlap parsing (in --workers processes) with network validation.')
+  parser.add_argument('--validation-workers', type=int, default=8,
+      help='Number of threads querying UniProt/KEGG with --pipeline (default: 8).')
+  parser.add_argument('--queue-size', type=int, default=4,
+      help='Capacity of the queues between pipeline stages (default: 4).')
+  parser.add_argument('--memo-size', type=int, default=100000,
+      help='Size of the memo of analyses shared across models; 0 disables it (default: 100000).')
+  parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS, default='report',
+      help='Output format (default: report).')
+  parser.add_argument('-o', '--output', default=None,
+      help='Output file (default: standard output; required for parquet).')
+  parser.add_argument('--cache', default=None,
+      help='Validation cache file of UniProt/KEGG lookups; loaded and updated.')
+  parser.add_argument('--offline', action='store_true',
+      help='Do not query UniProt/KEGG; well-formed terms missing from the cache are assumed valid. '
+           'Rows stored in --manifest/--checkpoint are marked, and scored again by an online run.')
+  parser.add_argument('--rate-limit', type=parseRate, action='append', default=[],
+      metavar='HOST=RATE',
+      help='Requests per second to a host, shared by all sbmate processes of the machine '
+           '(defaults: www.uniprot.org=10, www.genome.jp=3).')
+  parser.add_argument('--no-rate-limit', action='store_true',
+      help='Do not limit the rate of UniProt/KEGG queries.')
+  parser.add_argument('--deadline', type=float, default=None,
+      help='Time budget (seconds) of UniProt/KEGG queries of the whole run; '
+           'terms not checked in time are unresolved and metrics provisional.')
+  parser.add_argument('--model-deadline', type=float, default=None,
+      help='Time budget (seconds) of UniProt/KEGG queries of each model.')
+  parser.add_argument('--manifest', default=None,
+      help='Results manifest file for incremental scoring.')
+  parser.add_argument('--checkpoint', default=None,
+      help='Checkpoint file, saved periodically during the run.')
+  parser.add_argument('--resume', action='store_true',
+      help='Skip models finished in the run that wrote --checkpoint.')
+  parser.add_argument('--shard', type=parseShard, default=None,
+      help='Score only shard I of N (I/N), selected by hash of the model path.')
+  parser.add_argument('--shard-output', default=None,
+      help='Partial result file of --shard, to be combined by "sbmate merge".')
+  parser.add_argument('--timing', action='store_true',
+      help='Print wall time and throughput to standard error.')
+  parser.add_argument('--instrument', action='store_true',
+      help='Print stage times, counters and HTTP latency histogram to standard error.')
+  parser.add_argument('--instrument-columns', action='store_true',
+      help='Add stage times and counters of each model as columns.')
+  parser.add_argument('--memory-profile', action='store_true',
+      help='Trace memory; add allocations of stages and peak memory '
+           'of each model as columns (implies --instrument-columns).')
+  parser.add_argument('--profile', default=None,
+      help='Write cProfile statistics of the run to this file.')
+  parser.add_argument('--sample-size', type=int, default=None,
+      help='Estimate consistency and specificity from a sample of this many '
+           'annotated entities of each model (coverage stays exact).')
+  parser.add_argument('--error-bound', type=float, default=None,
+      help='Estimate consistency and specificity from a sample large enough for '
+           'this half-width of the confidence interval of consistency.')
+  parser.add_argument('--confidence', type=float, default=0.95,
+      help='Confidence level of the intervals of --sample-size/--error-bound '
+           '(default: 0.95).')
+  parser.add_argument('--sample-seed', type=int, default=0,
+      help='Seed of the samples (default: 0).')
+  parser.add_argument('--ontology-slice', default=None,
+      help='Ontology slice file (see "sbmate slice") used instead of the full '
+           'GO/SBO/ChEBI graphs.')
+  return parser
+
+
+def getMergeParser():
+  """
+  Returns
+  -------
+  parser: argparse.ArgumentParser
+  """
+  parser = argparse.ArgumentParser(prog='sbmate merge',
+      description='Combine partial result files of sbmate --shard.')
+  parser.add_argument('shard_files', nargs='+',
+      help='Partial result files (--shard-output).')
+  parser.add_argument('-f', '--format', choices=OUTPUT_FORMATS, default='report',
+      help='Output format (default: report).')
+  parser.add_argument('-o', '--output', default=None,
+      help='Output file (default: standard output; required for parquet).')
+  return parser
+
+
+def mergeMain(argv):
+  """
+  Run sbmate merge.
+
+  Parameters
+  ----------
+  argv: str-list
+
+  Returns
+  -------
+  '': int
+      Exit status; 1 if shards are missing or duplicated.
+  """
+  parser = getMergeParser()
+  args = parser.parse_args(argv)
+  if args.format == 'parquet' and args.output is None:
+    parser.error("--output is required for parquet format.")
+  from SBMate import sbmate
+  output = FORMAT_TO_OUTPUT.get(args.format, 'table')
+  try:
+    res = sbmate.AnnotationMetrics.mergeShards(args.shard_files, output=output)
+  except ValueError as e:
+    sys.stderr.write("sbmate merge: %s\n" % e)
+    return 1
+  writeOutput(res, args.format, args.output)
+  return 0
+
+
+def getServeParser():
+  """
+  Returns
+  -------
+  parser: argparse.ArgumentParser
+  """
+  parser = argparse.ArgumentParser(prog='sbmate serve',
+      description='Long-running scoring server keeping ontology graphs and caches warm.')
+  parser.add_argument('--host', default='127.0.0.1',
+      help='Address to listen on (default: 127.0.0.1).')
+  parser.add_argument('--port', type=int, default=8350,
+      help='Port to listen on (default: 8350).')
+  parser.add_argument('--validation-workers', type=int, default=8,
+      help='Number of threads querying UniProt/KEGG (default: 8).')
+  parser.add_argument('--memo-size', type=int, default=100000,
+      help='Size of the memo of analyses shared across requests; 0 disables it '
+           '(default: 100000).')
+  parser.add_argument('--cache', default=None,
+      help='Validation cache file of UniProt/KEGG lookups; loaded, and saved on exit.')
+  parser.add_argument('--offline', action='store_true',
+      help='Do not query UniProt/KEGG; well-formed terms missing from the cache are assumed valid.')
+  parser.add_argument('--rate-limit', type=parseRate, action='append', default=[],
+      metavar='HOST=RATE',
+      help='Requests per second to a host, shared by all sbmate processes of the machine.')
+  parser.add_argument('--no-rate-limit', action='store_true',
+      help='Do not limit the rate of requests.')
+  parser.add_argument('--ontology-slice', default=None,
+      help='Ontology slice file (see "sbmate slice") used instead of the full '
+           'GO/SBO/ChEBI graphs.')
+  return parser
+
+
+def getSliceParser():
+  """
+  Returns
+  -------
+  parser: argparse.ArgumentParser
+  """
+  parser = argparse.ArgumentParser(prog='sbmate slice',
+      description='Write the slice of the ontology graphs used by a corpus.')
+  parser.add_argument('inputs', nargs='+',
+      help='Model files (.xml), directories or glob patterns.')
+  parser.add_argument('-o', '--output', required=True,
+      help='Ontology slice file.')
+  return parser
+
+
+def sliceMain(argv):
+  """
+  Run sbmate slice.
+
+  Parameters
+  ----------
+  argv: str-list
+
+  Returns
+  -------
+  '': int
+      Exit status.
+  """
+  parser = getSliceParser()
+  args = parser.parse_args(argv)
+  file_list = getModelFiles(args.inputs)
+  if not file_list:
+    parser.error("No model files found.")
+  from SBMate import ontology_slice as osl
+  sizes = osl.makeSlice(file_list, args.output)
+  for one_ont, (num_terms, num_nodes) in sizes.items():
+    sys.stderr.write("%s: %d terms, %d nodes\n" % (one_ont, num_terms, num_nodes))
+  return 0
+
+
+def setSlice(parser, args):
+  """
+  Use the ontology slice of --ontology-slice, if given;
+  exits with an error if it cannot be used.
+
+  Parameters
+  ----------
+  parser: argparse.ArgumentParser
+  args: argparse.Namespace
+  """
+  if args.ontology_slice is None:
+    return
+  from SBMate import dag_analyzer as da
+  da.setSlice(args.ontology_slice)
+  try:
+    # loads the slice, to fail before scoring
+    da.getGraph('sbo')
+  except (OSError, ValueError) as e:
+    da.setSlice(None)
+    parser.error(str(e))
+
+
+def setResolver(args):
+  """
+  Apply the resolver options (--offline, --cache,
+  --rate-limit, --no-rate-limit) to uniprot_kegg_analyzer.
+
+  Parameters
+  ----------
+  args: argparse.Namespace
+  """
+  from SBMate import uniprot_kegg_analyzer as uka
+  uka.NonDAGAnalyzer.offline = args.offline
+  if args.cache is not None:
+    uka.VALIDATION_CACHE.load(args.cache)
+  if not args.no_rate_limit:
+    from SBMate import rate_limiter as rl
+    rates = dict(rl.DEFAULT_RATES)
+    rates.update(dict(args.rate_limit))
+    uka.RATE_LIMITER = rl.RateLimiter(rates=rates)
+
+
+def serveMain(argv):
+  """
+  Run sbmate serve, until interrupted.
+
+  Parameters
+  ----------
+  argv: str-list
+
+  Returns
+  -------
+  '': int
+      Exit status.
+  """
+  parser = getServeParser()
+  args = parser.parse_args(argv)
+  from SBMate import server as sv
+  from SBMate import uniprot_kegg_analyzer as uka
+  setResolver(args)
+  setSlice(parser, args)
+  service = sv.ScoringService(memo_size=args.memo_size,
+                              validation_workers=args.validation_workers)
+  httpd = sv.ScoringServer(service, host=args.host, port=args.port)
+  sys.stderr.write("sbmate serve: listening on %s\n" % httpd.url)
+  try:
+    httpd.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    httpd.server_close()
+    service.shutdown()
+    if args.cache is not None:
+      uka.VALIDATION_CACHE.save(args.cache)
+  return 0
+
+
+def writeOutput(res, output_format, output_file=None):
+  """
+  Write the result of getMetrics.
+
+  Parameters
+  ----------
+  res: str/pandas.DataFrame/pyarrow.Table
+      Report (output_format 'report'),
+      Arrow table ('parquet') or table.
+  output_format: str
+      One of OUTPUT_FORMATS.
+  output_file: str/None
+      If None, written to standard output.
+  """
+  if output_format == 'parquet':
+    from SBMate import columnar as cl
+    cl.writeParquet(res, output_file)
+    return
+  if output_format == 'report':
+    text = res
+  elif output_format == 'csv':
+    text = res.to_csv()
+  elif output_format == 'jsonl':
+    table = res.rename_axis('model').reset_index()
+    text = table.to_json(orient='records', lines=True)
+    if not text.endswith('\n'):
+      text = text + '\n'
+  if output_file is None:
+    sys.stdout.write(text)
+  else:
+    with open(output_file, 'w') as f:
+      f.write(text)
+
+
+def main(argv=None):
+  """
+  Run sbmate.
+
+  Parameters
+  ----------
+  argv: str-list/None
+      Arguments; if None, sys.argv[1:].
+
+  Returns
+  -------
+  '': int
+      Exit status.
+  """
+  if argv is None:
+    argv = sys.argv[1:]
+  if argv and argv[0] == 'merge':
+    return mergeMain(argv[1:])
+  if argv and argv[0] == 'serve':
+    return serveMain(argv[1:])
+  if argv and argv[0] == 'slice':
+    return sliceMain(argv[1:])
+  parser = getParser()
+  args = parser.parse_args(argv)
+  if args.format == 'parquet' and args.output is None:
+    parser.error("--output is required for parquet format.")
+  if args.resume and args.checkpoint is None:
+    parser.error("--resume requires --checkpoint.")
+  if args.shard_output is not None and args.shard is None:
+    parser.error("--shard-output requires --shard.")
+  sampling = None
+  if args.sample_size is not None or args.error_bound is not None:
+    if args.pipeline:
+      parser.error("--sample-size/--error-bound are not supported with --pipeline.")
+    from SBMate import sampling as sp
+    try:
+      sampling = sp.SamplingPlan(sample_size=args.sample_size,
+                                 error_bound=args.error_bound,
+                                 confidence=args.confidence,
+                                 seed=args.sample_seed)
+    except ValueError as e:
+      parser.error(str(e))
+  file_list = getModelFiles(args.inputs)
+  if not file_list:
+    parser.error("No model files found.")
+  # deferred, so that argument errors and --help return immediately
+  from SBMate import sbmate
+  from SBMate import uniprot_kegg_analyzer as uka
+  setResolver(args)
+  setSlice(parser, args)
+  output = FORMAT_TO_OUTPUT.get(args.format, 'table')
+  memo = None
+  if args.memo_size > 0:
+    from SBMate import analysis_memo as am
+    memo = am.AnalysisMemo(max_size=args.memo_size)
+  pipeline = None
+  if args.pipeline:
+    from SBMate import pipeline as pl
+    pipeline = pl.ScoringPipeline(parse_workers=args.workers,
+                                  validation_workers=args.validation_workers,
+                                  queue_size=args.queue_size)
+  collector = None
+  if args.instrument or args.instrument_columns or args.memory_profile:
+    from SBMate import instrumentation as ins
+    collector = ins.Collector(columns=args.instrument_columns or args.memory_profile,
+                              memory=args.memory_profile)
+  profiler = None
+  if args.profile is not None:
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+  start = time.perf_counter()
+  res = sbmate.AnnotationMetrics.getMetrics(file_list,
+                                            output=output,
+                                            manifest=args.manifest,
+                                            checkpoint=args.checkpoint,
+                                            resume=args.resume,
+                                            workers=args.workers,
+                                            pipeline=pipeline,
+                                            shard=args.shard,
+                                            shard_output=args.shard_output,
+                                            memo=memo,
+                                            deadline=args.deadline,
+                                            model_deadline=args.model_deadline,
+                                            collector=collector,
+                                            sampling=sampling)
+  elapsed = time.perf_counter() - start
+  if profiler is not None:
+    profiler.disable()
+    profiler.dump_stats(args.profile)
+  if args.cache is not None:
+    uka.VALIDATION_CACHE.save(args.cache)
+  writeOutput(res, args.format, args.output)
+  if args.timing:
+    num_scored = len(file_list)
+    if args.shard is not None:
+      from SBMate import sharding as sh
+      num_scored = len(sh.selectShard(file_list, args.shard[0], args.shard[1]))
+    sys.stderr.write("Scored %d models in %.3f s (%.2f models/s)\n"
+                     % (num_scored, elapsed, num_scored/elapsed))
+    if pipeline is not None:
+      for one_stats in pipeline.stats.values():
+        sys.stderr.write("%s\n" % one_stats)
+    if memo is not None and args.workers <= 1:
+      sys.stderr.write("analysis memo: %s\n" % memo.getStats())
+  if args.instrument:
+    import json
+    sys.stderr.write("%s\n" % json.dumps(collector.getSnapshot(), indent=2))
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
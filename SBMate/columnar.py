@@ -0,0 +1,318 @@
+# columnar.py
+"""
+Columnar output of metrics: Arrow tables and Parquet files
+(requires pyarrow, which is imported when first needed).
+Tables are built from metrics rows, not from a DataFrame,
+so missing values stay null (not NaN or 0) and
+integer columns keep their type.
+The schema is stable: columns have fixed types,
+whatever the values of a batch, and model names
+are dictionary-encoded.
+ParquetMetricsWriter writes one row group per batch,
+e.g., while a corpus is being scored.
+
+Example
+-------
+with ParquetMetricsWriter('metrics.parquet') as writer:
+  writer.write(rows)
+readMetrics('metrics.parquet', columns=['model', 'coverage'])
+"""
+
+from SBMate import budget as bd
+from SBMate import sampling as sp
+
+# column of model names (index of metrics rows)
+MODEL_COLUMN = 'model'
+# types of the columns of MetricCalculator, budget, sampling and
+# instrumentation; names are those of pyarrow type factories
+COLUMN_TYPES = {'annotatable_elements': 'int64',
+                'annotated_elements': 'int64',
+                'coverage': 'float64',
+                'consistent_elements': 'int64',
+                'consistency': 'float64',
+                'specificity': 'float64',
+                bd.PROVISIONAL: 'bool_',
+                bd.UNRESOLVED_TERMS: 'int64',
+                sp.APPROXIMATE: 'bool_',
+                sp.SAMPLE_SIZE: 'int64',
+                sp.CONSISTENCY_LOW: 'float64',
+                sp.CONSISTENCY_HIGH: 'float64',
+                sp.SPECIFICITY_LOW: 'float64',
+                sp.SPECIFICITY_HIGH: 'float64'}
+# instrumentation columns, by prefix
+PREFIX_TYPES = [('time_', 'float64'), ('terms_', 'int64'), ('graph_', 'int64'),
+                ('validation_cache_', 'int64'), ('http_', 'int64'),
+                ('mem_', 'int64'), ('rss_', 'int64')]
+
+
+def _importArrow():
+  """
+  Returns
+  -------
+  pa: module
+      pyarrow
+  pq: module
+      pyarrow.parquet
+  """
+  try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+  except ImportError:
+    raise ImportError("Arrow and Parquet output require pyarrow (pip install pyarrow).")
+  return pa, pq
+
+
+def getColumnType(name, values):
+  """
+  Get the Arrow type of a metrics column.
+  Types of unknown columns (e.g., of other calculators)
+  are inferred from their values.
+
+  Parameters
+  ----------
+  name: str
+  values: list
+      Values of the column; may include None.
+
+  Returns
+  -------
+  '': pyarrow.DataType
+  """
+  pa, _ = _importArrow()
+  type_name = COLUMN_TYPES.get(name)
+  if type_name is None:
+    type_name = next((t for prefix, t in PREFIX_TYPES if name.startswith(prefix)), None)
+  if type_name is not None:
+    return getattr(pa, type_name)()
+  non_null_values = [val for val in values if val is not None]
+  if non_null_values and all([isinstance(val, bool) for val in non_null_values]):
+    return pa.bool_()
+  if non_null_values and all([isinstance(val, int) for val in non_null_values]):
+    return pa.int64()
+  if all([isinstance(val, (int, float)) for val in non_null_values]):
+    return pa.float64()
+  return pa.string()
+
+
+def getColumns(rows):
+  """
+  Get the columns of metrics rows, in the order
+  they are first seen. Rows may have different columns,
+  e.g., rows stored by runs with other options.
+
+  Parameters
+  ----------
+  rows: dict-list
+      Rows, {'index', 'columns', 'data'}.
+
+  Returns
+  -------
+  '': str-list
+  """
+  columns = []
+  seen = set()
+  for one_row in rows:
+    if len(set(one_row['columns'])) != len(one_row['columns']) \
+       or MODEL_COLUMN in one_row['columns']:
+      raise ValueError("Column names should be unique and not '%s': %s."
+                       % (MODEL_COLUMN, one_row['columns']))
+    for name in one_row['columns']:
+      if name not in seen:
+        seen.add(name)
+        columns.append(name)
+  return columns
+
+
+def _getColumnValues(rows, name):
+  """
+  Values of a column, one per row;
+  None where a row does not have the column.
+  """
+  res = []
+  for one_row in rows:
+    if name in one_row['columns']:
+      idx = one_row['columns'].index(name)
+      res.extend([values[idx] for values in one_row['data']])
+    else:
+      res.extend([None] * len(one_row['data']))
+  return res
+
+
+def getSchema(rows):
+  """
+  Get the schema of metrics rows;
+  columns are those of getColumns.
+
+  Parameters
+  ----------
+  rows: dict-list
+      Rows, {'index', 'columns', 'data'}.
+
+  Returns
+  -------
+  '': pyarrow.Schema
+  """
+  pa, _ = _importArrow()
+  fields = [pa.field(MODEL_COLUMN, pa.dictionary(pa.int32(), pa.string()), nullable=False)]
+  for name in getColumns(rows):
+    fields.append(pa.field(name, getColumnType(name, _getColumnValues(rows, name))))
+  return pa.schema(fields)
+
+
+def getArrowTable(rows, schema=None):
+  """
+  Create an Arrow table from metrics rows.
+  Cells of columns a row does not have are null.
+
+  Parameters
+  ----------
+  rows: dict-list
+      Rows, {'index', 'columns', 'data'}.
+  schema: pyarrow.Schema
+      If None, see getSchema.
+
+  Returns
+  -------
+  '': pyarrow.Table
+  """
+  pa, _ = _importArrow()
+  if schema is None:
+    if not rows:
+      raise ValueError("No metrics row is given.")
+    schema = getSchema(rows)
+  columns = schema.names[1:]
+  extra_columns = [name for name in getColumns(rows) if name not in columns]
+  if extra_columns:
+    raise ValueError("Columns not in the schema: %s." % extra_columns)
+  index = [name for one_row in rows for name in one_row['index']]
+  arrays = [pa.array(index, type=pa.string()).dictionary_encode()]
+  for one_field in list(schema)[1:]:
+    arrays.append(pa.array([_toArrowValue(val) for val in _getColumnValues(rows, one_field.name)],
+                           type=one_field.type))
+  return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _toArrowValue(value):
+  """
+  Convert numpy scalars to Python values;
+  NaN stays a float (rows hold None for missing values).
+  """
+  return value.item() if hasattr(value, 'item') else value
+
+
+class ParquetMetricsWriter(object):
+  """
+  Writes metrics rows to a Parquet file,
+  one row group per call of write.
+  The schema is set by the first batch
+  (or given); later batches may lack columns
+  (their cells are null), but not add columns.
+
+  Attributes
+  ----------
+  path: str
+  schema: pyarrow.Schema/None
+  num_rows: int
+      Number of rows written.
+
+  Methods
+  -------
+  write (rows)
+      Write a batch of rows as a row group.
+  close ()
+      Finish the file.
+  """
+
+  def __init__(self, path, schema=None, compression='zstd'):
+    """
+    Parameters
+    ----------
+    path: str
+        Location of the Parquet file.
+    schema: pyarrow.Schema
+        If None, the schema of the first batch.
+    compression: str
+        Parquet compression codec.
+    """
+    _importArrow()
+    self.path = path
+    self.schema = schema
+    self.compression = compression
+    self.num_rows = 0
+    self._writer = None
+
+  def write(self, rows):
+    """
+    Parameters
+    ----------
+    rows: dict-list
+        Rows, {'index', 'columns', 'data'}.
+    """
+    if not rows:
+      return
+    _, pq = _importArrow()
+    table = getArrowTable(rows, schema=self.schema)
+    if self._writer is None:
+      self.schema = table.schema
+      self._writer = pq.ParquetWriter(self.path, self.schema,
+                                      compression=self.compression)
+    self._writer.write_table(table)
+    self.num_rows += table.num_rows
+
+  def close(self):
+    """
+    Finish the file; an empty file is written
+    if no rows were given with a schema.
+    """
+    if self._writer is None and self.schema is not None:
+      _, pq = _importArrow()
+      self._writer = pq.ParquetWriter(self.path, self.schema,
+                                      compression=self.compression)
+    if self._writer is not None:
+      self._writer.close()
+      self._writer = None
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+    return False
+
+
+def writeParquet(res, path, row_group_size=10000, compression='zstd'):
+  """
+  Write metrics to a Parquet file.
+
+  Parameters
+  ----------
+  res: pyarrow.Table/dict-list
+      Table (see getArrowTable) or metrics rows.
+  path: str
+  row_group_size: int
+      Maximum number of rows per row group.
+  compression: str
+  """
+  _, pq = _importArrow()
+  if isinstance(res, list):
+    res = getArrowTable(res)
+  pq.write_table(res, path, row_group_size=row_group_size, compression=compression)
+
+
+def readMetrics(path, columns=None):
+  """
+  Read a Parquet file of metrics.
+
+  Parameters
+  ----------
+  path: str
+  columns: str-list
+      If given, only these columns are read.
+
+  Returns
+  -------
+  '': pyarrow.Table
+      Model names stay dictionary-encoded.
+  """
+  _, pq = _importArrow()
+  return pq.read_table(path, columns=columns, read_dictionary=[MODEL_COLUMN])
@@ -1,12 +1,16 @@
 # constants.py
 """
 Constants for modlues
+Model entity types are libsbml classes;
+they (and constants using them) are created
+when first used, see __getattr__,
+so that importing constants does not import libsbml.
 """
 
-import libsbml
 import os
 
 PROJECT_NAME = "SBMate"
+SBMATE_VERSION = "1.1.3"
 
 # folders
 PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -16,11 +20,6 @@ RESOURCE_DIR = os.path.join(PROJECT_DIR, "SBMate/knowledge_resources")
 TEST_DIR = os.path.join(PROJECT_DIR, "tests")
 
 
-# Model entity types
-MODEL = libsbml.Model
-REACTION = libsbml.Reaction
-SPECIES = libsbml.Species
-COMPARTMENT = libsbml.Compartment
 BIOL_PROC = 'biological_process'
 MOLE_FUNC = 'molecular_function'
 CELL_COMP = 'cellular_component'
@@ -31,16 +30,6 @@ GO_CELL_COMP = "GO:0005575"
 # GO_PARENTS = [GO_BIO_PROC, GO_MOL_FUNC, GO_CELL_COMP]
 GO_ROOTS = [GO_BIO_PROC, GO_MOL_FUNC, GO_CELL_COMP]
 
-BIOMODEL_OBJECTS = [MODEL,
-                    REACTION,
-                    SPECIES,
-                    COMPARTMENT,
-                   ]
-OBJECT_GO_MAP = {MODEL: {BIOL_PROC, MOLE_FUNC},
-                 REACTION: {BIOL_PROC, MOLE_FUNC},
-                 SPECIES: {CELL_COMP},
-                 COMPARTMENT: {CELL_COMP},
-                }
 GO_ROOT_DICT = {GO_BIO_PROC: BIOL_PROC,
                 GO_MOL_FUNC: MOLE_FUNC,
                 GO_CELL_COMP: CELL_COMP,
@@ -97,12 +86,6 @@ PROCESS_ROOTS = {'biological_process', 'molecular_function',
 SPECIES_ROOTS = {'cellular_component', 'kegg_species', 'chemical entity',
                    'uniprot', 'physical entity representation'}
 COMPARTMENT_ROOTS = {'cellular_component', 'physical entity representation'}            
-# when konwledge resources were mapped to KNOWLEDGE_TYPES_REP
-OBJECT_ONT_MAP_FILT = {MODEL: PROCESS_ROOTS,
-                       REACTION: PROCESS_ROOTS,
-                       SPECIES: SPECIES_ROOTS,
-                       COMPARTMENT: COMPARTMENT_ROOTS,
-                      }
 
 
 # SBO terms
@@ -151,20 +134,49 @@ WEIGHT_QUALIFIER = {'is': 1.0, 'isVersionOf': 0.5}
 
 
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+# constants created with libsbml
+LIBSBML_CONSTANTS = ['MODEL', 'REACTION', 'SPECIES', 'COMPARTMENT',
+                     'BIOMODEL_OBJECTS', 'OBJECT_GO_MAP', 'OBJECT_ONT_MAP_FILT']
+
+
+def _getLibsbmlConstants():
+  """
+  Create the constants using libsbml.
+
+  Returns
+  -------
+  '': dict
+      Dictionary of {name: value} of LIBSBML_CONSTANTS.
+  """
+  import libsbml
+  res = dict()
+  # Model entity types
+  res['MODEL'] = libsbml.Model
+  res['REACTION'] = libsbml.Reaction
+  res['SPECIES'] = libsbml.Species
+  res['COMPARTMENT'] = libsbml.Compartment
+  res['BIOMODEL_OBJECTS'] = [libsbml.Model,
+                             libsbml.Reaction,
+                             libsbml.Species,
+                             libsbml.Compartment,
+                            ]
+  res['OBJECT_GO_MAP'] = {libsbml.Model: {BIOL_PROC, MOLE_FUNC},
+                          libsbml.Reaction: {BIOL_PROC, MOLE_FUNC},
+                          libsbml.Species: {CELL_COMP},
+                          libsbml.Compartment: {CELL_COMP},
+                         }
+  # when konwledge resources were mapped to KNOWLEDGE_TYPES_REP
+  res['OBJECT_ONT_MAP_FILT'] = {libsbml.Model: PROCESS_ROOTS,
+                                libsbml.Reaction: PROCESS_ROOTS,
+                                libsbml.Species: SPECIES_ROOTS,
+                                libsbml.Compartment: COMPARTMENT_ROOTS,
+                               }
+  return res
+
+
+def __getattr__(name):
+  # after the first use, the constants are module attributes
+  if name in LIBSBML_CONSTANTS:
+    globals().update(_getLibsbmlConstants())
+    return globals()[name]
+  raise AttributeError("module %r has no attribute %r" % (__name__, name))
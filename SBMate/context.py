@@ -0,0 +1,355 @@
+# context.py
+"""
+Shared computation context of one model.
+Intermediate results (annotated entities,
+per-entity analyzers, root maps, validation results)
+are computed lazily and at most once per model,
+however many metric calculators use them.
+A calculator declares what it uses in
+its class attribute REQUIRES.
+"""
+
+from SBMate import constants as cn
+from SBMate import dag_analyzer as da
+from SBMate import identifier_syntax as ids
+from SBMate import instrumentation as ins
+from SBMate import uniprot_kegg_analyzer as uka
+
+# mapping reaction type to appropriate analyzer class
+ANALYZER_DICT = {'go': da.DAGAnalyzer,
+                 'sbo': da.DAGAnalyzer,
+                 'chebi': da.DAGAnalyzer,
+                 'kegg_species': uka.NonDAGAnalyzer,
+                 'kegg_process': uka.NonDAGAnalyzer,
+                 'uniprot': uka.NonDAGAnalyzer,
+                }
+
+# evaluation order: local (graph) checks before remote lookups
+LOCAL_ONTOLOGIES = [k for k in ANALYZER_DICT if ANALYZER_DICT[k] is da.DAGAnalyzer]
+REMOTE_ONTOLOGIES = [k for k in ANALYZER_DICT if ANALYZER_DICT[k] is uka.NonDAGAnalyzer]
+
+# names of the intermediate results
+ANNOTATED_ENTITIES = 'annotated_entities'
+ENTITY_ANALYZERS = 'entity_analyzers'
+ROOT_MAPS = 'root_maps'
+VALIDATION_RESULTS = 'validation_results'
+DEPENDENCIES = [ANNOTATED_ENTITIES, ENTITY_ANALYZERS,
+                ROOT_MAPS, VALIDATION_RESULTS]
+
+
+def getQualifierDict(input_qual_dict):
+  """
+  Using the input dictionary {qualifier: terms},
+  create a dictionary of {term: qualifier}
+
+  Parameters
+  ----------
+  input_qual_dict: dict
+      Dictionary of {qualifier: terms}
+
+  Returns
+  -------
+  qual_dict: dict
+      Dictionary of {term: qualifier}
+  """
+  qual_dict = dict()
+  # currently one_qual is either 'is' or 'isVersionOf'
+  for one_qual in cn.QUALIFIERS:
+    if one_qual in input_qual_dict.keys():
+      # list of tuples ('ontology', 'term')
+      one_str_list = input_qual_dict[one_qual]
+      for one_tuple in one_str_list:
+        qual_dict[one_tuple[1]] = one_qual
+  return qual_dict
+
+
+class ModelContext(object):
+  """
+  Lazily populated intermediate results of a model.
+
+  Attributes
+  ----------
+  annotations: sbml_annotation.SBMLAnnotation
+      Sorted annotations for each knowledge resource.
+  memo: analysis_memo.AnalysisMemo/None
+      Memo of analyzers shared across entities and models.
+  budget: budget.TimeBudget/None
+      Time budget of remote lookups.
+  annotated_entities: str-list
+      List of model entity names that are annotated.
+  entity_analyzers: dict
+      Dictionary of {annotated entity: analyzer-list}.
+  root_maps: dict
+      Dictionary of {annotated entity: {ontology: {term: root}}},
+      for DAG ontologies whose terms are consistent.
+  validation_results: dict
+      Dictionary of {annotated entity: bool},
+      True if all analyzers of the entity are consistent.
+  unresolved_terms: tuple-list
+      List of (ontology, term) not resolved within budget.
+  remote_results: dict
+      Dictionary of {validation cache key: bool/None}
+      of the well-formed terms checked by remote analyzers;
+      None if not looked up (assumed valid or unresolved).
+
+  Methods
+  -------
+  require (names)
+      Compute the named intermediate results.
+  getAnalyzers (entity)
+      Get the analyzers of one entity.
+  isLocallyConsistent (entity)
+      Check an entity without remote lookups.
+  isConsistent (entity)
+      Check an entity, cheapest checks first.
+  getPendingRemoteTerms ()
+      Get remote terms of the entities that can still be consistent.
+  invalidate (entity)
+      Drop the results of an entity whose annotations changed.
+  """
+
+  def __init__(self, annotations, memo=None, budget=None):
+    """
+    Parameters
+    ----------
+    annotations: sbml_annotation.SBMLAnnotation
+    memo: analysis_memo.AnalysisMemo
+        If given, analyzers are taken from (and added to) the memo,
+        which can be shared across models.
+    budget: budget.TimeBudget
+        If given, remote lookups stop when it runs out;
+        remote analyzers are then not memoized,
+        as their results depend on the budget.
+    """
+    self.annotations = annotations
+    self.memo = memo
+    self.budget = budget
+    self._annotated_entities = None
+    self._analyzers = dict()
+    self._entity_analyzers = dict()
+    self._local_results = dict()
+    self._validation_results = dict()
+
+  def require(self, names):
+    """
+    Compute the named intermediate results, if not yet.
+
+    Parameters
+    ----------
+    names: str-list
+        Items of DEPENDENCIES.
+    """
+    for one_name in names:
+      if one_name not in DEPENDENCIES:
+        raise ValueError("Unknown dependency: %s." % one_name)
+      getattr(self, one_name)
+
+  @property
+  def annotated_entities(self):
+    if self._annotated_entities is None:
+      self._annotated_entities = [k for \
+                                  k in \
+                                  self.annotations.annotations.keys() \
+                                  if any([self.annotations.annotations[k][ont] for ont \
+                                  in cn.KNOWLEDGE_TYPES_REP])]
+    return self._annotated_entities
+
+  def _getAnalyzer(self, entity, ontology):
+    """
+    Get the analyzer of one entity for one ontology,
+    created at most once.
+
+    Parameters
+    ----------
+    entity: str
+        Model entity id.
+    ontology: str
+        Key of ANALYZER_DICT.
+
+    Returns
+    -------
+    '': DAGAnalyzer/NonDAGAnalyzer
+    """
+    key = (entity, ontology)
+    if key not in self._analyzers:
+      one_anot = self.annotations.annotations[entity]
+      term_qualifier_map = getQualifierDict(self.annotations.annotation_by_qualifier[entity])
+      if self.budget is not None and ontology in REMOTE_ONTOLOGIES:
+        analyzer = ANALYZER_DICT[ontology](term_id=one_anot[ontology],
+                                           ontology=ontology,
+                                           object_type=one_anot['object_type'],
+                                           qualifier_dict=term_qualifier_map,
+                                           budget=self.budget)
+      elif self.memo is None:
+        analyzer = ANALYZER_DICT[ontology](term_id=one_anot[ontology],
+                                           ontology=ontology,
+                                           object_type=one_anot['object_type'],
+                                           qualifier_dict=term_qualifier_map)
+      else:
+        analyzer = self.memo.getAnalyzer(ANALYZER_DICT[ontology],
+                                         term_id=one_anot[ontology],
+                                         ontology=ontology,
+                                         object_type=one_anot['object_type'],
+                                         qualifier_dict=term_qualifier_map)
+      self._analyzers[key] = analyzer
+    return self._analyzers[key]
+
+  def getAnalyzers(self, entity):
+    """
+    Get the analyzers of one entity,
+    one for each annotated ontology.
+
+    Parameters
+    ----------
+    entity: str
+        Model entity id.
+
+    Returns
+    -------
+    '': analyzer-list
+    """
+    if entity not in self._entity_analyzers:
+      one_anot = self.annotations.annotations[entity]
+      self._entity_analyzers[entity] = [self._getAnalyzer(entity, key) \
+                                        for key in ANALYZER_DICT if one_anot[key]]
+    return self._entity_analyzers[entity]
+
+  def isLocallyConsistent(self, entity):
+    """
+    Check an entity without remote lookups:
+    first whether the remote ontologies are acceptable
+    for the object type, then the DAG (root) checks.
+    Stops at the first failure.
+
+    Parameters
+    ----------
+    entity: str
+        Model entity id.
+
+    Returns
+    -------
+    '': bool
+        False if the entity cannot be consistent.
+    """
+    if entity not in self._local_results:
+      one_anot = self.annotations.annotations[entity]
+      acceptable_onts = cn.OBJECT_ONT_MAP_FILT[one_anot['object_type']]
+      if any([one_anot[key] and key not in acceptable_onts for key in REMOTE_ONTOLOGIES]):
+        res = False
+      else:
+        res = all(self._getAnalyzer(entity, key).consistent \
+                  for key in LOCAL_ONTOLOGIES if one_anot[key])
+      self._local_results[entity] = res
+    return self._local_results[entity]
+
+  def isConsistent(self, entity):
+    """
+    Check an entity, cheapest checks first.
+    Remote lookups are made only if
+    the local checks pass, and stop at the first failure;
+    ontologies whose terms are cached are checked first.
+
+    Parameters
+    ----------
+    entity: str
+        Model entity id.
+
+    Returns
+    -------
+    '': bool
+        True if consistent for all ontologies.
+    """
+    if entity not in self._validation_results:
+      with ins.stage('consistency'):
+        if not self.isLocallyConsistent(entity):
+          res = False
+        else:
+          one_anot = self.annotations.annotations[entity]
+          remote_keys = [key for key in REMOTE_ONTOLOGIES if one_anot[key]]
+          remote_keys.sort(key=lambda key: self._getNumUncached(key, one_anot[key]))
+          res = all(self._getAnalyzer(entity, key).consistent for key in remote_keys)
+      self._validation_results[entity] = res
+    return self._validation_results[entity]
+
+  def invalidate(self, entity):
+    """
+    Drop the intermediate results of one entity,
+    e.g., after its annotations were edited;
+    they are computed again when next used.
+
+    Parameters
+    ----------
+    entity: str
+        Model entity id.
+    """
+    for one_ont in ANALYZER_DICT:
+      self._analyzers.pop((entity, one_ont), None)
+    self._entity_analyzers.pop(entity, None)
+    self._local_results.pop(entity, None)
+    self._validation_results.pop(entity, None)
+    self._annotated_entities = None
+
+  def _getNumUncached(self, ontology, terms):
+    """
+    Number of terms not in the validation cache.
+    """
+    return len([one_term for one_term in terms \
+                if uka.VALIDATION_CACHE.get(ontology, one_term) is None])
+
+  def getPendingRemoteTerms(self):
+    """
+    Get the remote terms (not yet cached) of
+    annotated entities that pass the local checks,
+    e.g., to look them up concurrently in advance.
+    Malformed terms are left out, as they are
+    rejected without a query (see uka.validateTerm).
+
+    Returns
+    -------
+    '': tuple-list
+        List of (ontology, term), without duplicates.
+    """
+    pending = []
+    for one_entity in self.annotated_entities:
+      if self.isLocallyConsistent(one_entity):
+        pending.extend([one_pair for one_pair in \
+                        uka.getRemoteTerms(self.annotations.annotations[one_entity]) \
+                        if uka.VALIDATION_CACHE.get(*one_pair) is None])
+    pending = list(dict.fromkeys(pending))
+    return [one_pair for one_pair, one_reason \
+            in zip(pending, ids.checkIdentifiers(pending)) if one_reason is None]
+
+  @property
+  def entity_analyzers(self):
+    return {one_entity: self.getAnalyzers(one_entity) \
+            for one_entity in self.annotated_entities}
+
+  @property
+  def validation_results(self):
+    return {one_entity: self.isConsistent(one_entity) \
+            for one_entity in self.annotated_entities}
+
+  @property
+  def root_maps(self):
+    return {one_entity: {r.ontology: r.term_to_root \
+                         for r in self.getAnalyzers(one_entity) \
+                         if isinstance(r, da.DAGAnalyzer) and r.consistent} \
+            for one_entity in self.annotated_entities}
+
+  @property
+  def unresolved_terms(self):
+    unresolved = [(r.ontology, one_term) for r in self._analyzers.values() \
+                  for one_term in getattr(r, 'unresolved', [])]
+    return list(dict.fromkeys(unresolved))
+
+  @property
+  def remote_results(self):
+    results = dict()
+    for r in self._analyzers.values():
+      if not isinstance(r, uka.NonDAGAnalyzer):
+        continue
+      for one_term in r.term_id:
+        if ids.checkIdentifier(r.ontology, one_term) is None:
+          results[uka.VALIDATION_CACHE.getKey(r.ontology, one_term)] = \
+              uka.VALIDATION_CACHE.get(r.ontology, one_term)
+    return results
@@ -5,25 +5,150 @@ This class is for DAG-type knowledge resources,
 i.e.,  GO, SBO, and CHEBI.
 The two classes calculate consistency & specificity, 
 and returns appropriate values. 
+Ontology graphs (and networkx, numpy) are loaded
+when first needed, see getGraph;
+SBO_G, CHEBI_G, GO_G and ONT_TO_G remain available
+as module attributes.
+With setSlice, the graphs of an ontology slice
+(see ontology_slice) are used instead of the full graphs.
 """
 
 import collections
-import libsbml
-import networkx as nx
-import numpy as np
 import os
-import pickle5 as pickle
+import threading
 from SBMate import constants as cn
+from SBMate import instrumentation as ins
 
-# Load ontology graphs
-SBO_G = pickle.load(open(os.path.join(cn.RESOURCE_DIR, "sbo_graph.gpickle"), 'rb'))
-CHEBI_G = pickle.load(open(os.path.join(cn.RESOURCE_DIR, "chebi_graph.gpickle"), 'rb'))
-GO_G = pickle.load(open(os.path.join(cn.RESOURCE_DIR, "go_graph.gpickle"), 'rb'))
-
-# Mapping ontology into specific graph
-ONT_TO_G = dict({"go":GO_G, "sbo":SBO_G, "chebi":CHEBI_G})
+# Mapping ontology into graph file
+ONT_TO_FILE = dict({"go": "go_graph.gpickle",
+                    "sbo": "sbo_graph.gpickle",
+                    "chebi": "chebi_graph.gpickle"})
 # Mapping ontology to list of roots
 ONT_TO_ROOT = dict({"go": cn.GO_ROOTS, "sbo":cn.SBO_ROOTS, "chebi":cn.CHEBI_ROOTS})
+# Module attributes of the graphs
+_ATTR_TO_ONT = {"GO_G": "go", "SBO_G": "sbo", "CHEBI_G": "chebi"}
+
+# node attribute of ontology slices:
+# number of terms with a path to the node, plus one
+SUBTREE_SIZE = 'subtree_size'
+# graph attribute of ontology slices: terms covered by the slice
+SLICE_TERMS = 'slice_terms'
+
+# graphs loaded so far
+_GRAPHS = dict()
+_GRAPHS_LOCK = threading.Lock()
+# location of the ontology slice in use; None for the full graphs
+_SLICE_PATH = None
+
+
+def loadGraphFile(ontology):
+  """
+  Load the full graph of an ontology
+  from the knowledge resources (not kept).
+
+  Parameters
+  ----------
+  ontology: str
+      One of {'go', 'sbo', 'chebi'}.
+
+  Returns
+  -------
+  '': networkx.DiGraph
+  """
+  import pickle5 as pickle
+  with ins.stage('load_graph'):
+    with open(os.path.join(cn.RESOURCE_DIR, ONT_TO_FILE[ontology]), 'rb') as f:
+      return pickle.load(f)
+
+
+def setSlice(path):
+  """
+  Use the graphs of an ontology slice,
+  loaded when first needed; graphs loaded so far are dropped.
+
+  Parameters
+  ----------
+  path: str/None
+      Location of the slice (see ontology_slice.makeSlice);
+      None to use the full graphs.
+  """
+  global _SLICE_PATH
+  with _GRAPHS_LOCK:
+    _SLICE_PATH = path
+    _GRAPHS.clear()
+
+
+def getSlicePath():
+  """
+  Returns
+  -------
+  '': str/None
+      Location of the ontology slice in use.
+  """
+  return _SLICE_PATH
+
+
+def getGraph(ontology):
+  """
+  Get the graph of an ontology,
+  loading it on first use (once, also with threads).
+
+  Parameters
+  ----------
+  ontology: str
+      One of {'go', 'sbo', 'chebi'}.
+
+  Returns
+  -------
+  '': networkx.DiGraph
+  """
+  graph = _GRAPHS.get(ontology)
+  if graph is None:
+    with _GRAPHS_LOCK:
+      graph = _GRAPHS.get(ontology)
+      if graph is None and _SLICE_PATH is not None:
+        from SBMate import ontology_slice as osl
+        with ins.stage('load_graph'):
+          _GRAPHS.update(osl.loadSlice(_SLICE_PATH))
+        graph = _GRAPHS[ontology]
+      elif graph is None:
+        graph = loadGraphFile(ontology)
+        _GRAPHS[ontology] = graph
+  return graph
+
+
+def getSubtreeSize(graph, term):
+  """
+  Get the number of terms with a path to term
+  (i.e., as specific or more), including itself;
+  precomputed in ontology slices.
+
+  Parameters
+  ----------
+  graph: networkx.DiGraph
+  term: str
+
+  Returns
+  -------
+  '': int
+  """
+  size = graph.nodes[term].get(SUBTREE_SIZE)
+  if size is None:
+    if SLICE_TERMS in graph.graph:
+      raise ValueError("Term is not in the ontology slice: %s." % term)
+    import networkx as nx
+    ins.count(ins.GRAPH_ANCESTORS)
+    size = len(nx.ancestors(graph, term)) + 1
+  return size
+
+
+def __getattr__(name):
+  # SBO_G, CHEBI_G, GO_G and ONT_TO_G load the graphs when accessed
+  if name in _ATTR_TO_ONT:
+    return getGraph(_ATTR_TO_ONT[name])
+  if name == "ONT_TO_G":
+    return {one_ont: getGraph(one_ont) for one_ont in ONT_TO_FILE}
+  raise AttributeError("module %r has no attribute %r" % (__name__, name))
 
 
 class DAGAnalyzer(object):
@@ -91,15 +216,30 @@ class DAGAnalyzer(object):
     self.term_id = term_id
     self.ontology = ontology
     self.object_type = object_type
-    self.dag = ONT_TO_G[self.ontology]
+    self.dag = getGraph(self.ontology)
+    if SLICE_TERMS in self.dag.graph:
+      self._checkSlice()
     self.possible_roots = ONT_TO_ROOT[self.ontology]
     self.term_to_root = None
+    self._specificity = dict()
     self.consistent = self.getConsistency(inp_term=self.term_id)
     # create a dictionary of {term_id: weight}
     self.weight_dict = dict()
     for one_k in qualifier_dict.keys():
       self.weight_dict[one_k] = cn.WEIGHT_QUALIFIER[qualifier_dict[one_k]]
 
+  def _checkSlice(self):
+    """
+    Raise ValueError if terms are not covered
+    by the ontology slice in use,
+    as their results would differ from the full graph.
+    """
+    inp_list = [self.term_id] if isinstance(self.term_id, str) else self.term_id
+    if isinstance(inp_list, list):
+      missing = [t for t in inp_list if isinstance(t, str) and t not in self.dag.graph[SLICE_TERMS]]
+      if missing:
+        raise ValueError("Terms are not in the ontology slice: %s." % missing)
+
   def findRoot(self, inp_term):
     """
     Find the appropriate root for
@@ -118,8 +258,10 @@ class DAGAnalyzer(object):
     one_ances: str, or None
         Identifier of the root for the inp_term. 
     """
+    import networkx as nx
     if inp_term in self.dag:
       for one_ances in self.possible_roots:
+        ins.count(ins.GRAPH_HAS_PATH)
         has_p = nx.has_path(self.dag, source=inp_term, target=one_ances)
         if has_p:
           return one_ances
@@ -181,11 +323,12 @@ class DAGAnalyzer(object):
     """
     if not self.consistent or one_term not in self.dag:
       return None
+    import numpy as np
     # Find appropriate root term
     root_term = self.term_to_root[one_term]
-    # add 1 to include itself
-    num_ancestors = len(nx.ancestors(self.dag, one_term))+1
-    num_all_nodes = len(nx.ancestors(self.dag, root_term))+1
+    # includes itself
+    num_ancestors = getSubtreeSize(self.dag, one_term)
+    num_all_nodes = getSubtreeSize(self.dag, root_term)
     spec_score = abs(np.log(num_ancestors/num_all_nodes) / np.log(1/num_all_nodes))
     return spec_score
 
@@ -195,6 +338,8 @@ class DAGAnalyzer(object):
     using getOneTermSpecificity().
     Specificity is calculated only if
     the term is already consistent.
+    Results are kept, so analyzers shared
+    through an AnalysisMemo compute them once.
 
     Parameters
     ----------
@@ -212,10 +357,16 @@ class DAGAnalyzer(object):
       inp_list = [inp_term]
     else:
       inp_list = inp_term
+    key = tuple(inp_list)
+    if key in self._specificity:
+      return self._specificity[key]
     if set(inp_list) <= self.term_to_root.keys():
+      import numpy as np
       res = [self.getOneTermSpecificity(val)*self.weight_dict[val] for val in inp_list]
-      return np.mean(res)
+      spec_score = np.mean(res)
     else:
-      return None
+      spec_score = None
+    self._specificity[key] = spec_score
+    return spec_score
 
 
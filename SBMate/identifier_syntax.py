@@ -0,0 +1,142 @@
+# identifier_syntax.py
+"""
+Local syntactic validation of identifiers,
+using a compiled pattern per namespace
+(keys of cn.ALL_KNOWLEDGE_TYPES and cn.KNOWLEDGE_TYPES_REP).
+Malformed identifiers are rejected
+with a reason code, without remote lookups.
+Patterns follow the identifiers.org registry
+(KEGG genes: lowercase organism code).
+"""
+
+import re
+from SBMate import constants as cn
+
+# reason codes of rejected identifiers
+REASON_EMPTY = 'empty'
+REASON_STRAY_QUOTE = 'stray_quote'
+REASON_WHITESPACE = 'whitespace'
+REASON_WRONG_PREFIX = 'wrong_prefix'
+REASON_BAD_FORMAT = 'bad_format'
+REASON_UNKNOWN_NAMESPACE = 'unknown_namespace'
+
+UNIPROT_ACCESSION = '([OPQ][0-9][A-Z0-9]{3}[0-9]|[A-NR-Z][0-9]([A-Z][A-Z0-9]{2}[0-9]){1,2})'
+# {namespace: (prefix, pattern)}; prefix is None if ids have no fixed prefix
+PATTERNS = {'go': ('GO:', r'GO:\d{7}'),
+            'GO': ('GO:', r'GO:\d{7}'),
+            'obo.go': ('GO:', r'GO:\d{7}'),
+            'sbo': ('SBO:', r'SBO:\d{7}'),
+            'biomodels.sbo': ('SBO:', r'SBO:\d{7}'),
+            'chebi': ('CHEBI:', r'CHEBI:\d+'),
+            'obo.chebi': ('CHEBI:', r'CHEBI:\d+'),
+            'kegg.compound': ('C', r'C\d+'),
+            'kegg.drug': ('D', r'D\d+'),
+            'kegg.orthology': ('K', r'K\d+'),
+            'kegg.genes': (None, r'[a-z][a-z0-9]*:[\w\.\-]+'),
+            'kegg.reaction': ('R', r'R\d+'),
+            'kegg.pathway': (None, r'[a-z]{2,4}\d{5}'),
+            'uniprot': (None, UNIPROT_ACCESSION + r'(\.\d+)?'),
+            'uniprot.isoform': (None, UNIPROT_ACCESSION + r'-\d+'),
+           }
+REGISTRY = {k: (PATTERNS[k][0], re.compile(PATTERNS[k][1] + r'\Z')) for k in PATTERNS}
+# a representative ontology accepts the ids of any of its namespaces
+REP_NAMESPACES = {one_rep: sorted([k for k in cn.KNOWLEDGE_TYPES_DCT \
+                                   if cn.KNOWLEDGE_TYPES_DCT[k] == one_rep]) \
+                  for one_rep in cn.KNOWLEDGE_TYPES_REP}
+
+
+def _checkOneNamespace(namespace, term):
+  """
+  Check a (non-empty, stripped) term against one namespace.
+
+  Returns
+  -------
+  '': str/None
+      Reason code, or None if valid.
+  """
+  prefix, pattern = REGISTRY[namespace]
+  if pattern.match(term):
+    return None
+  if prefix is not None and not term.startswith(prefix):
+    return REASON_WRONG_PREFIX
+  return REASON_BAD_FORMAT
+
+
+def checkIdentifier(namespace, term):
+  """
+  Check the syntax of an identifier.
+
+  Parameters
+  ----------
+  namespace: str
+      Item of cn.ALL_KNOWLEDGE_TYPES (e.g., 'kegg.compound')
+      or of cn.KNOWLEDGE_TYPES_REP (e.g., 'kegg_species').
+  term: str
+      Identifier, e.g., 'C00002'.
+
+  Returns
+  -------
+  '': str/None
+      None if the identifier is plausible,
+      otherwise a reason code (REASON_*).
+  """
+  if namespace in REP_NAMESPACES:
+    namespaces = REP_NAMESPACES[namespace]
+  elif namespace in REGISTRY:
+    namespaces = [namespace]
+  else:
+    return REASON_UNKNOWN_NAMESPACE
+  if not isinstance(term, str) or not term:
+    return REASON_EMPTY
+  if '"' in term or "'" in term:
+    return REASON_STRAY_QUOTE
+  if term != term.strip() or ' ' in term:
+    return REASON_WHITESPACE
+  reasons = [_checkOneNamespace(k, term) for k in namespaces]
+  if None in reasons:
+    return None
+  # prefix matched at least one namespace; the rest of the id is wrong
+  if REASON_BAD_FORMAT in reasons:
+    return REASON_BAD_FORMAT
+  return REASON_WRONG_PREFIX
+
+
+def checkIdentifiers(pairs):
+  """
+  Check the syntax of many identifiers.
+  Each distinct pair is checked once.
+
+  Parameters
+  ----------
+  pairs: tuple-list
+      List of (namespace, term).
+
+  Returns
+  -------
+  '': list
+      Reason code (or None if plausible) of each pair, in order.
+  """
+  reasons = dict()
+  for one_pair in pairs:
+    if one_pair not in reasons:
+      reasons[one_pair] = checkIdentifier(*one_pair)
+  return [reasons[one_pair] for one_pair in pairs]
+
+
+def getRejections(pairs):
+  """
+  Get the identifiers rejected by syntax.
+
+  Parameters
+  ----------
+  pairs: tuple-list
+      List of (namespace, term).
+
+  Returns
+  -------
+  '': dict
+      Dictionary of {(namespace, term): reason code},
+      for rejected pairs only.
+  """
+  return {one_pair: one_reason for one_pair, one_reason \
+          in zip(pairs, checkIdentifiers(pairs)) if one_reason is not None}
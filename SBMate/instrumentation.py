@@ -0,0 +1,440 @@
+# instrumentation.py
+"""
+Optional instrumentation of scoring:
+wall time of stages, counters (terms per ontology,
+graph traversals, cache hits/misses, identifiers rejected
+by syntax, HTTP requests and bytes)
+and histograms (HTTP latency).
+In memory mode, allocation deltas of stages and
+peak memory of each model are also recorded:
+Python allocations by tracemalloc, and the resident set size
+(RSS), which includes memory of libsbml documents.
+Measurements go to COLLECTOR; when it is None
+(the default), instrumented code only checks it,
+so the cost is negligible.
+
+Example
+-------
+collector = Collector(columns=True, memory=True)
+df = AnnotationMetrics.getMetrics(files, output="table", collector=collector)
+collector.getSnapshot()
+"""
+
+import contextlib
+import os
+import threading
+import time
+import tracemalloc
+
+try:
+  import resource
+except ImportError:
+  resource = None
+
+# stages timed by the instrumented code
+STAGES = ['parse', 'extraction', 'consistency', 'specificity']
+# counters; 'terms.<ontology>' counts extracted terms,
+# 'rejected.<reason>' identifiers rejected by syntax per reason code
+GRAPH_HAS_PATH = 'graph.has_path'
+GRAPH_ANCESTORS = 'graph.ancestors'
+VALIDATION_CACHE_HITS = 'validation_cache.hits'
+VALIDATION_CACHE_MISSES = 'validation_cache.misses'
+IDENTIFIERS_REJECTED = 'identifiers.rejected'
+HTTP_REQUESTS = 'http.requests'
+HTTP_BYTES = 'http.bytes'
+MEMO_HITS = 'analysis_memo.hits'
+MEMO_MISSES = 'analysis_memo.misses'
+# histograms
+HTTP_LATENCY = 'http.latency'
+# upper bounds (seconds) of latency buckets; the last one is unbounded
+LATENCY_BUCKETS = [0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf')]
+# counters added as columns of metrics rows
+COLUMN_COUNTERS = [GRAPH_HAS_PATH, GRAPH_ANCESTORS,
+                   VALIDATION_CACHE_HITS, VALIDATION_CACHE_MISSES,
+                   IDENTIFIERS_REJECTED, HTTP_REQUESTS, HTTP_BYTES]
+
+# columns of memory mode, besides mem_<stage> and rss_<stage>
+MEMORY_PEAK = 'mem_peak'
+RSS_MAX = 'rss_max'
+
+# active collector of the process; None if disabled
+COLLECTOR = None
+
+
+def getRss():
+  """
+  Get the resident set size of the process.
+
+  Returns
+  -------
+  '': int/None
+      Bytes; None if not available (non-Linux).
+  """
+  try:
+    with open('/proc/self/statm') as f:
+      return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+  except (OSError, ValueError, AttributeError):
+    return None
+
+
+def getMaxRss():
+  """
+  Get the largest resident set size of the process so far.
+
+  Returns
+  -------
+  '': int/None
+      Bytes; None if not available (Windows).
+  """
+  if resource is None:
+    return None
+  max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  # kilobytes on Linux, bytes on macOS
+  return max_rss if os.uname().sysname == 'Darwin' else max_rss * 1024
+
+
+class Collector(object):
+  """
+  Collector of measurements.
+
+  Attributes
+  ----------
+  columns: bool
+      If True, measurements of each model are added
+      as columns of its metrics row.
+  memory: bool
+      If True, memory is also measured.
+  callbacks: list
+      Functions called as callback(kind, name, value)
+      on each measurement; kind is 'stage', 'count' or 'observe'.
+  stage_times: dict
+      Dictionary of {stage: seconds}.
+  stage_counts: dict
+      Dictionary of {stage: number of runs}.
+  counters: dict
+      Dictionary of {counter: value}.
+  histograms: dict
+      Dictionary of {histogram: {'counts', 'sum', 'count'}},
+      counts per bucket of LATENCY_BUCKETS.
+  stage_memory: dict
+      Dictionary of {stage: bytes}, net Python allocations
+      (memory mode).
+  stage_rss: dict
+      Dictionary of {stage: bytes}, change of RSS (memory mode).
+  model_peaks: dict
+      Dictionary of {model: bytes}, peak Python allocations
+      while scoring each model (memory mode).
+
+  Methods
+  -------
+  stage (name)
+      Context manager timing a stage.
+  count (name, value)
+      Add to a counter.
+  observe (name, value)
+      Add a value to a histogram.
+  getSnapshot ()
+      Get a copy of the measurements.
+  merge (snapshot)
+      Add the measurements of a snapshot.
+  getColumns (before)
+      Get the measurements since a snapshot, as row columns.
+  startMemory ()
+      Start tracing Python allocations (memory mode).
+  stopMemory ()
+      Stop tracing, if started by startMemory.
+  startModel ()
+      Reset the peak of Python allocations.
+  endModel (model_name)
+      Record the peak of a model.
+  """
+
+  def __init__(self, columns=False, callbacks=None, memory=False):
+    """
+    Parameters
+    ----------
+    columns: bool
+    callbacks: list
+    memory: bool
+    """
+    self.columns = columns
+    self.memory = memory
+    self.callbacks = [] if callbacks is None else list(callbacks)
+    self.stage_times = dict()
+    self.stage_counts = dict()
+    self.counters = dict()
+    self.histograms = dict()
+    self.stage_memory = dict()
+    self.stage_rss = dict()
+    self.model_peaks = dict()
+    self._started_tracing = False
+    self._memory_base = 0
+    self._lock = threading.Lock()
+
+  def __getstate__(self):
+    # sent to worker processes without the lock
+    state = dict(self.__dict__)
+    del state['_lock']
+    state['_started_tracing'] = False
+    return state
+
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    self._lock = threading.Lock()
+
+  def addStageTime(self, name, seconds):
+    with self._lock:
+      self.stage_times[name] = self.stage_times.get(name, 0.0) + seconds
+      self.stage_counts[name] = self.stage_counts.get(name, 0) + 1
+    for one_callback in self.callbacks:
+      one_callback('stage', name, seconds)
+
+  @contextlib.contextmanager
+  def stage(self, name):
+    """
+    Time a stage; in memory mode,
+    also measure its allocations.
+
+    Parameters
+    ----------
+    name: str
+    """
+    if self.memory:
+      memory_before = tracemalloc.get_traced_memory()[0]
+      rss_before = getRss()
+    start = time.perf_counter()
+    try:
+      yield
+    finally:
+      self.addStageTime(name, time.perf_counter() - start)
+      if self.memory:
+        memory_delta = tracemalloc.get_traced_memory()[0] - memory_before
+        rss_after = getRss()
+        rss_delta = 0 if rss_before is None else rss_after - rss_before
+        with self._lock:
+          self.stage_memory[name] = self.stage_memory.get(name, 0) + memory_delta
+          self.stage_rss[name] = self.stage_rss.get(name, 0) + rss_delta
+
+  def startMemory(self):
+    """
+    Start tracing Python allocations, if not yet.
+    """
+    if self.memory and not tracemalloc.is_tracing():
+      tracemalloc.start()
+      self._started_tracing = True
+
+  def stopMemory(self):
+    """
+    Stop tracing Python allocations, if started by startMemory.
+    """
+    if self._started_tracing:
+      tracemalloc.stop()
+      self._started_tracing = False
+
+  def startModel(self):
+    """
+    Reset the peak of Python allocations,
+    at the start of a model.
+    Before Python 3.9 (no tracemalloc.reset_peak),
+    traces are cleared instead, which also resets the peak;
+    blocks allocated before are then no longer traced.
+    """
+    if self.memory and tracemalloc.is_tracing():
+      if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+      else:
+        tracemalloc.clear_traces()
+      self._memory_base = tracemalloc.get_traced_memory()[0]
+
+  def endModel(self, model_name):
+    """
+    Record the peak of Python allocations of a model.
+
+    Parameters
+    ----------
+    model_name: str
+
+    Returns
+    -------
+    '': int
+        Peak bytes since startModel, above
+        the allocations at startModel.
+    """
+    peak = tracemalloc.get_traced_memory()[1] - self._memory_base
+    with self._lock:
+      self.model_peaks[model_name] = peak
+    return peak
+
+  def count(self, name, value=1):
+    """
+    Parameters
+    ----------
+    name: str
+    value: int
+    """
+    with self._lock:
+      self.counters[name] = self.counters.get(name, 0) + value
+    for one_callback in self.callbacks:
+      one_callback('count', name, value)
+
+  def observe(self, name, value):
+    """
+    Parameters
+    ----------
+    name: str
+    value: float
+    """
+    with self._lock:
+      histogram = self.histograms.get(name)
+      if histogram is None:
+        histogram = {'counts': [0] * len(LATENCY_BUCKETS), 'sum': 0.0, 'count': 0}
+        self.histograms[name] = histogram
+      for idx, one_bound in enumerate(LATENCY_BUCKETS):
+        if value <= one_bound:
+          histogram['counts'][idx] += 1
+          break
+      histogram['sum'] += value
+      histogram['count'] += 1
+    for one_callback in self.callbacks:
+      one_callback('observe', name, value)
+
+  def getSnapshot(self):
+    """
+    Returns
+    -------
+    '': dict
+        Dictionary with keys 'stage_times', 'stage_counts',
+        'counters', 'stage_memory', 'stage_rss',
+        'model_peaks' and 'histograms'.
+    """
+    with self._lock:
+      return {'stage_times': dict(self.stage_times),
+              'stage_counts': dict(self.stage_counts),
+              'counters': dict(self.counters),
+              'stage_memory': dict(self.stage_memory),
+              'stage_rss': dict(self.stage_rss),
+              'model_peaks': dict(self.model_peaks),
+              'histograms': {k: {'counts': list(v['counts']), 'sum': v['sum'], 'count': v['count']} \
+                             for k, v in self.histograms.items()}}
+
+  def merge(self, snapshot):
+    """
+    Add the measurements of a snapshot,
+    e.g., from a worker process.
+
+    Parameters
+    ----------
+    snapshot: dict
+    """
+    with self._lock:
+      for one_key in ['stage_times', 'stage_counts', 'counters',
+                      'stage_memory', 'stage_rss']:
+        values = getattr(self, one_key)
+        for name, value in snapshot[one_key].items():
+          values[name] = values.get(name, 0) + value
+      self.model_peaks.update(snapshot['model_peaks'])
+      for name, other in snapshot['histograms'].items():
+        histogram = self.histograms.setdefault(name, {'counts': [0] * len(LATENCY_BUCKETS),
+                                                      'sum': 0.0, 'count': 0})
+        histogram['counts'] = [a + b for a, b in zip(histogram['counts'], other['counts'])]
+        histogram['sum'] += other['sum']
+        histogram['count'] += other['count']
+
+  def getColumns(self, before, ontologies):
+    """
+    Get the measurements since a snapshot,
+    e.g., of one model, as columns of a metrics row.
+    With concurrent scoring (pipeline threads),
+    measurements of other models may be included.
+
+    Parameters
+    ----------
+    before: dict
+        Snapshot taken before.
+    ontologies: str-list
+        Ontologies of the term count columns.
+
+    Returns
+    -------
+    '': dict
+        Dictionary of {column: value}.
+    """
+    after = self.getSnapshot()
+    res = dict()
+    for one_stage in STAGES:
+      res['time_' + one_stage] = after['stage_times'].get(one_stage, 0.0) - \
+                                 before['stage_times'].get(one_stage, 0.0)
+    for one_ont in ontologies:
+      name = 'terms.' + one_ont
+      res['terms_' + one_ont] = after['counters'].get(name, 0) - before['counters'].get(name, 0)
+    for name in COLUMN_COUNTERS:
+      res[name.replace('.', '_')] = after['counters'].get(name, 0) - before['counters'].get(name, 0)
+    http_after = after['histograms'].get(HTTP_LATENCY, {'sum': 0.0})
+    http_before = before['histograms'].get(HTTP_LATENCY, {'sum': 0.0})
+    res['time_http'] = http_after['sum'] - http_before['sum']
+    if self.memory:
+      for one_stage in STAGES:
+        res['mem_' + one_stage] = after['stage_memory'].get(one_stage, 0) - \
+                                  before['stage_memory'].get(one_stage, 0)
+      for one_stage in STAGES:
+        res['rss_' + one_stage] = after['stage_rss'].get(one_stage, 0) - \
+                                  before['stage_rss'].get(one_stage, 0)
+    return res
+
+
+class _NullStage(object):
+  """
+  Stage context of a disabled collector.
+  """
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name):
+  """
+  Time a stage with COLLECTOR, if enabled.
+
+  Parameters
+  ----------
+  name: str
+
+  Returns
+  -------
+  '': context manager
+  """
+  if COLLECTOR is None:
+    return _NULL_STAGE
+  return COLLECTOR.stage(name)
+
+
+def count(name, value=1):
+  """
+  Add to a counter of COLLECTOR, if enabled.
+
+  Parameters
+  ----------
+  name: str
+  value: int
+  """
+  if COLLECTOR is not None:
+    COLLECTOR.count(name, value)
+
+
+def observe(name, value):
+  """
+  Add a value to a histogram of COLLECTOR, if enabled.
+
+  Parameters
+  ----------
+  name: str
+  value: float
+  """
+  if COLLECTOR is not None:
+    COLLECTOR.observe(name, value)
@@ -0,0 +1,293 @@
+# manifest.py
+"""
+Results manifest for incremental re-scoring.
+For each model file, the manifest keeps
+the content hash, SBMate version,
+ontology artifact version, the resolver mode and
+results of the remote lookups the row depends on,
+and the stored metrics row.
+A model is scored again only if one of them changed.
+"""
+
+import hashlib
+import json
+import os
+from SBMate import constants as cn
+
+MANIFEST_FORMAT = 2
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def getFileHash(file_path):
+  """
+  Get the sha256 digest of the content of a file.
+
+  Parameters
+  ----------
+  file_path: str
+      Address of the file.
+
+  Returns
+  -------
+  '': str
+      Hexadecimal digest.
+  """
+  digest = hashlib.sha256()
+  with open(file_path, 'rb') as f:
+    for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+      digest.update(chunk)
+  return digest.hexdigest()
+
+
+def getOntologyVersion(resource_dir=cn.RESOURCE_DIR):
+  """
+  Get a version string of the ontology artifacts
+  (the pickled graphs in the knowledge resource directory).
+  Name, size and modification time of each artifact
+  are used, so the version changes whenever
+  an artifact is replaced.
+
+  Parameters
+  ----------
+  resource_dir: str
+      Directory of the knowledge resources.
+
+  Returns
+  -------
+  '': str
+      Hexadecimal digest.
+  """
+  digest = hashlib.sha256()
+  if os.path.isdir(resource_dir):
+    for one_name in sorted(os.listdir(resource_dir)):
+      one_stat = os.stat(os.path.join(resource_dir, one_name))
+      digest.update(('%s:%d:%d;' % (one_name,
+                                    one_stat.st_size,
+                                    one_stat.st_mtime_ns)).encode())
+  return digest.hexdigest()
+
+
+def dumpJson(obj, file_path):
+  """
+  Atomically write obj as json to file_path.
+  The content is written to a temporary file
+  which then replaces file_path,
+  so a crash never leaves a partial file.
+
+  Parameters
+  ----------
+  obj: json-serializable object
+  file_path: str
+  """
+  dir_name = os.path.dirname(os.path.abspath(file_path))
+  os.makedirs(dir_name, exist_ok=True)
+  tmp_path = '%s.%d.tmp' % (file_path, os.getpid())
+  with open(tmp_path, 'w') as f:
+    json.dump(obj, f, default=toJsonValue)
+    f.flush()
+    os.fsync(f.fileno())
+  os.replace(tmp_path, file_path)
+
+
+def toJsonValue(value):
+  """
+  Convert numpy scalars into python values for json.
+  """
+  if hasattr(value, 'item'):
+    return value.item()
+  raise TypeError("Object of type %s is not JSON serializable" % type(value).__name__)
+
+
+class ResultsManifest(object):
+  """
+  Manifest of model file -> stored metrics row.
+
+  Attributes
+  ----------
+  path: str/None
+      Location of the manifest (.json) file.
+      If None, the manifest is kept in memory only.
+  sbmate_version: str
+      SBMate version the rows are computed with.
+  ontology_version: str
+      Version of the ontology artifacts.
+  entries: dict
+      Dictionary of {absolute file path: entry},
+      where entry is a dictionary with keys
+      'hash', 'size', 'mtime_ns', 'sbmate_version',
+      'ontology_version', 'offline', 'remote_results' and 'row'.
+
+  Methods
+  -------
+  getRow (file_path, offline, validation_cache)
+      Get the stored row if it is still current.
+  update (file_path, row, offline, remote_results)
+      Store a newly computed row.
+  save ()
+      Write the manifest to path.
+  """
+
+  def __init__(self, path=None, ontology_version=None):
+    """
+    Parameters
+    ----------
+    path: str
+        Location of the manifest file.
+        Loaded if it already exists.
+    ontology_version: str
+        Version of the ontology artifacts.
+        If None, computed from cn.RESOURCE_DIR.
+    """
+    self.path = path
+    self.sbmate_version = cn.SBMATE_VERSION
+    if ontology_version is None:
+      ontology_version = getOntologyVersion()
+    self.ontology_version = ontology_version
+    self.entries = dict()
+    if path is not None and os.path.isfile(path):
+      with open(path) as f:
+        stored = json.load(f)
+      if stored.get('format') == MANIFEST_FORMAT:
+        self.entries = stored['entries']
+
+  def getKey(self, file_path):
+    """
+    Key of a model file in the manifest.
+
+    Parameters
+    ----------
+    file_path: str
+
+    Returns
+    -------
+    '': str
+        Absolute path of the file.
+    """
+    return os.path.abspath(file_path)
+
+  def _getFileState(self, file_path, entry=None):
+    """
+    Get (hash, size, mtime_ns) of a file.
+    The hash is reused from entry if
+    size and modification time did not change.
+
+    Parameters
+    ----------
+    file_path: str
+    entry: dict/None
+        Stored entry of the file.
+
+    Returns
+    -------
+    '': tuple (str, int, int)
+    """
+    one_stat = os.stat(file_path)
+    if entry is not None and \
+       entry['size'] == one_stat.st_size and \
+       entry['mtime_ns'] == one_stat.st_mtime_ns:
+      return entry['hash'], one_stat.st_size, one_stat.st_mtime_ns
+    return getFileHash(file_path), one_stat.st_size, one_stat.st_mtime_ns
+
+  def getRow(self, file_path, offline=False, validation_cache=None):
+    """
+    Get the stored row of a model file,
+    if the file, SBMate and ontology artifacts
+    did not change since it was stored,
+    and the remote lookups would give the same results.
+
+    Parameters
+    ----------
+    file_path: str
+    offline: bool
+        Resolver mode of the run, see uka.NonDAGAnalyzer.offline.
+        A row with terms assumed valid offline
+        is not used by an online run.
+    validation_cache: uka.ValidationCache/None
+        Validation cache of the run; the row is not used
+        if it holds another result for a term of the row.
+
+    Returns
+    -------
+    '': dict/None
+        Stored row; None if the model should be scored again.
+    """
+    entry = self.entries.get(self.getKey(file_path))
+    if entry is None:
+      return None
+    if entry['sbmate_version'] != self.sbmate_version or \
+       entry['ontology_version'] != self.ontology_version:
+      return None
+    if not self._isResolved(entry, offline, validation_cache):
+      return None
+    file_hash, size, mtime_ns = self._getFileState(file_path, entry)
+    if file_hash != entry['hash']:
+      return None
+    # refresh size/mtime so the next run skips hashing
+    entry['size'] = size
+    entry['mtime_ns'] = mtime_ns
+    return entry['row']
+
+  def _isResolved(self, entry, offline, validation_cache):
+    """
+    Check whether the remote lookups of a run
+    would give the results a stored row used.
+
+    Parameters
+    ----------
+    entry: dict
+    offline: bool
+    validation_cache: uka.ValidationCache/None
+
+    Returns
+    -------
+    '': bool
+    """
+    remote_results = entry['remote_results']
+    if entry['offline'] and not offline and None in remote_results.values():
+      return False
+    if validation_cache is None:
+      return True
+    for one_key in remote_results:
+      one_result = validation_cache.results.get(one_key)
+      if one_result is not None and one_result != remote_results[one_key]:
+        return False
+    return True
+
+  def update(self, file_path, row, offline=False, remote_results=None):
+    """
+    Store a newly computed row of a model file.
+
+    Parameters
+    ----------
+    file_path: str
+    row: dict
+        Metrics row, {'index', 'columns', 'data'}.
+    offline: bool
+        Resolver mode the row is computed with.
+    remote_results: dict
+        Results of the remote lookups of the row,
+        {validation cache key: bool/None};
+        None for terms not looked up (assumed valid).
+    """
+    key = self.getKey(file_path)
+    file_hash, size, mtime_ns = self._getFileState(file_path, self.entries.get(key))
+    if remote_results is None:
+      remote_results = dict()
+    self.entries[key] = {'hash': file_hash,
+                         'size': size,
+                         'mtime_ns': mtime_ns,
+                         'sbmate_version': self.sbmate_version,
+                         'ontology_version': self.ontology_version,
+                         'offline': offline,
+                         'remote_results': remote_results,
+                         'row': row}
+
+  def save(self):
+    """
+    Write the manifest (atomically) to self.path.
+    """
+    if self.path is None:
+      return
+    dumpJson({'format': MANIFEST_FORMAT,
+              'entries': self.entries},
+             self.path)
@@ -1,25 +1,13 @@
 # metric_calculator.py
 # calculate annotation scores
 
-import libsbml
-import networkx as nx
-import numpy as np
-import os
-import pandas as pd
-import re
-import requests
-from SBMate import constants as cn
-from SBMate import dag_analyzer as da
-from SBMate import uniprot_kegg_analyzer as uka
+from SBMate import aggregation as agg
+from SBMate import context as mctx
+from SBMate import instrumentation as ins
+from SBMate import sampling as sp
 
 # mapping reaction type to appropriate analyzer class
-ANALYZER_DICT = {'go': da.DAGAnalyzer,
-                 'sbo': da.DAGAnalyzer,
-                 'chebi': da.DAGAnalyzer,
-                 'kegg_species': uka.NonDAGAnalyzer,
-                 'kegg_process': uka.NonDAGAnalyzer,
-                 'uniprot': uka.NonDAGAnalyzer,
-                }
+ANALYZER_DICT = mctx.ANALYZER_DICT
 
 
 class MetricCalculator(object):
@@ -31,8 +19,16 @@ class MetricCalculator(object):
 
   Attributes
   ----------
+  REQUIRES: str-list (class attribute)
+      Intermediate results used from the shared
+      context.ModelContext (see context.DEPENDENCIES).
   annotations: sbml_annotation.SBMLAnnotation 
       Sorted annotations for each knowledge resource.
+  context: context.ModelContext
+      Shared intermediate results of the model.
+  entity_table: aggregation.EntityTable/None
+      Entity outcomes the metrics were aggregated from,
+      set by calculateRecord (None for a sampled record).
   annotated_entities: str-list
       List of model entity names that are annotated.
   consistent_entities: dict
@@ -52,9 +48,12 @@ class MetricCalculator(object):
       Calculates model consistency score.
   getSpecificity
       Calculates model specificity score. 
+  getEntityTable
+      Outcomes of the entities, as a flat table.
   """
+  REQUIRES = [mctx.ANNOTATED_ENTITIES, mctx.VALIDATION_RESULTS]
 
-  def __init__(self, annotations, model_name):
+  def __init__(self, annotations, model_name, context=None, sampling=None):
     """
     Parameters
     ----------
@@ -62,9 +61,21 @@ class MetricCalculator(object):
         Sorted annotations for the five knowledge resources.
     model: str
         Name of the model; will be index of the dataframe
+    context: context.ModelContext
+        Shared intermediate results of the model.
+        If None, a new context is created.
+    sampling: sampling.SamplingPlan
+        If given, consistency and specificity are
+        estimated from a sample of the annotated entities
+        (see calculateSampledRecord).
     """
     self.annotations = annotations
     self.model_name = model_name
+    self.sampling = sampling
+    self.entity_table = None
+    if context is None:
+      context = mctx.ModelContext(annotations)
+    self.context = context
 
   def calculate(self):
     """
@@ -75,6 +86,114 @@ class MetricCalculator(object):
     '': pd.DataFrame
         Merged dataframe for each calculated metric.
     """
+    return self.mkDataframe(self.calculateRecord())
+
+  def calculateRecord(self):
+    """
+    Creates the metrics as a plain record,
+    without constructing a DataFrame.
+    Metrics are aggregated from the entity table
+    (see aggregation.aggregate).
+
+    Returns
+    -------
+    '': dict
+        Dictionary of {metric name: value}, in column order.
+    """
+    if self.sampling is not None:
+      return self.calculateSampledRecord()
+    self.entity_table = self.getEntityTable()
+    return agg.aggregate(self.entity_table)[0]
+
+  def calculateSampledRecord(self):
+    """
+    Creates the metrics from a stratified sample
+    of the annotated entities (see sampling);
+    only the sampled entities are checked.
+    Coverage is exact; consistent_elements, consistency
+    and specificity are estimates, with confidence intervals.
+    If the sample includes all annotated entities,
+    metrics are exact (approximate is False).
+
+    Returns
+    -------
+    '': dict
+        Dictionary of {metric name: value}, with the
+        columns of calculateRecord and sampling.COLUMNS.
+    """
+    annotated_entities = self.context.annotated_entities
+    num_annotated = len(annotated_entities)
+    sample_size = self.sampling.getSampleSize(num_annotated)
+    if sample_size >= num_annotated:
+      self.entity_table = self.getEntityTable()
+      record = agg.aggregate(self.entity_table)[0]
+      record.update({sp.APPROXIMATE: False,
+                     sp.SAMPLE_SIZE: num_annotated,
+                     sp.CONSISTENCY_LOW: record['consistency'],
+                     sp.CONSISTENCY_HIGH: record['consistency'],
+                     sp.SPECIFICITY_LOW: record['specificity'],
+                     sp.SPECIFICITY_HIGH: record['specificity']})
+      return record
+    import numpy as np
+    strata = dict()
+    for one_entity in annotated_entities:
+      strata.setdefault(self.annotations.annotations[one_entity]['object_type'],
+                        []).append(one_entity)
+    sample = sp.selectSample(strata, sample_size,
+                             self.sampling.getRandom(self.model_name))
+    consistent = dict()
+    specificity = dict()
+    for one_stratum, entities in sample.items():
+      consistent[one_stratum] = [float(self.context.isConsistent(e)) for e in entities]
+      with ins.stage('specificity'):
+        specificity[one_stratum] = [float(np.mean([one_analyzer.getSpecificity(one_analyzer.term_id) \
+                                                   for one_analyzer in self.context.getAnalyzers(e)])) \
+                                    if c else 0.0 \
+                                    for e, c in zip(entities, consistent[one_stratum])]
+    strata_sizes = {k: len(v) for k, v in strata.items()}
+    z = self.sampling.getZ()
+    consistency, consistency_var = sp.estimateProportion(strata_sizes, consistent)
+    consistency_ci = sp.getInterval(consistency, consistency_var, z)
+    spec, spec_var = sp.estimateRatio(strata_sizes, specificity, consistent)
+    spec_ci = (None, None) if spec is None else sp.getInterval(spec, spec_var, z)
+    num_consistent = int(round(consistency * num_annotated))
+    return {'annotatable_elements': len(self.annotations.annotations),
+            'annotated_elements': num_annotated,
+            'coverage': np.round(float(num_annotated/len(self.annotations.annotations)), 2),
+            'consistent_elements': num_consistent if num_consistent else None,
+            'consistency': np.round(consistency, 2),
+            'specificity': None if spec is None else np.round(spec, 2),
+            sp.APPROXIMATE: True,
+            sp.SAMPLE_SIZE: sum([len(v) for v in sample.values()]),
+            sp.CONSISTENCY_LOW: consistency_ci[0],
+            sp.CONSISTENCY_HIGH: consistency_ci[1],
+            sp.SPECIFICITY_LOW: spec_ci[0],
+            sp.SPECIFICITY_HIGH: spec_ci[1]}
+
+  def getEntityTable(self):
+    """
+    Score the entities of the model.
+    Tables of several models can be combined
+    (EntityTable.extend) and aggregated together.
+
+    Returns
+    -------
+    '': aggregation.EntityTable
+    """
+    table = agg.EntityTable()
+    table.addModel(self.model_name, self.annotations, self.context)
+    return table
+
+  def _calculateRecordByEntity(self):
+    """
+    Creates the metrics entity by entity,
+    with _getCoverage, _getConsistency and _getSpecificity;
+    same result as calculateRecord.
+
+    Returns
+    -------
+    '': dict
+    """
     if self.annotations.annotations:
       len_annotatable_entities = len(self.annotations.annotations)
     else:
@@ -91,14 +210,12 @@ class MetricCalculator(object):
     else:
       len_consistent_entities = None
     specificity = self._getSpecificity(consistent_entities)
-    entities_Df = self.mkDataframe({'annotatable_elements': len_annotatable_entities})
-    coverage_Df = self.mkDataframe({'annotated_elements':len_annotated_entities,
-                                    'coverage': coverage})
-    consistency_Df = self.mkDataframe({'consistent_elements':len_consistent_entities,
-                                       'consistency': consistency})
-    specificity_Df = self.mkDataframe({'specificity': specificity})
-
-    return pd.concat([entities_Df, coverage_Df, consistency_Df, specificity_Df], axis=1)
+    return {'annotatable_elements': len_annotatable_entities,
+            'annotated_elements': len_annotated_entities,
+            'coverage': coverage,
+            'consistent_elements': len_consistent_entities,
+            'consistency': consistency,
+            'specificity': specificity}
 
   def mkDataframe(self, score_info):
     """
@@ -115,6 +232,7 @@ class MetricCalculator(object):
     '': pandas.DataFrame
         Dataframe including entities and the score. 
     """
+    import pandas as pd
     return pd.DataFrame(score_info, index=[self.model_name])
 
   # a new method! Used in _getConsistency
@@ -133,15 +251,7 @@ class MetricCalculator(object):
     qual_dict: dict
         Dictionary of {term: qualifier}
     """
-    qual_dict = dict()
-    # currently one_qual is either 'is' or 'isVersionOf'
-    for one_qual in cn.QUALIFIERS:
-      if one_qual in input_qual_dict.keys():
-        # list of tuples ('ontology', 'term')
-        one_str_list = input_qual_dict[one_qual]
-        for one_tuple in one_str_list:
-          qual_dict[one_tuple[1]] = one_qual
-    return qual_dict
+    return mctx.getQualifierDict(input_qual_dict)
 
   def _getConsistency(self, annotated_entities):
     """
@@ -166,21 +276,12 @@ class MetricCalculator(object):
     """
     if not annotated_entities:
       return None, None
-    consistent_entities = []
+    import numpy as np
     consistent_dicts = dict()
     for anot_key in annotated_entities:
-      one_anot = self.annotations.annotations[anot_key]
-      one_anot_qualifier = self.annotations.annotation_by_qualifier[anot_key]
-      term_qualifier_map = self.getQualifierDict(one_anot_qualifier)
-      one_entity_onts = [ANALYZER_DICT[key](term_id=one_anot[key],
-                                            ontology=key,
-                                            object_type=one_anot['object_type'],
-                                            qualifier_dict=term_qualifier_map) \
-                         for key in ANALYZER_DICT if one_anot[key]]
-
       # if consistent for all ontologies, update list of consistent objects
-      if all([r.consistent for r in one_entity_onts]):
-        consistent_dicts[anot_key] = one_entity_onts
+      if self.context.isConsistent(anot_key):
+        consistent_dicts[anot_key] = self.context.getAnalyzers(anot_key)
     consistency_score = np.round(len(consistent_dicts.keys())/len(annotated_entities), 2)
     return consistent_dicts, consistency_score
 
@@ -204,9 +305,11 @@ class MetricCalculator(object):
     """
     # calculates specificity only if it has at least one consistent entity
     if consistent_entities:
-      entities_specificity = [np.mean([one_analyzer.getSpecificity(one_analyzer.term_id) for \
-                                       one_analyzer in consistent_entities[one_key]]) for \
-                              one_key in consistent_entities.keys()]
+      import numpy as np
+      with ins.stage('specificity'):
+        entities_specificity = [np.mean([one_analyzer.getSpecificity(one_analyzer.term_id) for \
+                                         one_analyzer in consistent_entities[one_key]]) for \
+                                one_key in consistent_entities.keys()]
       specificity_score = np.round(np.mean(entities_specificity), 2)
       return specificity_score
     else:
@@ -224,12 +327,9 @@ class MetricCalculator(object):
     '': float
         Coverage score. 
     """
+    import numpy as np
     num_annotatable_entities = len(self.annotations.annotations)
-    list_annotated_entities = [k for \
-                               k in \
-                               self.annotations.annotations.keys() \
-                               if any([self.annotations.annotations[k][ont] for ont \
-                               in cn.KNOWLEDGE_TYPES_REP])]
+    list_annotated_entities = self.context.annotated_entities
     num_annotated_entities = len(list_annotated_entities)
     coverage_score = float(num_annotated_entities/num_annotatable_entities)
     return list_annotated_entities, np.round(coverage_score, 2)
@@ -0,0 +1,316 @@
+# model_generator.py
+"""
+Generator of synthetic SBML models, for scaling tests
+and benchmarks: configurable numbers of compartments,
+species and reactions, annotation density, qualifier mix,
+ontology mix, and rates of duplicated and malformed annotations.
+GO, SBO and ChEBI terms are drawn from the shipped ontology graphs;
+KEGG and UniProt identifiers are generated in their formats.
+
+Example
+-------
+python -m SBMate.model_generator large.xml --species 100000 --reactions 50000
+"""
+
+import argparse
+import libsbml
+import random
+import sys
+from SBMate import constants as cn
+from SBMate import dag_analyzer as da
+from SBMate import identifier_syntax as ids
+
+SBML_LEVEL = 3
+SBML_VERSION = 1
+# namespace in identifiers.org URI of each ontology
+ONT_TO_NAMESPACE = {'go': 'go',
+                    'chebi': 'chebi',
+                    'kegg_species': 'kegg.compound',
+                    'kegg_process': 'kegg.reaction',
+                    'uniprot': 'uniprot',
+                   }
+QUALIFIER_TO_BQB = {'is': libsbml.BQB_IS,
+                    'isVersionOf': libsbml.BQB_IS_VERSION_OF}
+# {object type: {ontology: probability}} of annotations
+DEFAULT_ONTOLOGY_MIX = {'compartment': {'go': 1.0},
+                        'species': {'chebi': 0.5, 'kegg_species': 0.2,
+                                    'uniprot': 0.2, 'go': 0.1},
+                        'reaction': {'go': 0.5, 'kegg_process': 0.3, 'sbo': 0.2},
+                       }
+DEFAULT_QUALIFIER_MIX = {'is': 0.7, 'isVersionOf': 0.3}
+# kinds of malformed identifiers
+MALFORMED_KINDS = ['stray_quote', 'wrong_prefix', 'bad_format']
+
+
+class ModelGenerator(object):
+  """
+  Generator of synthetic SBML models.
+  The same parameters and seed give the same model.
+
+  Attributes
+  ----------
+  annotation_density: float
+      Fraction of entities with annotations.
+  ontology_mix: dict
+      Dictionary of {object type: {ontology: probability}};
+      object types are 'compartment', 'species' and 'reaction'.
+  qualifier_mix: dict
+      Dictionary of {qualifier: probability}.
+  max_terms: int
+      Maximum number of terms of one annotation.
+  duplicate_rate: float
+      Fraction of annotated entities repeating
+      the annotation of an earlier entity of the same type.
+  malformed_rate: float
+      Fraction of malformed identifiers.
+
+  Methods
+  -------
+  getTerm (ontology)
+      Draw a well-formed term.
+  generate (num_compartments, num_species, num_reactions)
+      Create an SBML document.
+  write (file, num_compartments, num_species, num_reactions)
+      Write an SBML file.
+  """
+
+  def __init__(self, annotation_density=0.8, ontology_mix=None,
+               qualifier_mix=None, max_terms=2, duplicate_rate=0.1,
+               malformed_rate=0.0, seed=0):
+    """
+    Parameters
+    ----------
+    annotation_density: float
+    ontology_mix: dict
+        If None, DEFAULT_ONTOLOGY_MIX.
+    qualifier_mix: dict
+        If None, DEFAULT_QUALIFIER_MIX.
+    max_terms: int
+    duplicate_rate: float
+    malformed_rate: float
+    seed: int
+        Seed of the random generator.
+    """
+    for one_rate in [annotation_density, duplicate_rate, malformed_rate]:
+      if not 0.0 <= one_rate <= 1.0:
+        raise ValueError("Rates should be in [0, 1].")
+    if max_terms < 1:
+      raise ValueError("max_terms should be positive.")
+    self.annotation_density = annotation_density
+    self.ontology_mix = DEFAULT_ONTOLOGY_MIX if ontology_mix is None else ontology_mix
+    self.qualifier_mix = DEFAULT_QUALIFIER_MIX if qualifier_mix is None else qualifier_mix
+    for one_qual in self.qualifier_mix:
+      if one_qual not in QUALIFIER_TO_BQB:
+        raise ValueError("Unknown qualifier: %s." % one_qual)
+    self.max_terms = max_terms
+    self.duplicate_rate = duplicate_rate
+    self.malformed_rate = malformed_rate
+    self.seed = seed
+    self._random = random.Random(seed)
+    self._term_pools = dict()
+
+  def _getTermPool(self, ontology):
+    """
+    Well-formed terms of a shipped ontology graph, sorted.
+    """
+    if ontology not in self._term_pools:
+      self._term_pools[ontology] = sorted([one_term for one_term in da.getGraph(ontology).nodes \
+                                           if ids.checkIdentifier(ontology, one_term) is None])
+    return self._term_pools[ontology]
+
+  def getTerm(self, ontology):
+    """
+    Draw a well-formed term.
+
+    Parameters
+    ----------
+    ontology: str
+        Item of cn.KNOWLEDGE_TYPES_REP.
+
+    Returns
+    -------
+    '': str
+    """
+    if ontology in ['go', 'sbo', 'chebi']:
+      return self._random.choice(self._getTermPool(ontology))
+    num = self._random.randint(1, 99999)
+    if ontology == 'kegg_species':
+      return "C%05d" % num
+    elif ontology == 'kegg_process':
+      return "R%05d" % num
+    elif ontology == 'uniprot':
+      return "P%05d" % num
+    raise ValueError("Unknown ontology: %s." % ontology)
+
+  def _malform(self, term):
+    """
+    Make a term malformed.
+    """
+    kind = self._random.choice(MALFORMED_KINDS)
+    if kind == 'stray_quote':
+      return term + "'"
+    elif kind == 'wrong_prefix':
+      return 'X' + term.split(':')[-1]
+    return term[:-1] + '_'
+
+  def _choose(self, mix):
+    """
+    Draw a key of {key: probability}.
+    """
+    keys = sorted(mix.keys())
+    return self._random.choices(keys, weights=[mix[k] for k in keys])[0]
+
+  def _getAnnotation(self, object_type, previous):
+    """
+    Draw the annotation of one entity.
+
+    Parameters
+    ----------
+    object_type: str
+    previous: list
+        Earlier annotations of the object type.
+
+    Returns
+    -------
+    '': (str, str, str-list)/None
+        (ontology, qualifier, terms), or None if not annotated.
+    """
+    mix = self.ontology_mix.get(object_type)
+    if not mix or self._random.random() >= self.annotation_density:
+      return None
+    if previous and self._random.random() < self.duplicate_rate:
+      return self._random.choice(previous)
+    ontology = self._choose(mix)
+    qualifier = self._choose(self.qualifier_mix)
+    num_terms = 1 if ontology == 'sbo' else self._random.randint(1, self.max_terms)
+    terms = [self.getTerm(ontology) for _ in range(num_terms)]
+    if ontology != 'sbo':
+      terms = [self._malform(t) if self._random.random() < self.malformed_rate else t \
+               for t in terms]
+    annotation = (ontology, qualifier, terms)
+    previous.append(annotation)
+    return annotation
+
+  def _annotate(self, sbase, annotation):
+    """
+    Add an annotation to an SBML element.
+    SBO terms are set as sboTerm attributes,
+    others as identifiers.org URIs.
+    """
+    if annotation is None:
+      return
+    ontology, qualifier, terms = annotation
+    if ontology == 'sbo':
+      sbase.setSBOTerm(terms[0])
+      return
+    cv_term = libsbml.CVTerm(libsbml.BIOLOGICAL_QUALIFIER)
+    cv_term.setBiologicalQualifierType(QUALIFIER_TO_BQB[qualifier])
+    for one_term in terms:
+      cv_term.addResource("http://identifiers.org/%s/%s" % (ONT_TO_NAMESPACE[ontology], one_term))
+    sbase.addCVTerm(cv_term)
+
+  def generate(self, num_compartments=1, num_species=100, num_reactions=100):
+    """
+    Create an SBML document.
+
+    Parameters
+    ----------
+    num_compartments: int
+    num_species: int
+    num_reactions: int
+
+    Returns
+    -------
+    document: libsbml.SBMLDocument
+    """
+    if num_compartments < 1 and (num_species or num_reactions):
+      raise ValueError("Species and reactions need a compartment.")
+    self._random.seed(self.seed)
+    document = libsbml.SBMLDocument(SBML_LEVEL, SBML_VERSION)
+    model = document.createModel()
+    model.setId('synthetic_model')
+    model.setMetaId('meta_synthetic_model')
+    previous = {'compartment': [], 'species': [], 'reaction': []}
+    compartment_ids = []
+    for idx in range(num_compartments):
+      compartment = model.createCompartment()
+      compartment.setId('C%d' % idx)
+      compartment.setMetaId('meta_C%d' % idx)
+      compartment.setConstant(True)
+      compartment.setSize(1.0)
+      compartment.setSpatialDimensions(3)
+      self._annotate(compartment, self._getAnnotation('compartment', previous['compartment']))
+      compartment_ids.append(compartment.getId())
+    species_ids = []
+    for idx in range(num_species):
+      species = model.createSpecies()
+      species.setId('S%d' % idx)
+      species.setMetaId('meta_S%d' % idx)
+      species.setCompartment(compartment_ids[idx % num_compartments])
+      species.setInitialConcentration(1.0)
+      species.setHasOnlySubstanceUnits(False)
+      species.setBoundaryCondition(False)
+      species.setConstant(False)
+      self._annotate(species, self._getAnnotation('species', previous['species']))
+      species_ids.append(species.getId())
+    for idx in range(num_reactions):
+      reaction = model.createReaction()
+      reaction.setId('R%d' % idx)
+      reaction.setMetaId('meta_R%d' % idx)
+      reaction.setReversible(False)
+      reaction.setFast(False)
+      if species_ids:
+        for one_reference in [reaction.createReactant(), reaction.createProduct()]:
+          one_reference.setSpecies(self._random.choice(species_ids))
+          one_reference.setStoichiometry(1.0)
+          one_reference.setConstant(True)
+      self._annotate(reaction, self._getAnnotation('reaction', previous['reaction']))
+    return document
+
+  def write(self, file, num_compartments=1, num_species=100, num_reactions=100):
+    """
+    Write an SBML file.
+
+    Parameters
+    ----------
+    file: str
+        Location of the .xml file.
+    num_compartments: int
+    num_species: int
+    num_reactions: int
+    """
+    document = self.generate(num_compartments=num_compartments,
+                             num_species=num_species,
+                             num_reactions=num_reactions)
+    if not libsbml.writeSBMLToFile(document, file):
+      raise ValueError("Cannot write %s." % file)
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Generate a synthetic SBML model.')
+  parser.add_argument('output', help='Model file (.xml).')
+  parser.add_argument('--compartments', type=int, default=1)
+  parser.add_argument('--species', type=int, default=100)
+  parser.add_argument('--reactions', type=int, default=100)
+  parser.add_argument('--density', type=float, default=0.8,
+      help='Fraction of annotated entities (default: 0.8).')
+  parser.add_argument('--max-terms', type=int, default=2,
+      help='Maximum number of terms of one annotation (default: 2).')
+  parser.add_argument('--duplicate-rate', type=float, default=0.1,
+      help='Fraction of repeated annotations (default: 0.1).')
+  parser.add_argument('--malformed-rate', type=float, default=0.0,
+      help='Fraction of malformed identifiers (default: 0).')
+  parser.add_argument('--seed', type=int, default=0)
+  args = parser.parse_args(argv)
+  generator = ModelGenerator(annotation_density=args.density,
+                             max_terms=args.max_terms,
+                             duplicate_rate=args.duplicate_rate,
+                             malformed_rate=args.malformed_rate,
+                             seed=args.seed)
+  generator.write(args.output, num_compartments=args.compartments,
+                  num_species=args.species, num_reactions=args.reactions)
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,143 @@
+# ontology_slice.py
+"""
+Corpus-driven ontology slices.
+A slice keeps, for each DAG ontology, only the terms
+a corpus uses and the terms above them (up to the roots),
+with the subtree sizes that specificity needs
+precomputed for the used terms and the roots.
+Consistency and specificity on a slice are the same as
+on the full graphs, for the terms of the corpus;
+other terms raise ValueError.
+A slice is tied to the version of the ontology artifacts
+it was made from (see manifest.getOntologyVersion).
+
+Example
+-------
+makeSlice(files, 'corpus_slice.pickle')
+dag_analyzer.setSlice('corpus_slice.pickle')
+"""
+
+import os
+from SBMate import dag_analyzer as da
+from SBMate import manifest as mf
+from SBMate import sbml_annotation as sa
+
+SLICE_FORMAT = 1
+
+
+def getCorpusTerms(file_list):
+  """
+  Get the terms of DAG ontologies used by models.
+
+  Parameters
+  ----------
+  file_list: str-list
+      Locations of model files (.xml).
+
+  Returns
+  -------
+  '': dict
+      Dictionary of {ontology: set of terms}.
+  """
+  terms = {one_ont: set() for one_ont in da.ONT_TO_FILE}
+  for one_file in file_list:
+    annotations = sa.SBMLAnnotation(file=one_file)
+    for one_anot in annotations.annotations.values():
+      for one_ont in terms:
+        terms[one_ont].update([t for t in (one_anot[one_ont] or []) if isinstance(t, str)])
+  return terms
+
+
+def sliceGraph(graph, terms, roots):
+  """
+  Get the slice of one ontology graph.
+
+  Parameters
+  ----------
+  graph: networkx.DiGraph
+      Full graph; edges go from a term to its parents.
+  terms: str-set
+      Terms to cover; terms not in graph are allowed.
+  roots: str-list
+      Roots of the ontology (see dag_analyzer.ONT_TO_ROOT).
+
+  Returns
+  -------
+  '': networkx.DiGraph
+      Subgraph of the terms, their parents
+      (recursively) and the roots. Used terms and roots
+      have the node attribute dag_analyzer.SUBTREE_SIZE;
+      graph attribute dag_analyzer.SLICE_TERMS holds terms.
+  """
+  import networkx as nx
+  counted = set([t for t in terms if t in graph] + [r for r in roots if r in graph])
+  nodes = set(counted)
+  for one_term in counted:
+    nodes.update(nx.descendants(graph, one_term))
+  res = graph.subgraph(nodes).copy()
+  for one_term in counted:
+    res.nodes[one_term][da.SUBTREE_SIZE] = len(nx.ancestors(graph, one_term)) + 1
+  res.graph[da.SLICE_TERMS] = frozenset(terms)
+  return res
+
+
+def makeSlice(file_list, path):
+  """
+  Scan models for the terms they use
+  and write the slice of the ontology graphs.
+
+  Parameters
+  ----------
+  file_list: str-list
+      Locations of model files (.xml).
+  path: str
+      Location of the slice file.
+
+  Returns
+  -------
+  '': dict
+      Dictionary of {ontology: (number of terms, number of nodes)}.
+  """
+  import pickle5 as pickle
+  terms = getCorpusTerms(file_list)
+  graphs = {one_ont: sliceGraph(da.loadGraphFile(one_ont), terms[one_ont],
+                                da.ONT_TO_ROOT[one_ont]) \
+            for one_ont in da.ONT_TO_FILE}
+  artifact = {'format': SLICE_FORMAT,
+              'ontology_version': mf.getOntologyVersion(),
+              'graphs': graphs}
+  dir_name = os.path.dirname(os.path.abspath(path))
+  os.makedirs(dir_name, exist_ok=True)
+  tmp_path = '%s.%d.tmp' % (path, os.getpid())
+  with open(tmp_path, 'wb') as f:
+    pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+  os.replace(tmp_path, path)
+  return {one_ont: (len(terms[one_ont]), graphs[one_ont].number_of_nodes()) \
+          for one_ont in graphs}
+
+
+def loadSlice(path):
+  """
+  Load the graphs of a slice.
+  Raises ValueError if the slice was made
+  from other ontology artifacts.
+
+  Parameters
+  ----------
+  path: str
+      Location of the slice file.
+
+  Returns
+  -------
+  '': dict
+      Dictionary of {ontology: networkx.DiGraph}.
+  """
+  import pickle5 as pickle
+  with open(path, 'rb') as f:
+    artifact = pickle.load(f)
+  if not isinstance(artifact, dict) or artifact.get('format') != SLICE_FORMAT:
+    raise ValueError("Not an ontology slice: %s." % path)
+  if artifact['ontology_version'] != mf.getOntologyVersion():
+    raise ValueError("Ontology slice %s was made from other ontology artifacts; "
+                     "make it again." % path)
+  return artifact['graphs']
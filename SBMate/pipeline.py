@@ -0,0 +1,374 @@
+# pipeline.py
+"""
+Staged pipeline for scoring many models.
+1. parse: SBML files are parsed and annotations
+   extracted in worker processes (CPU-bound).
+2. validate: local (ontology graph) checks are made first;
+   UniProt/KEGG terms of the entities that pass them are
+   looked up by a pool of threads (network-bound),
+   filling uka.VALIDATION_CACHE.
+3. aggregate: metrics are calculated;
+   remote lookups are then cache hits.
+Stages are connected by bounded queues,
+so a slow stage makes the faster ones wait
+instead of accumulating models in memory.
+If a stage fails or the consumer stops early,
+the stages are stopped and the parse processes shut down.
+"""
+
+from concurrent import futures
+import queue
+import threading
+import time
+from SBMate import context as mctx
+from SBMate import sbml_annotation as sa
+from SBMate import uniprot_kegg_analyzer as uka
+
+# marks the end of the input of a stage
+_DONE = object()
+# prefix of the names of stage threads
+THREAD_PREFIX = 'sbmate-pipeline-'
+# seconds between checks of the stop event by blocked stages
+_POLL_INTERVAL = 0.1
+
+
+class _StageError(object):
+  """
+  Exception raised in a stage,
+  passed downstream and raised by the aggregate stage.
+  """
+
+  def __init__(self, error):
+    self.error = error
+
+
+class StageStats(object):
+  """
+  Counters of one pipeline stage.
+
+  Attributes
+  ----------
+  name: str
+      Name of the stage.
+  num_items: int
+      Number of models processed.
+  busy_time: float
+      Seconds spent processing models
+      (summed over the workers of the stage).
+  wait_time: float
+      Seconds spent blocked on a full output queue.
+  max_queue_size: int
+      Largest number of models waiting
+      in the input queue of the stage.
+  """
+
+  def __init__(self, name):
+    self.name = name
+    self.num_items = 0
+    self.busy_time = 0.0
+    self.wait_time = 0.0
+    self.max_queue_size = 0
+    self._lock = threading.Lock()
+
+  def add(self, busy_time=0.0, wait_time=0.0, queue_size=0):
+    """
+    Record one processed model.
+
+    Parameters
+    ----------
+    busy_time: float
+    wait_time: float
+    queue_size: int
+        Size of the input queue when the model was taken.
+    """
+    with self._lock:
+      self.num_items += 1
+      self.busy_time += busy_time
+      self.wait_time += wait_time
+      self.max_queue_size = max(self.max_queue_size, queue_size)
+
+  def getThroughput(self):
+    """
+    Returns
+    -------
+    '': float/None
+        Models per busy second of one worker.
+    """
+    if self.busy_time == 0.0:
+      return None
+    return self.num_items / self.busy_time
+
+  def __repr__(self):
+    return "%s: %d models, busy %.3f s, waiting %.3f s, max queue %d" % \
+           (self.name, self.num_items, self.busy_time,
+            self.wait_time, self.max_queue_size)
+
+
+class ScoringPipeline(object):
+  """
+  Pipeline overlapping SBML parsing,
+  network validation and metric calculation.
+
+  Attributes
+  ----------
+  parse_workers: int
+      Number of processes parsing models.
+  validation_workers: int
+      Number of threads querying remote resources.
+  queue_size: int
+      Capacity of the queues between stages.
+  stats: dict
+      Dictionary of {stage name: StageStats} of the last run.
+
+  Methods
+  -------
+  run (file_list, metrics_class)
+      Score models, yielding them as they are finished.
+  """
+
+  def __init__(self, parse_workers=2, validation_workers=8, queue_size=4,
+               metric_calculator_classes=None):
+    """
+    Parameters
+    ----------
+    parse_workers: int
+    validation_workers: int
+    queue_size: int
+    metric_calculator_classes: list-type
+        Passed on to AnnotationMetrics.
+    """
+    self.parse_workers = parse_workers
+    self.validation_workers = validation_workers
+    self.queue_size = queue_size
+    self.metric_calculator_classes = metric_calculator_classes
+    self.stats = dict()
+
+  def run(self, file_list, metrics_class, memo=None, budget=None, model_deadline=None,
+          keep_annotations=True, defer_aggregation=False):
+    """
+    Score models.
+
+    Parameters
+    ----------
+    file_list: str-list
+        Model files.
+    metrics_class: class
+        sbmate.AnnotationMetrics (or a subclass).
+    memo: analysis_memo.AnalysisMemo
+        Memo of analyzers, shared across models.
+    budget: budget.TimeBudget
+        Time budget of remote lookups of the batch.
+    model_deadline: float
+        Time budget (seconds) of remote lookups of each model,
+        from the start of its validation.
+    keep_annotations: bool
+        If False, annotations are released
+        once each model is scored.
+    defer_aggregation: bool
+        If True, metrics are left to be aggregated
+        with other models; see AnnotationMetrics.
+
+    Yields
+    ------
+    (model_file, metrics): (str, AnnotationMetrics)
+        In the order models are finished.
+    """
+    self.stats = {name: StageStats(name) for name in ['parse', 'validate', 'aggregate']}
+    parsed_queue = queue.Queue(maxsize=self.queue_size)
+    validated_queue = queue.Queue(maxsize=self.queue_size)
+    stop = threading.Event()
+    threads = [threading.Thread(target=self._runParseStage,
+                                args=(file_list, parsed_queue, stop),
+                                name=THREAD_PREFIX + 'parse', daemon=True)]
+    threads = threads + [threading.Thread(target=self._runValidationStage,
+                                          args=(parsed_queue, validated_queue, stop,
+                                                memo, budget, model_deadline),
+                                          name=THREAD_PREFIX + 'validate',
+                                          daemon=True) \
+                         for _ in range(self.validation_workers)]
+    for one_thread in threads:
+      one_thread.start()
+    try:
+      num_done = 0
+      while num_done < self.validation_workers:
+        queue_size = validated_queue.qsize()
+        item = validated_queue.get()
+        if item is _DONE:
+          num_done += 1
+          continue
+        if isinstance(item, _StageError):
+          raise item.error
+        model_file, annotations, context = item
+        start = time.perf_counter()
+        metrics = metrics_class(model_file=model_file,
+                                metric_calculator_classes=self._getCalculatorClasses(),
+                                annotations=annotations,
+                                memo=memo,
+                                context=context,
+                                keep_annotations=keep_annotations,
+                                defer_aggregation=defer_aggregation)
+        self.stats['aggregate'].add(busy_time=time.perf_counter()-start,
+                                    queue_size=queue_size)
+        yield model_file, metrics
+    finally:
+      # also on errors and when the consumer stops early
+      stop.set()
+      for one_thread in threads:
+        one_thread.join()
+      for one_queue in [parsed_queue, validated_queue]:
+        _drain(one_queue)
+
+  def _getCalculatorClasses(self):
+    """
+    A new list each time, as AnnotationMetrics appends to it.
+    """
+    if self.metric_calculator_classes is None:
+      return None
+    return list(self.metric_calculator_classes)
+
+  def _put(self, out_queue, item, stop):
+    """
+    Put that blocks until there is room
+    or the pipeline is stopped (item is then dropped).
+
+    Returns
+    -------
+    '': float
+        Seconds blocked.
+    """
+    start = time.perf_counter()
+    while not stop.is_set():
+      try:
+        out_queue.put(item, timeout=_POLL_INTERVAL)
+        break
+      except queue.Full:
+        pass
+    return time.perf_counter() - start
+
+  def _get(self, in_queue, stop):
+    """
+    Get that blocks until there is an item
+    or the pipeline is stopped (_DONE is then returned).
+    """
+    while not stop.is_set():
+      try:
+        return in_queue.get(timeout=_POLL_INTERVAL)
+      except queue.Empty:
+        pass
+    return _DONE
+
+  def _runParseStage(self, file_list, out_queue, stop):
+    """
+    Parse models in worker processes,
+    with at most parse_workers models in flight.
+    When stopped or on an error, pending parses are cancelled
+    and the processes are shut down without waiting.
+    """
+    stats = self.stats['parse']
+    executor = None
+    in_flight = set()
+    completed = False
+    try:
+      executor = futures.ProcessPoolExecutor(max_workers=self.parse_workers)
+      for one_file in file_list:
+        if stop.is_set():
+          break
+        in_flight.add(executor.submit(_parseModelFile, one_file))
+        if len(in_flight) >= self.parse_workers:
+          in_flight = self._putParsed(in_flight, out_queue, stats, stop,
+                                      futures.FIRST_COMPLETED)
+      while in_flight and not stop.is_set():
+        in_flight = self._putParsed(in_flight, out_queue, stats, stop,
+                                    futures.FIRST_COMPLETED)
+      completed = not stop.is_set()
+    except Exception as e:
+      self._put(out_queue, _StageError(e), stop)
+    finally:
+      for one_future in in_flight:
+        one_future.cancel()
+      if executor is not None:
+        executor.shutdown(wait=completed)
+    for _ in range(self.validation_workers):
+      self._put(out_queue, _DONE, stop)
+
+  def _putParsed(self, in_flight, out_queue, stats, stop, return_when):
+    """
+    Wait for parsed models and pass them on.
+
+    Returns
+    -------
+    '': set
+        Futures still in flight.
+    """
+    finished = set()
+    while not finished and not stop.is_set():
+      finished, in_flight = futures.wait(in_flight, timeout=_POLL_INTERVAL,
+                                         return_when=return_when)
+    for one_future in finished:
+      model_file, annotations, busy_time = one_future.result()
+      wait_time = self._put(out_queue, (model_file, annotations), stop)
+      stats.add(busy_time=busy_time, wait_time=wait_time)
+    return in_flight
+
+  def _runValidationStage(self, in_queue, out_queue, stop, memo=None,
+                          budget=None, model_deadline=None):
+    """
+    Query remote terms of each model,
+    filling uka.VALIDATION_CACHE.
+    Entities failing the local checks are not queried;
+    the context holding the local results is passed on.
+    """
+    stats = self.stats['validate']
+    while True:
+      queue_size = in_queue.qsize()
+      item = self._get(in_queue, stop)
+      if item is _DONE or isinstance(item, _StageError):
+        self._put(out_queue, item, stop)
+        if item is _DONE:
+          return
+        continue
+      start = time.perf_counter()
+      try:
+        model_file, annotations = item
+        model_budget = None if budget is None else budget.getChild(model_deadline)
+        context = mctx.ModelContext(annotations, memo=memo, budget=model_budget)
+        for one_ont, one_term in context.getPendingRemoteTerms():
+          uka.validateTerm(one_ont, one_term, offline=uka.NonDAGAnalyzer.offline,
+                           budget=model_budget)
+        item = (model_file, annotations, context)
+      except Exception as e:
+        item = _StageError(e)
+      busy_time = time.perf_counter() - start
+      wait_time = self._put(out_queue, item, stop)
+      stats.add(busy_time=busy_time, wait_time=wait_time, queue_size=queue_size)
+
+
+def _drain(one_queue):
+  """
+  Remove the items left in a queue.
+  """
+  while True:
+    try:
+      one_queue.get_nowait()
+    except queue.Empty:
+      return
+
+
+def _parseModelFile(model_file):
+  """
+  Parse one model in a worker process.
+
+  Parameters
+  ----------
+  model_file: str
+
+  Returns
+  -------
+  model_file: str
+  annotations: sbml_annotation.SBMLAnnotation
+  busy_time: float
+      Seconds spent parsing.
+  """
+  start = time.perf_counter()
+  annotations = sa.SBMLAnnotation(file=model_file)
+  return model_file, annotations, time.perf_counter() - start
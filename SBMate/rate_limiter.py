@@ -0,0 +1,190 @@
+# rate_limiter.py
+"""
+Token-bucket rate limiter of remote lookups, per host.
+The state of each bucket is kept in a small file,
+locked with fcntl while it is updated, so all processes
+on a machine using the same state directory share
+one request rate per host.
+Without fcntl (e.g., on Windows), only threads
+of one process are coordinated.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from urllib import parse
+
+try:
+  import fcntl
+except ImportError:
+  fcntl = None
+
+# {host: requests per second}
+DEFAULT_RATES = {'www.uniprot.org': 10.0,
+                 'rest.uniprot.org': 10.0,
+                 'www.genome.jp': 3.0,
+                }
+DEFAULT_STATE_DIR = os.path.join(tempfile.gettempdir(), 'sbmate_rate_limits')
+
+
+class RateLimiter(object):
+  """
+  Shared token buckets, one per host.
+  Each bucket holds up to 'burst' tokens
+  and is refilled at 'rate' tokens per second;
+  a request takes one token, or reserves the next one
+  and waits for it.
+
+  Attributes
+  ----------
+  rates: dict
+      Dictionary of {host: requests per second}.
+  default_rate: float/None
+      Rate of hosts not in rates; if None, they are not limited.
+  burst: float/None
+      Bucket capacity; if None, one second of requests.
+  state_dir: str
+      Directory of the bucket files.
+  total_wait: float
+      Seconds this process waited for tokens.
+
+  Methods
+  -------
+  reserve (url)
+      Take a token of the host of url.
+  acquire (url)
+      Take a token, waiting until it is available.
+  """
+
+  def __init__(self, rates=None, default_rate=None, burst=None, state_dir=None):
+    """
+    Parameters
+    ----------
+    rates: dict
+        Dictionary of {host: requests per second};
+        if None, DEFAULT_RATES.
+    default_rate: float/None
+    burst: float/None
+    state_dir: str/None
+        If None, DEFAULT_STATE_DIR.
+        Processes sharing the directory share the rates.
+    """
+    if rates is None:
+      rates = dict(DEFAULT_RATES)
+    for one_rate in list(rates.values()) + [default_rate]:
+      if one_rate is not None and one_rate <= 0:
+        raise ValueError("Rates should be positive.")
+    self.rates = rates
+    self.default_rate = default_rate
+    self.burst = burst
+    self.state_dir = DEFAULT_STATE_DIR if state_dir is None else state_dir
+    self.total_wait = 0.0
+    self._lock = threading.Lock()
+
+  def __getstate__(self):
+    # sent to worker processes without the lock
+    state = dict(self.__dict__)
+    del state['_lock']
+    return state
+
+  def __setstate__(self, state):
+    self.__dict__.update(state)
+    self._lock = threading.Lock()
+
+  def getRate(self, host):
+    """
+    Parameters
+    ----------
+    host: str
+
+    Returns
+    -------
+    '': float/None
+        Requests per second, or None if not limited.
+    """
+    return self.rates.get(host, self.default_rate)
+
+  def getStateFile(self, host):
+    """
+    Parameters
+    ----------
+    host: str
+
+    Returns
+    -------
+    '': str
+        Location of the bucket file of the host.
+    """
+    return os.path.join(self.state_dir, host.replace(':', '_') + '.bucket')
+
+  def reserve(self, url, now=None):
+    """
+    Take a token of the host of url.
+    If the bucket is empty, the next token is
+    reserved, so concurrent callers are served in order.
+
+    Parameters
+    ----------
+    url: str
+    now: float/None
+        Current time (time.time()), for testing.
+
+    Returns
+    -------
+    '': float
+        Seconds to wait before the request.
+    """
+    host = parse.urlsplit(url).netloc
+    rate = self.getRate(host)
+    if rate is None:
+      return 0.0
+    burst = rate if self.burst is None else self.burst
+    os.makedirs(self.state_dir, exist_ok=True)
+    with self._lock:
+      with open(self.getStateFile(host), 'a+') as f:
+        if fcntl is not None:
+          fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+          if now is None:
+            now = time.time()
+          f.seek(0)
+          fields = f.read().split()
+          if len(fields) == 2:
+            tokens, last = float(fields[0]), float(fields[1])
+            # clocks of callers may be slightly behind the last update
+            tokens = min(burst, tokens + max(0.0, now - last) * rate)
+            now = max(now, last)
+          else:
+            tokens = burst
+          tokens = tokens - 1.0
+          wait = 0.0 if tokens >= 0.0 else -tokens / rate
+          f.seek(0)
+          f.truncate()
+          f.write("%r %r\n" % (tokens, now))
+          f.flush()
+        finally:
+          if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_UN)
+    return wait
+
+  def acquire(self, url):
+    """
+    Take a token of the host of url,
+    waiting until it is available.
+
+    Parameters
+    ----------
+    url: str
+
+    Returns
+    -------
+    '': float
+        Seconds waited.
+    """
+    wait = self.reserve(url)
+    if wait > 0.0:
+      time.sleep(wait)
+      self.total_wait += wait
+    return wait
+
@@ -0,0 +1,262 @@
+# sampling.py
+"""
+Sampling-based approximate scoring.
+Consistency and specificity are estimated from a
+random sample of the annotated entities, stratified by
+object type (species, reactions, ...), so that only the
+sampled entities are checked (and their UniProt/KEGG terms
+looked up). Coverage stays exact.
+1. consistency: stratified estimate of the proportion
+   of consistent entities.
+2. specificity: combined ratio estimate of the mean
+   specificity of consistent entities
+   (linearized variance).
+Confidence intervals are normal intervals,
+with the finite population correction.
+Samples are drawn with a seed derived from the seed
+of the plan and the model name, so results do not depend
+on the order of models or on the number of workers.
+
+Example
+-------
+plan = SamplingPlan(error_bound=0.05)
+AnnotationMetrics.getMetrics(files, output="table", sampling=plan)
+"""
+
+import math
+import random
+import statistics
+
+# columns added to metrics rows scored with a SamplingPlan
+APPROXIMATE = 'approximate'
+SAMPLE_SIZE = 'sample_size'
+CONSISTENCY_LOW = 'consistency_ci_low'
+CONSISTENCY_HIGH = 'consistency_ci_high'
+SPECIFICITY_LOW = 'specificity_ci_low'
+SPECIFICITY_HIGH = 'specificity_ci_high'
+COLUMNS = [APPROXIMATE, SAMPLE_SIZE, CONSISTENCY_LOW, CONSISTENCY_HIGH,
+           SPECIFICITY_LOW, SPECIFICITY_HIGH]
+# decimals of confidence bounds
+CI_DECIMALS = 4
+
+
+class SamplingPlan(object):
+  """
+  Sample of the annotated entities of each model.
+
+  Attributes
+  ----------
+  sample_size: int/None
+      Number of annotated entities to score.
+  error_bound: float/None
+      Half-width of the confidence interval of
+      consistency to achieve, in the worst case (p=0.5).
+  confidence: float
+      Confidence level of the intervals.
+  seed: int
+      Seed of the random samples.
+
+  Methods
+  -------
+  getSampleSize (num_entities)
+      Get the number of entities to sample.
+  getZ ()
+      Get the normal quantile of the confidence level.
+  getRandom (model_name)
+      Get the random generator of a model.
+  """
+
+  def __init__(self, sample_size=None, error_bound=None, confidence=0.95, seed=0):
+    """
+    Parameters
+    ----------
+    sample_size: int
+    error_bound: float
+        Exactly one of sample_size and error_bound should be given.
+    confidence: float
+    seed: int
+    """
+    if (sample_size is None) == (error_bound is None):
+      raise ValueError("Exactly one of sample_size and error_bound should be given.")
+    if sample_size is not None and sample_size < 1:
+      raise ValueError("Sample size should be positive: %s." % sample_size)
+    if error_bound is not None and not 0 < error_bound < 1:
+      raise ValueError("Error bound should be between 0 and 1: %s." % error_bound)
+    if not 0 < confidence < 1:
+      raise ValueError("Confidence should be between 0 and 1: %s." % confidence)
+    self.sample_size = sample_size
+    self.error_bound = error_bound
+    self.confidence = confidence
+    self.seed = seed
+
+  def getZ(self):
+    """
+    Returns
+    -------
+    '': float
+    """
+    return statistics.NormalDist().inv_cdf((1 + self.confidence) / 2)
+
+  def getSampleSize(self, num_entities):
+    """
+    Parameters
+    ----------
+    num_entities: int
+        Number of annotated entities of the model.
+
+    Returns
+    -------
+    '': int
+        At most num_entities.
+    """
+    if self.sample_size is not None:
+      return min(self.sample_size, num_entities)
+    size = self.getZ()**2 * 0.25 / self.error_bound**2
+    # finite population correction
+    size = size / (1 + (size - 1) / num_entities) if num_entities else 0
+    return min(int(math.ceil(size)), num_entities)
+
+  def getRandom(self, model_name):
+    """
+    Parameters
+    ----------
+    model_name: str
+
+    Returns
+    -------
+    '': random.Random
+    """
+    return random.Random('%s:%s' % (self.seed, model_name))
+
+
+def isSampled(row):
+  """
+  Check whether a metrics row was
+  scored with a SamplingPlan.
+
+  Parameters
+  ----------
+  row: dict
+      Metrics row, {'index', 'columns', 'data'}.
+
+  Returns
+  -------
+  '': bool
+  """
+  return APPROXIMATE in row['columns']
+
+
+def selectSample(strata, sample_size, rng):
+  """
+  Select a stratified random sample,
+  allocated in proportion to the size of strata
+  (at least two entities per stratum, if it has them).
+
+  Parameters
+  ----------
+  strata: dict
+      Dictionary of {stratum: entity-list}.
+  sample_size: int
+  rng: random.Random
+
+  Returns
+  -------
+  '': dict
+      Dictionary of {stratum: sampled entity-list}.
+  """
+  num_entities = sum([len(v) for v in strata.values()])
+  res = dict()
+  for one_stratum in sorted(strata.keys(), key=str):
+    entities = strata[one_stratum]
+    share = int(round(sample_size * len(entities) / num_entities))
+    res[one_stratum] = rng.sample(entities, min(len(entities), max(share, 2)))
+  return res
+
+
+def _getStratumVariance(values):
+  """
+  Sample variance; 0.0 for fewer than two values.
+  """
+  if len(values) < 2:
+    return 0.0
+  return statistics.variance(values)
+
+
+def estimateProportion(strata_sizes, strata_values):
+  """
+  Stratified estimate of a proportion (or mean).
+
+  Parameters
+  ----------
+  strata_sizes: dict
+      Dictionary of {stratum: number of entities}.
+  strata_values: dict
+      Dictionary of {stratum: values of the sampled entities}.
+
+  Returns
+  -------
+  estimate: float
+  variance: float
+  """
+  num_entities = sum(strata_sizes.values())
+  estimate = 0.0
+  variance = 0.0
+  for one_stratum, values in strata_values.items():
+    weight = strata_sizes[one_stratum] / num_entities
+    fpc = 1 - len(values) / strata_sizes[one_stratum]
+    estimate += weight * statistics.fmean(values)
+    variance += weight**2 * fpc * _getStratumVariance(values) / len(values)
+  return estimate, variance
+
+
+def estimateRatio(strata_sizes, strata_numerators, strata_denominators):
+  """
+  Combined ratio estimate, e.g., the mean specificity of
+  consistent entities: sum of specificities of consistent
+  entities over the number of consistent entities.
+
+  Parameters
+  ----------
+  strata_sizes: dict
+      Dictionary of {stratum: number of entities}.
+  strata_numerators: dict
+      Dictionary of {stratum: numerator of sampled entities}.
+  strata_denominators: dict
+      Dictionary of {stratum: denominator of sampled entities}.
+
+  Returns
+  -------
+  estimate: float/None
+      None if all sampled denominators are 0.
+  variance: float/None
+  """
+  mean_num, _ = estimateProportion(strata_sizes, strata_numerators)
+  mean_den, _ = estimateProportion(strata_sizes, strata_denominators)
+  if mean_den == 0:
+    return None, None
+  estimate = mean_num / mean_den
+  residuals = {k: [y - estimate * x for y, x in zip(strata_numerators[k],
+                                                    strata_denominators[k])] \
+               for k in strata_numerators}
+  _, variance = estimateProportion(strata_sizes, residuals)
+  return estimate, variance / mean_den**2
+
+
+def getInterval(estimate, variance, z):
+  """
+  Normal confidence interval, within [0, 1].
+
+  Parameters
+  ----------
+  estimate: float
+  variance: float
+  z: float
+      Normal quantile.
+
+  Returns
+  -------
+  '': (float, float)
+  """
+  half_width = z * math.sqrt(max(variance, 0.0))
+  return (round(max(estimate - half_width, 0.0), CI_DECIMALS),
+          round(min(estimate + half_width, 1.0), CI_DECIMALS))
@@ -1,10 +1,26 @@
 # sbmate.py
 # calculate annotation scores
 
-import pandas as pd
+import itertools
+from concurrent import futures
+from SBMate import aggregation as agg
+from SBMate import analysis_memo as am
+from SBMate import budget as bd
+from SBMate import checkpoint as ck
+from SBMate import constants as cn
+from SBMate import context as mctx
+from SBMate import dag_analyzer as da
+from SBMate import instrumentation as ins
+from SBMate import manifest as mf
+from SBMate import sampling as sp
 from SBMate import sbml_annotation as sa
+from SBMate import sharding as sh
+from SBMate import uniprot_kegg_analyzer as uka
 from SBMate.metric_calculator import MetricCalculator
 
+# models of a batch run whose metrics are aggregated in one pass
+AGGREGATION_BATCH_SIZE = 100
+
 
 class AnnotationMetrics(object):
   """
@@ -17,36 +33,153 @@ class AnnotationMetrics(object):
   Attributes
   ----------
   annotations: sbml_annotation.SBMLAnnotation
-      Sorted annotations for each knowledge resource.
-  calculatorDf: dataframe of metrics.
+      Sorted annotations for each knowledge resource;
+      None if not kept (see keep_annotations).
+  entity_table: aggregation.EntityTable/None
+      Outcomes of the entities of the model,
+      if kept (see keep_entities).
+  metrics_row: dict
+      Metrics of the model, {'index', 'columns', 'data'}.
+  remote_results: dict/None
+      Results of the remote lookups the metrics depend on,
+      see context.ModelContext.remote_results.
+  metrics_df: pandas.DataFrame
+      Dataframe of metrics, created from metrics_row
+      when it is first accessed.
   """
 
-  def __init__(self, model_file=None, metric_calculator_classes=None):
+  def __init__(self, model_file=None, metric_calculator_classes=None,
+               annotations=None, memo=None, context=None, budget=None,
+               sampling=None, keep_annotations=True, keep_entities=False,
+               defer_aggregation=False):
     """
     Parameters
     ----------
     model_file: str
         Address/name of the .xml model file
     metric_calculator_classes: list-type
+    annotations: sbml_annotation.SBMLAnnotation
+        Annotations of model_file, if already extracted.
+    memo: analysis_memo.AnalysisMemo
+        Memo of analyzers, shared across models.
+    context: context.ModelContext
+        Context of annotations, if already (partly) populated.
+    budget: budget.TimeBudget
+        If given, time budget of remote lookups;
+        columns 'provisional' and 'unresolved_terms' are added
+        (also without budget, if a lookup failed).
+    sampling: sampling.SamplingPlan
+        If given, MetricCalculator estimates consistency and
+        specificity from a sample of the annotated entities;
+        columns of sampling.COLUMNS are added.
+    keep_annotations: bool
+        If False, annotations (and the context of the model)
+        are released once the metrics are calculated,
+        so only the metrics row (and entity_table) is kept.
+    keep_entities: bool
+        If True, the entity outcomes of MetricCalculator
+        are kept as entity_table (not with sampling,
+        unless the whole model is scored).
+    defer_aggregation: bool
+        If True, the metrics of MetricCalculator are left None,
+        and its entity outcomes are kept as entity_table,
+        to be aggregated with those of other models
+        by aggregateMetrics (not with sampling).
     """
+    self._metrics_df = None
+    self.entity_table = None
+    self.remote_results = None
+    # position of the deferred metrics in the row; None if aggregated
+    self._aggregation_offset = None
+    collector = ins.COLLECTOR
+    if collector is not None and collector.columns:
+      before = collector.getSnapshot()
+    if collector is not None:
+      collector.startModel()
     # model file can take None
     if model_file is None:
       self.annotations = None
-      self.metrics_df = None
+      self.metrics_row = None
     else:
-      self.annotations = sa.SBMLAnnotation(file=model_file)
+      if annotations is None:
+        annotations = sa.SBMLAnnotation(file=model_file)
+      self.annotations = annotations
       if metric_calculator_classes is None:
         metric_calculator_classes = []
       metric_calculator_classes.append(MetricCalculator)
-      # Calculate a DataFrame for each metric calculator
-      dfs = []
+      # Collect plain records; a DataFrame is created only if requested
+      columns = []
+      values = []
       # in case model_file is given as a path, get the last file name
       index_model_name = model_file.split('/')[-1]
+      # intermediate results are shared by the calculators declaring REQUIRES
+      if context is None:
+        context = mctx.ModelContext(self.annotations, memo=memo, budget=budget)
       for cls in metric_calculator_classes:
-        calculator = cls(annotations=self.annotations, model_name=index_model_name)
-        dfs.append(calculator.calculate())
-      # Merge the DataFrames
-      self.metrics_df = pd.concat(dfs, axis=1)
+        requires = getattr(cls, 'REQUIRES', None)
+        kwargs = dict()
+        if sampling is not None and issubclass(cls, MetricCalculator):
+          kwargs['sampling'] = sampling
+        if requires is None:
+          calculator = cls(annotations=self.annotations, model_name=index_model_name,
+                           **kwargs)
+        else:
+          # a sampling MetricCalculator checks only the sampled entities
+          if 'sampling' not in kwargs:
+            context.require(requires)
+          calculator = cls(annotations=self.annotations, model_name=index_model_name,
+                           context=context, **kwargs)
+        if defer_aggregation and cls is MetricCalculator and 'sampling' not in kwargs:
+          self.entity_table = calculator.getEntityTable()
+          # a model without entities raises, as when aggregated alone
+          if not self.entity_table.num_entities[0]:
+            agg.aggregate(self.entity_table)
+          self._aggregation_offset = len(values)
+          columns = columns + agg.METRIC_NAMES
+          values = values + [None] * len(agg.METRIC_NAMES)
+        elif hasattr(calculator, 'calculateRecord'):
+          record = calculator.calculateRecord()
+          columns = columns + list(record.keys())
+          values = values + list(record.values())
+          if keep_entities and cls is MetricCalculator:
+            self.entity_table = calculator.entity_table
+        else:
+          one_df = calculator.calculate()
+          columns = columns + list(one_df.columns)
+          values = values + list(one_df.iloc[0])
+      self.remote_results = context.remote_results
+      num_unresolved = len(context.unresolved_terms)
+      if context.budget is not None or num_unresolved > 0:
+        columns = columns + [bd.PROVISIONAL, bd.UNRESOLVED_TERMS]
+        values = values + [num_unresolved > 0, num_unresolved]
+      if collector is not None and collector.memory:
+        memory_peak = collector.endModel(index_model_name)
+      if collector is not None and collector.columns:
+        instrument_columns = collector.getColumns(before, cn.KNOWLEDGE_TYPES_REP)
+        if collector.memory:
+          instrument_columns[ins.MEMORY_PEAK] = memory_peak
+          instrument_columns[ins.RSS_MAX] = ins.getMaxRss()
+        columns = columns + list(instrument_columns.keys())
+        values = values + list(instrument_columns.values())
+      self.metrics_row = {'index': [index_model_name],
+                          'columns': columns,
+                          'data': [values]}
+      if not keep_annotations:
+        self.annotations = None
+
+  @property
+  def metrics_df(self):
+    if self._metrics_df is None and self.metrics_row is not None:
+      self._metrics_df = mkMetricsTable([self.metrics_row])
+    return self._metrics_df
+
+  @metrics_df.setter
+  def metrics_df(self, df):
+    self._metrics_df = df
+    if df is None:
+      self.metrics_row = None
+    else:
+      self.metrics_row = df.to_dict(orient='split')
 
   def _getMetricsReport(self):
     """
@@ -59,14 +192,272 @@ class AnnotationMetrics(object):
         Report summarizing the metrics df.
     """
     report = ["Summary of Metrics (%s)\n----------------------\n"
-        % self.metrics_df.index[0]]
-    report = report + ["%s: %s\n" % (col, self.metrics_df[col][0])
-        for col in self.metrics_df]
+        % self.metrics_row['index'][0]]
+    report = report + ["%s: %s\n" % (col, val)
+        for col, val in zip(self.metrics_row['columns'], self.metrics_row['data'][0])]
     report.append("----------------------\n")
     return ('').join(report)
 
+  def _getMetricsRow(self):
+    """
+    Get the row of metrics,
+    to be stored in a ResultsManifest.
+
+    Returns
+    -------
+    '': dict
+        Dictionary with keys 'index', 'columns' and 'data'.
+    """
+    return self.metrics_row
+
   @classmethod
-  def getMetrics(cls, file, output="report"):
+  def fromMetricsRow(cls, row):
+    """
+    Create an AnnotationMetrics from a stored row
+    (see _getMetricsRow). Annotations are not restored.
+
+    Parameters
+    ----------
+    row: dict
+        Dictionary with keys 'index', 'columns' and 'data'.
+
+    Returns
+    -------
+    res: AnnotationMetrics
+    """
+    res = cls()
+    res.metrics_row = row
+    return res
+
+  @classmethod
+  def aggregateMetrics(cls, metrics_list):
+    """
+    Aggregate, in one pass over their combined entity table,
+    the deferred metrics of models (see defer_aggregation),
+    and fill them in their rows. Entity tables are released.
+
+    Parameters
+    ----------
+    metrics_list: AnnotationMetrics-list
+        Models with deferred metrics are aggregated;
+        the others are left as they are.
+    """
+    deferred = [m for m in metrics_list if m._aggregation_offset is not None]
+    if not deferred:
+      return
+    table = agg.EntityTable()
+    for one_metrics in deferred:
+      table.extend(one_metrics.entity_table)
+    for one_metrics, one_record in zip(deferred, agg.aggregate(table)):
+      offset = one_metrics._aggregation_offset
+      one_metrics.metrics_row['data'][0][offset:offset+len(one_record)] = \
+          list(one_record.values())
+      one_metrics._aggregation_offset = None
+      one_metrics.entity_table = None
+
+  @classmethod
+  def _getStoredRow(cls, model_file, manifest=None, checkpoint=None,
+                    provisional=False, sampled=False):
+    """
+    Get the row of a model finished in a resumed run,
+    or stored in manifest and still current.
+
+    Parameters
+    ----------
+    model_file: str
+    manifest: manifest.ResultsManifest/None
+    checkpoint: checkpoint.BatchCheckpoint/None
+    provisional: bool
+        If False, provisional rows are not used,
+        so the models are scored again.
+    sampled: bool
+        If True, only rows scored with a SamplingPlan are used;
+        if False, only exact rows.
+
+    Returns
+    -------
+    row: dict/None
+        None if the model should be scored.
+    """
+    row = None
+    if checkpoint is not None:
+      row = checkpoint.getRow(model_file, offline=uka.NonDAGAnalyzer.offline)
+    if row is None and manifest is not None:
+      row = manifest.getRow(model_file, offline=uka.NonDAGAnalyzer.offline,
+                            validation_cache=uka.VALIDATION_CACHE)
+    if row is not None and not provisional and bd.isProvisional(row):
+      row = None
+    if row is not None and sp.isSampled(row) != sampled:
+      row = None
+    return row
+
+  @classmethod
+  def _storeRow(cls, model_file, row, manifest=None, checkpoint=None,
+                remote_results=None):
+    """
+    Record the row of a newly scored model
+    in manifest and checkpoint.
+
+    Parameters
+    ----------
+    model_file: str
+    row: dict
+    manifest: manifest.ResultsManifest/None
+    checkpoint: checkpoint.BatchCheckpoint/None
+    remote_results: dict/None
+        See AnnotationMetrics.remote_results.
+    """
+    if manifest is not None:
+      manifest.update(model_file, row, offline=uka.NonDAGAnalyzer.offline,
+                      remote_results=remote_results)
+    if checkpoint is not None:
+      checkpoint.add(model_file, row)
+
+  @classmethod
+  def _aggregateInBatches(cls, scored, manifest=None, checkpoint=None):
+    """
+    Aggregate the metrics of newly scored models
+    in batches of AGGREGATION_BATCH_SIZE,
+    and record their rows (see _storeRow).
+
+    Parameters
+    ----------
+    scored: iterable
+        Iterable of (model_file, AnnotationMetrics),
+        with deferred aggregation.
+    manifest: manifest.ResultsManifest/None
+    checkpoint: checkpoint.BatchCheckpoint/None
+
+    Yields
+    ------
+    (model_file, metrics): (str, AnnotationMetrics)
+        Aggregated, in the order of scored.
+    """
+    scored = iter(scored)
+    batch = list(itertools.islice(scored, AGGREGATION_BATCH_SIZE))
+    while batch:
+      cls.aggregateMetrics([one_metrics for _, one_metrics in batch])
+      for one_file, one_metrics in batch:
+        cls._storeRow(one_file, one_metrics._getMetricsRow(), manifest, checkpoint,
+                      one_metrics.remote_results)
+        yield one_file, one_metrics
+      batch = list(itertools.islice(scored, AGGREGATION_BATCH_SIZE))
+
+  @classmethod
+  def _scoreInWorkers(cls, file_list, workers, memo=None,
+                      budget=None, model_deadline=None, sampling=None):
+    """
+    Score models in worker processes.
+    Workers start with the resolver settings and
+    validation cache of this process, and send back
+    the lookups they made, which are added to the cache,
+    with the metrics of each model, left to be aggregated
+    (see defer_aggregation).
+
+    Parameters
+    ----------
+    file_list: str-list
+    workers: int
+        Number of worker processes.
+    memo: analysis_memo.AnalysisMemo
+        If given, each worker uses a memo of the same size.
+    budget: budget.TimeBudget
+        Budget of the batch.
+    model_deadline: float
+        Budget of each model, in seconds.
+    sampling: sampling.SamplingPlan
+
+    Yields
+    ------
+    (model_file, metrics): (str, AnnotationMetrics)
+        In the order models are finished.
+    """
+    with futures.ProcessPoolExecutor(max_workers=workers,
+                                     initializer=_initWorker,
+                                     initargs=(uka.NonDAGAnalyzer.offline,
+                                               uka.VALIDATION_CACHE.results,
+                                               None if memo is None else memo.max_size,
+                                               uka.RATE_LIMITER,
+                                               ins.COLLECTOR,
+                                               da.getSlicePath())) as executor:
+      future_to_file = {executor.submit(_scoreModelFile, one_file, budget,
+                                        model_deadline, sampling, cls): one_file
+                        for one_file in file_list}
+      for one_future in futures.as_completed(future_to_file):
+        metrics, new_results, snapshot = one_future.result()
+        uka.VALIDATION_CACHE.results.update(new_results)
+        if snapshot is not None:
+          ins.COLLECTOR.merge(snapshot)
+        yield future_to_file[one_future], metrics
+
+  @classmethod
+  def _getMetricsList(cls, file_list, manifest=None, checkpoint=None,
+                      resume=False, workers=1, pipeline=None, memo=None,
+                      deadline=None, model_deadline=None, sampling=None):
+    """
+    Get AnnotationMetrics of each model;
+    see getMetrics for the parameters.
+    Annotations are released as soon as each model is scored,
+    so memory grows with the number of rows, not with
+    the size of the models.
+
+    Returns
+    -------
+    annotation_metrics_list: AnnotationMetrics-list
+        In the order of file_list.
+    """
+    if isinstance(manifest, str):
+      manifest = mf.ResultsManifest(path=manifest)
+    if isinstance(checkpoint, str):
+      checkpoint = ck.BatchCheckpoint(path=checkpoint, resume=resume)
+    if pipeline is not None and sampling is not None:
+      raise ValueError("Sampling is not supported with a pipeline, "
+                       "which validates all entities.")
+    budget = None
+    if deadline is not None or model_deadline is not None:
+      budget = bd.TimeBudget(seconds=deadline)
+    file_to_metrics = dict()
+    pending = []
+    for one_file in file_list:
+      if one_file in file_to_metrics:
+        continue
+      row = cls._getStoredRow(one_file, manifest, checkpoint,
+                              provisional=budget is not None,
+                              sampled=sampling is not None)
+      if row is None:
+        file_to_metrics[one_file] = None
+        pending.append(one_file)
+      else:
+        file_to_metrics[one_file] = cls.fromMetricsRow(row)
+    # metrics of a batch of models are aggregated together
+    if pipeline is not None:
+      scored = pipeline.run(pending, metrics_class=cls, memo=memo, budget=budget,
+                            model_deadline=model_deadline, keep_annotations=False,
+                            defer_aggregation=True)
+    elif workers > 1 and len(pending) > 1:
+      scored = cls._scoreInWorkers(pending, workers, memo,
+                                   budget, model_deadline, sampling)
+    else:
+      scored = ((one_file, cls(model_file=one_file, memo=memo,
+                               budget=_getModelBudget(budget, model_deadline),
+                               sampling=sampling, keep_annotations=False,
+                               defer_aggregation=True)) \
+                for one_file in pending)
+    for one_file, one_metrics in cls._aggregateInBatches(scored, manifest, checkpoint):
+      file_to_metrics[one_file] = one_metrics
+    annotation_metrics_list = [file_to_metrics[one_file] for one_file in file_list]
+    if manifest is not None:
+      manifest.save()
+    if checkpoint is not None:
+      checkpoint.save()
+    return annotation_metrics_list
+
+  @classmethod
+  def getMetrics(cls, file, output="report", manifest=None,
+                 checkpoint=None, resume=False, workers=1, pipeline=None,
+                 shard=None, shard_output=None, memo=None,
+                 deadline=None, model_deadline=None, collector=None,
+                 sampling=None):
     """
     Using the AnnotationMetrics class,
     produces report on the three metrics.
@@ -77,11 +468,70 @@ class AnnotationMetrics(object):
         Address(es) of model file (.xml).
         Should be string or list of string.
     output: str
-        The type of output ("report" or "table").
+        The type of output ("report", "table" or "arrow").
+        "arrow" is a pyarrow.Table with a stable schema
+        (see columnar.getArrowTable); requires pyarrow.
+    manifest: str/manifest.ResultsManifest
+        If given, results manifest (or its location)
+        for incremental scoring. Only new or changed models
+        are scored; others reuse the stored rows.
+    checkpoint: str/checkpoint.BatchCheckpoint
+        If given, checkpoint (or its location) where rows
+        of finished models and the validation cache
+        are saved periodically during the run.
+    resume: bool
+        If True, models finished in the run
+        that wrote checkpoint are not scored again.
+    workers: int
+        Number of worker processes scoring models.
+    pipeline: pipeline.ScoringPipeline
+        If given, models are scored by the pipeline,
+        overlapping parsing and network validation;
+        workers is then ignored.
+    shard: (int, int)
+        If given, (shard index, number of shards);
+        only the models of the shard are scored.
+        Models are assigned to shards by hash of their path.
+    shard_output: str
+        If given with shard, location of the
+        partial result file of the shard; see mergeShards.
+    memo: analysis_memo.AnalysisMemo
+        If given, memo of analyzers shared across models,
+        so repeated annotation patterns are scored once.
+    deadline: float
+        If given, time budget (seconds) of the remote lookups
+        of the whole batch.
+    model_deadline: float
+        If given, time budget (seconds) of the remote lookups
+        of each model.
+        With either budget, UniProt/KEGG terms not checked in time
+        are left unresolved (assumed valid), and columns
+        'provisional' and 'unresolved_terms' are added.
+        Provisional rows stored in manifest are
+        scored again by a run without budget;
+        see resolveProvisional.
+    collector: instrumentation.Collector
+        If given, collects stage times and counters of the run
+        (also from worker processes, but not from
+        the parse processes of pipeline).
+        With collector.columns, measurements of each model are
+        added as columns (time_*, terms_*, counters).
+        With collector.memory, Python allocations are traced
+        during the run; allocations (mem_*) and RSS changes (rss_*)
+        of stages, peak allocations (mem_peak) and
+        largest RSS of the process (rss_max) are added as columns.
+    sampling: sampling.SamplingPlan
+        If given, consistency and specificity of each model are
+        estimated from a stratified sample of its annotated entities,
+        with confidence intervals; coverage stays exact.
+        Columns 'approximate', 'sample_size' and the bounds
+        of the intervals are added. Not supported with pipeline.
+        Stored rows are used only if scored the same way
+        (sampled or exact).
 
     Returns
     --------
-    res: str / pandas.DataFrame / None
+    res: str / pandas.DataFrame / pyarrow.Table / None
         Final report (summary) of the model.
         Return None if input type is incorrect.
     """
@@ -100,12 +550,257 @@ class AnnotationMetrics(object):
     if flag:
       raise ValueError("Should be a valid file name.")
 
-    annotation_metrics_list = [cls(model_file=one_file) 
-                               for one_file in file_list]
+    corpus_list = file_list
+    if shard is not None:
+      file_list = sh.selectShard(corpus_list, shard[0], shard[1])
+    elif shard_output is not None:
+      raise ValueError("shard_output requires shard.")
+    old_collector = ins.COLLECTOR
+    if collector is not None:
+      ins.COLLECTOR = collector
+      collector.startMemory()
+    try:
+      annotation_metrics_list = cls._getMetricsList(file_list,
+                                                    manifest=manifest,
+                                                    checkpoint=checkpoint,
+                                                    resume=resume,
+                                                    workers=workers,
+                                                    pipeline=pipeline,
+                                                    memo=memo,
+                                                    deadline=deadline,
+                                                    model_deadline=model_deadline,
+                                                    sampling=sampling)
+    finally:
+      ins.COLLECTOR = old_collector
+      if collector is not None:
+        collector.stopMemory()
+    if shard_output is not None:
+      sh.writeShard(shard_output,
+                    rows=[m._getMetricsRow() for m in annotation_metrics_list],
+                    file_list=file_list,
+                    corpus_list=corpus_list,
+                    shard_index=shard[0],
+                    num_shards=shard[1])
+    return cls._formatMetrics(annotation_metrics_list, output)
+
+  @classmethod
+  def resolveProvisional(cls, manifest, output="table", workers=1, memo=None):
+    """
+    Score again, without budget, the models
+    with provisional rows in manifest, and update the rows.
+
+    Parameters
+    ----------
+    manifest: str/manifest.ResultsManifest
+        Results manifest (or its location).
+    output: str
+        The type of output ("report" or "table").
+    workers: int
+    memo: analysis_memo.AnalysisMemo
+
+    Returns
+    -------
+    res: str / pandas.DataFrame
+        Metrics of the resolved models.
+    """
+    if isinstance(manifest, str):
+      manifest = mf.ResultsManifest(path=manifest)
+    file_list = [one_file for one_file in manifest.entries \
+                 if bd.isProvisional(manifest.entries[one_file]['row'])]
+    annotation_metrics_list = cls._getMetricsList(file_list,
+                                                  manifest=manifest,
+                                                  workers=workers,
+                                                  memo=memo)
+    return cls._formatMetrics(annotation_metrics_list, output)
+
+  @classmethod
+  def _formatMetrics(cls, annotation_metrics_list, output):
+    """
+    Format the metrics of models.
+
+    Parameters
+    ----------
+    annotation_metrics_list: AnnotationMetrics-list
+    output: str
+        The type of output ("report", "table" or "arrow").
+
+    Returns
+    -------
+    res: str / pandas.DataFrame / pyarrow.Table
+    """
     if output == "report":
       res_list = [m._getMetricsReport() for m in annotation_metrics_list]
       res = ('\n').join(res_list)
     elif output=="table":
-      res_list = [m.metrics_df for m in annotation_metrics_list]
-      res = pd.concat(res_list)
+      res = mkMetricsTable([m.metrics_row for m in annotation_metrics_list])
+    elif output=="arrow":
+      from SBMate import columnar as cl
+      res = cl.getArrowTable([m.metrics_row for m in annotation_metrics_list])
     return res
+
+  @classmethod
+  def mergeShards(cls, shard_files, output="report"):
+    """
+    Combine the partial result files written by
+    getMetrics(shard=..., shard_output=...).
+    Raises ValueError if shards are missing,
+    duplicated or from different corpora.
+
+    Parameters
+    ----------
+    shard_files: str-list
+        Locations of the partial result files.
+    output: str
+        The type of output ("report", "table" or "arrow").
+
+    Returns
+    -------
+    res: str / pandas.DataFrame / pyarrow.Table
+        Metrics of all models, in the order of the corpus.
+    """
+    rows = sh.mergeShards(shard_files)
+    return cls._formatMetrics([cls.fromMetricsRow(one_row) for one_row in rows],
+                              output)
+
+
+def mkMetricsTable(rows):
+  """
+  Create one DataFrame from metrics rows.
+  Columns holding None are kept as object dtype,
+  except float columns, where None becomes NaN.
+
+  Parameters
+  ----------
+  rows: dict-list
+      Rows, {'index', 'columns', 'data'}.
+
+  Returns
+  -------
+  df: pandas.DataFrame
+  """
+  import pandas as pd
+  if not rows:
+    return pd.DataFrame()
+  columns = rows[0]['columns']
+  if not all([one_row['columns'] == columns for one_row in rows]):
+    return pd.concat([mkMetricsTable([one_row]) for one_row in rows])
+  index = [name for one_row in rows for name in one_row['index']]
+  data = [values for one_row in rows for values in one_row['data']]
+  # columns are keyed by position, as names may repeat
+  col_series = dict()
+  for idx, col_values in enumerate(zip(*data)):
+    non_null_values = [val for val in col_values if val is not None]
+    if len(non_null_values) == len(col_values):
+      col_dtype = None
+    elif non_null_values and all([isinstance(val, float) for val in non_null_values]):
+      col_dtype = float
+    else:
+      col_dtype = object
+    col_series[idx] = pd.Series(col_values, index=index, dtype=col_dtype)
+  df = pd.DataFrame(col_series, index=index)
+  df.columns = columns
+  return df
+
+
+# memo of analyzers in a worker process
+_WORKER_MEMO = None
+
+
+def _initWorker(offline, validation_results, memo_size=None, rate_limiter=None,
+                collector=None, slice_path=None):
+  """
+  Initialize a worker process of
+  AnnotationMetrics.getMetrics.
+
+  Parameters
+  ----------
+  offline: bool
+      Resolver setting, see NonDAGAnalyzer.offline.
+  validation_results: dict
+      Results of the validation cache.
+  memo_size: int/None
+      If given, size of the memo of analyzers of the worker.
+  rate_limiter: rate_limiter.RateLimiter/None
+      Limiter of remote lookups, shared by the workers.
+  collector: instrumentation.Collector/None
+      If given, measurements are collected in the worker
+      (without the callbacks) and sent back with each model.
+      In memory mode, the worker traces its allocations.
+  slice_path: str/None
+      Ontology slice used by the parent, see dag_analyzer.setSlice.
+  """
+  global _WORKER_MEMO
+  uka.NonDAGAnalyzer.offline = offline
+  if slice_path != da.getSlicePath():
+    da.setSlice(slice_path)
+  uka.RATE_LIMITER = rate_limiter
+  if collector is not None:
+    ins.COLLECTOR = ins.Collector(columns=collector.columns, memory=collector.memory)
+    ins.COLLECTOR.startMemory()
+  uka.VALIDATION_CACHE.results.update(validation_results)
+  if memo_size is not None:
+    _WORKER_MEMO = am.AnalysisMemo(max_size=memo_size)
+
+
+def _getModelBudget(budget, model_deadline):
+  """
+  Get the budget of one model, starting now.
+
+  Parameters
+  ----------
+  budget: budget.TimeBudget/None
+      Budget of the batch.
+  model_deadline: float/None
+      Budget of the model, in seconds.
+
+  Returns
+  -------
+  '': budget.TimeBudget/None
+  """
+  if budget is None:
+    return None
+  return budget.getChild(model_deadline)
+
+
+def _scoreModelFile(model_file, budget=None, model_deadline=None, sampling=None,
+                    metrics_class=None):
+  """
+  Score one model in a worker process;
+  its metrics are left to be aggregated
+  (see AnnotationMetrics.aggregateMetrics).
+
+  Parameters
+  ----------
+  model_file: str
+  budget: budget.TimeBudget/None
+      Budget of the batch.
+  model_deadline: float/None
+      Budget of the model, in seconds.
+  sampling: sampling.SamplingPlan/None
+  metrics_class: class
+      AnnotationMetrics (default) or a subclass.
+
+  Returns
+  -------
+  metrics: AnnotationMetrics
+      Without annotations.
+  new_results: dict
+      Lookups added to the validation cache.
+  snapshot: dict/None
+      Measurements of the model, if collected.
+  """
+  if ins.COLLECTOR is not None:
+    ins.COLLECTOR = ins.Collector(columns=ins.COLLECTOR.columns,
+                                  memory=ins.COLLECTOR.memory)
+  if metrics_class is None:
+    metrics_class = AnnotationMetrics
+  uka.VALIDATION_CACHE.startRecording()
+  try:
+    metrics = metrics_class(model_file=model_file, memo=_WORKER_MEMO,
+                            budget=_getModelBudget(budget, model_deadline),
+                            sampling=sampling, keep_annotations=False,
+                            defer_aggregation=True)
+  finally:
+    new_results = uka.VALIDATION_CACHE.stopRecording()
+  snapshot = None if ins.COLLECTOR is None else ins.COLLECTOR.getSnapshot()
+  return metrics, new_results, snapshot
@@ -2,10 +2,10 @@
 # updated versino of sbml_annotation.py
 
 import collections
-import libsbml
 import os
 import re
 from SBMate import constants as cn
+from SBMate import instrumentation as ins
 
 ObjectAnnotation = collections.namedtuple('ObjectAnnotation',
                                         ['id', 'object_type', 'annotation'],
@@ -38,7 +38,7 @@ class RawSBMLAnnotation(object):
   """
 
   def __init__(self, input_file,
-               select_objects=cn.BIOMODEL_OBJECTS):
+               select_objects=None):
     """
     Parameters
     ----------
@@ -46,15 +46,21 @@ class RawSBMLAnnotation(object):
         Name/location of model file (.xml)
     select_objects: libsbml.AutoProperty - list
         List of objects to pull out annotations from.
+        If None, cn.BIOMODEL_OBJECTS.
     """
+    import libsbml
+    if select_objects is None:
+      select_objects = cn.BIOMODEL_OBJECTS
     # load sbml file
-    reader = libsbml.SBMLReader()
-    document = reader.readSBML(input_file)
-    # only keep the objects of interest
-    model_objects = [ele for ele in document.getListOfAllElements() \
-                     if isinstance(ele, tuple(select_objects))] 
-    self.sbo = [self.getSBOAnnotation(ele) for ele in model_objects]
-    self.str_annotation = [self.getOntAnnotation(ele) for ele in model_objects]
+    with ins.stage('parse'):
+      reader = libsbml.SBMLReader()
+      document = reader.readSBML(input_file)
+    with ins.stage('extraction'):
+      # only keep the objects of interest
+      model_objects = [ele for ele in document.getListOfAllElements() \
+                       if isinstance(ele, tuple(select_objects))] 
+      self.sbo = [self.getSBOAnnotation(ele) for ele in model_objects]
+      self.str_annotation = [self.getOntAnnotation(ele) for ele in model_objects]
 
   def formatSBO(self, sbo_num):
     """
@@ -167,9 +173,13 @@ class SBMLAnnotation(object):
   def __init__(self, file, knowledge_resources=cn.KNOWLEDGE_TYPES_REP):
     # For now, use default biomodel objects.
     self.raw_annotation = RawSBMLAnnotation(input_file=file)
-    self.object_ids = [ele.id for ele in self.raw_annotation.str_annotation]
-    self.annotation_by_qualifier = {one_id:self.getAnnotationDictByQualifier(one_id) for one_id in self.object_ids}
-    self.annotations = {one_id:self.getAnnotationDictByOntology(self.annotation_by_qualifier[one_id]) for one_id in self.object_ids}
+    with ins.stage('extraction'):
+      self.object_ids = [ele.id for ele in self.raw_annotation.str_annotation]
+      self.annotation_by_qualifier = {one_id:self.getAnnotationDictByQualifier(one_id) for one_id in self.object_ids}
+      self.annotations = {one_id:self.getAnnotationDictByOntology(self.annotation_by_qualifier[one_id]) for one_id in self.object_ids}
+    if ins.COLLECTOR is not None:
+      for one_ont in cn.KNOWLEDGE_TYPES_REP:
+        ins.count('terms.' + one_ont, sum([len(v[one_ont]) for v in self.annotations.values() if v[one_ont]]))
 
   def getAnnotationDictByQualifier(self, input_id):
     """
@@ -0,0 +1,387 @@
+# server.py
+"""
+Long-running local scoring service.
+Ontology graphs, the validation cache, the memo of analyses
+and the threads querying UniProt/KEGG stay warm across requests.
+Remote terms of concurrent requests are looked up once:
+a term being queried for one request is awaited by the others.
+
+HTTP API
+--------
+POST /metrics
+    JSON body {"files": [paths], "models": [{"name", "sbml"}],
+    "output": "report"/"table"}, or an SBML document
+    (Content-Type application/xml; name from ?name=).
+    Response {"output", "result"}; result is the report (str),
+    or the table as {"index", "columns", "data"},
+    as AnnotationMetrics.getMetrics.
+GET /status
+    Counts of requests, models and lookups.
+
+Example
+-------
+sbmate serve --port 8350
+requestMetrics("http://127.0.0.1:8350", files=["BIOMD0000000012.xml"], output="table")
+"""
+
+from concurrent import futures
+import http.server
+import json
+import os
+import tempfile
+import threading
+import time
+from urllib import error as urlerror
+from urllib import parse
+from urllib import request as urlrequest
+from SBMate import analysis_memo as am
+from SBMate import constants as cn
+from SBMate import context as mctx
+from SBMate import dag_analyzer as da
+from SBMate import manifest as mf
+from SBMate import sbml_annotation as sa
+from SBMate import sbmate
+from SBMate import uniprot_kegg_analyzer as uka
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8350
+OUTPUTS = ['report', 'table']
+
+
+class SharedValidator(object):
+  """
+  Looks up remote terms for concurrent requests
+  with a pool of threads; a term is queried once,
+  however many requests need it at the same time.
+
+  Attributes
+  ----------
+  num_lookups: int
+      Number of terms queried.
+  num_shared: int
+      Number of terms awaited from the query of another request.
+
+  Methods
+  -------
+  validate (pairs)
+      Look up the terms not yet in the validation cache.
+  shutdown ()
+      Stop the threads.
+  """
+
+  def __init__(self, workers=8):
+    """
+    Parameters
+    ----------
+    workers: int
+        Number of threads querying UniProt/KEGG.
+    """
+    self._executor = futures.ThreadPoolExecutor(max_workers=workers)
+    self._in_flight = dict()
+    self._lock = threading.Lock()
+    self.num_lookups = 0
+    self.num_shared = 0
+
+  def _lookup(self, pair):
+    try:
+      return uka.validateTerm(pair[0], pair[1], offline=uka.NonDAGAnalyzer.offline)
+    finally:
+      with self._lock:
+        del self._in_flight[pair]
+
+  def validate(self, pairs):
+    """
+    Look up terms, filling uka.VALIDATION_CACHE;
+    returns when all are done.
+
+    Parameters
+    ----------
+    pairs: tuple-list
+        List of (ontology, term).
+    """
+    waiting = []
+    with self._lock:
+      for one_pair in pairs:
+        if one_pair in self._in_flight:
+          self.num_shared += 1
+          waiting.append(self._in_flight[one_pair])
+        elif uka.VALIDATION_CACHE.get(*one_pair) is None:
+          self.num_lookups += 1
+          one_future = self._executor.submit(self._lookup, one_pair)
+          self._in_flight[one_pair] = one_future
+          waiting.append(one_future)
+    for one_future in waiting:
+      one_future.result()
+
+  def shutdown(self):
+    self._executor.shutdown(wait=True)
+
+
+class ScoringService(object):
+  """
+  Warm state of the scoring server;
+  can also be used without HTTP.
+
+  Attributes
+  ----------
+  memo: analysis_memo.AnalysisMemo/None
+      Memo of analyses shared across requests.
+  validator: SharedValidator
+  stats: dict
+      Counts of 'requests' and 'models', and 'started' time.
+
+  Methods
+  -------
+  getMetrics (files, models, output)
+      Score models, as AnnotationMetrics.getMetrics.
+  getStatus ()
+      Get the counts of the service.
+  """
+
+  def __init__(self, memo_size=100000, validation_workers=8, preload=True):
+    """
+    Parameters
+    ----------
+    memo_size: int
+        Size of the memo of analyses; 0 disables it.
+    validation_workers: int
+        Number of threads querying UniProt/KEGG.
+    preload: bool
+        If True, ontology graphs and heavy modules
+        are loaded now, not by the first request.
+    """
+    self.memo = am.AnalysisMemo(max_size=memo_size) if memo_size > 0 else None
+    self.validator = SharedValidator(workers=validation_workers)
+    self.stats = {'requests': 0, 'models': 0, 'started': time.time()}
+    self._lock = threading.Lock()
+    if preload:
+      # imported by the first model otherwise
+      import numpy
+      import pandas
+      for one_ont in da.ONT_TO_FILE:
+        da.getGraph(one_ont)
+      # imports libsbml
+      cn.OBJECT_ONT_MAP_FILT
+
+  def _scoreFile(self, model_file):
+    """
+    Score one model; remote terms are
+    looked up with those of concurrent requests.
+
+    Parameters
+    ----------
+    model_file: str
+
+    Returns
+    -------
+    '': sbmate.AnnotationMetrics
+    """
+    annotations = sa.SBMLAnnotation(file=model_file)
+    context = mctx.ModelContext(annotations, memo=self.memo)
+    self.validator.validate(context.getPendingRemoteTerms())
+    return sbmate.AnnotationMetrics(model_file=model_file, annotations=annotations,
+                                    memo=self.memo, context=context)
+
+  def getMetrics(self, files=None, models=None, output="report"):
+    """
+    Score models given as files or as SBML documents.
+
+    Parameters
+    ----------
+    files: str-list
+        Locations of model files (.xml), readable by the server.
+    models: list
+        List of (name, SBML document string);
+        name is the index of the metrics row.
+    output: str
+        The type of output ("report" or "table").
+
+    Returns
+    -------
+    res: str / pandas.DataFrame
+        Same as AnnotationMetrics.getMetrics;
+        models are in the order of files, then models.
+    """
+    files = [] if files is None else files
+    models = [] if models is None else models
+    if output not in OUTPUTS:
+      raise ValueError("Output should be one of %s." % OUTPUTS)
+    if not files and not models:
+      raise ValueError("No model is given.")
+    for one_file in files:
+      if not isinstance(one_file, str) or not os.path.isfile(one_file):
+        raise ValueError("Should be a valid file name: %s." % one_file)
+    metrics_list = [self._scoreFile(one_file) for one_file in files]
+    if models:
+      with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, document in models:
+          if not name or os.path.basename(name) != name:
+            raise ValueError("Should be a valid model name: %s." % name)
+          model_file = os.path.join(tmp_dir, name)
+          with open(model_file, 'w') as f:
+            f.write(document)
+          metrics_list.append(self._scoreFile(model_file))
+    with self._lock:
+      self.stats['requests'] += 1
+      self.stats['models'] += len(metrics_list)
+    return sbmate.AnnotationMetrics._formatMetrics(metrics_list, output)
+
+  def getStatus(self):
+    """
+    Returns
+    -------
+    '': dict
+        Counts of requests, models, lookups (made and shared),
+        cached lookups and memo statistics; uptime in seconds.
+    """
+    with self._lock:
+      res = {'requests': self.stats['requests'],
+             'models': self.stats['models'],
+             'uptime': time.time() - self.stats['started']}
+    res.update({'lookups': self.validator.num_lookups,
+                'shared_lookups': self.validator.num_shared,
+                'cached_lookups': len(uka.VALIDATION_CACHE.results),
+                'memo': None if self.memo is None else self.memo.getStats()})
+    return res
+
+  def shutdown(self):
+    self.validator.shutdown()
+
+
+def getTableDict(df):
+  """
+  Convert a metrics table into a JSON-serializable
+  dictionary; missing values are None.
+
+  Parameters
+  ----------
+  df: pandas.DataFrame
+
+  Returns
+  -------
+  '': dict
+      Dictionary with keys 'index', 'columns' and 'data'.
+  """
+  return df.astype(object).where(df.notna(), None).to_dict(orient='split')
+
+
+class _ScoringHandler(http.server.BaseHTTPRequestHandler):
+  """
+  Handler of the HTTP API; the service is server.service.
+  """
+
+  def _sendJson(self, status, obj):
+    body = json.dumps(obj, default=mf.toJsonValue).encode()
+    self.send_response(status)
+    self.send_header('Content-Type', 'application/json')
+    self.send_header('Content-Length', str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def do_GET(self):
+    if parse.urlparse(self.path).path == '/status':
+      self._sendJson(200, self.server.service.getStatus())
+    else:
+      self._sendJson(404, {'error': 'Unknown path: %s' % self.path})
+
+  def do_POST(self):
+    url = parse.urlparse(self.path)
+    if url.path != '/metrics':
+      self._sendJson(404, {'error': 'Unknown path: %s' % self.path})
+      return
+    length = int(self.headers.get('Content-Length', 0))
+    body = self.rfile.read(length).decode('utf-8')
+    try:
+      content_type = self.headers.get('Content-Type', '')
+      if content_type.startswith('application/xml') or content_type.startswith('text/xml'):
+        query = parse.parse_qs(url.query)
+        files, output = [], query.get('output', ['report'])[0]
+        models = [(query.get('name', ['model.xml'])[0], body)]
+      else:
+        try:
+          payload = json.loads(body)
+        except json.JSONDecodeError:
+          raise ValueError("Request should be JSON or SBML.")
+        files = payload.get('files', [])
+        models = [(m.get('name'), m.get('sbml', '')) for m in payload.get('models', [])]
+        output = payload.get('output', 'report')
+      res = self.server.service.getMetrics(files=files, models=models, output=output)
+    except ValueError as e:
+      self._sendJson(400, {'error': str(e)})
+      return
+    except Exception as e:
+      self._sendJson(500, {'error': '%s: %s' % (type(e).__name__, e)})
+      return
+    if output == 'table':
+      res = getTableDict(res)
+    self._sendJson(200, {'output': output, 'result': res})
+
+  def log_message(self, format, *args):
+    pass
+
+
+class ScoringServer(http.server.ThreadingHTTPServer):
+  """
+  HTTP server of a ScoringService;
+  each request is handled in its own thread.
+
+  Attributes
+  ----------
+  service: ScoringService
+  url: str
+      Base URL of the server.
+  """
+  daemon_threads = True
+
+  def __init__(self, service, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """
+    Parameters
+    ----------
+    service: ScoringService
+    host: str
+    port: int
+        0 for a free port.
+    """
+    super().__init__((host, port), _ScoringHandler)
+    self.service = service
+    self.url = "http://%s:%d" % (host, self.server_address[1])
+
+
+def requestMetrics(url, files=None, models=None, output="report", timeout=None):
+  """
+  Score models with a running server.
+
+  Parameters
+  ----------
+  url: str
+      Base URL of the server.
+  files: str-list
+      Locations of model files, readable by the server.
+  models: list
+      List of (name, SBML document string).
+  output: str
+      The type of output ("report" or "table").
+  timeout: float/None
+
+  Returns
+  -------
+  res: str / pandas.DataFrame
+      Same as AnnotationMetrics.getMetrics.
+  """
+  payload = {'files': [] if files is None else list(files),
+             'models': [{'name': n, 'sbml': d} for n, d in ([] if models is None else models)],
+             'output': output}
+  req = urlrequest.Request(url.rstrip('/') + '/metrics',
+                           data=json.dumps(payload).encode(),
+                           headers={'Content-Type': 'application/json'})
+  try:
+    with urlrequest.urlopen(req, timeout=timeout) as response:
+      res = json.loads(response.read().decode('utf-8'))
+  except urlerror.HTTPError as e:
+    raise ValueError(json.loads(e.read().decode('utf-8'))['error'])
+  if output == 'table':
+    return sbmate.mkMetricsTable([{'index': [one_index], 'columns': res['result']['columns'],
+                                   'data': [one_row]} \
+                                  for one_index, one_row in zip(res['result']['index'],
+                                                                res['result']['data'])])
+  return res['result']
@@ -0,0 +1,294 @@
+# session.py
+"""
+Editable scoring session of one model,
+e.g., for a curation tool:
+annotations of entities are added, removed or replaced
+in memory, and the metrics are updated right away.
+Only the analyzers of the edited entity are computed again,
+and the model aggregates are updated in constant time.
+
+Example
+-------
+session = ScoringSession(model_file='BIOMD0000000012.xml')
+session.addAnnotation('PX', 'uniprot', 'P03023')
+session.getRecord()
+"""
+
+import fractions
+from SBMate import constants as cn
+from SBMate import context as mctx
+from SBMate import sbml_annotation as sa
+
+
+class ScoringSession(object):
+  """
+  In-memory scoring session of one model.
+  Metrics are the same as those of MetricCalculator
+  (sbmate.AnnotationMetrics) for the edited annotations.
+
+  Attributes
+  ----------
+  annotations: sbml_annotation.SBMLAnnotation
+      Annotations of the model, as edited.
+  model_name: str
+      Index of the metrics row.
+  context: context.ModelContext
+      Analyzers of the entities.
+  entity_scores: dict
+      Dictionary of {entity: (annotated, consistent, specificity)}.
+
+  Methods
+  -------
+  addAnnotation (entity, namespace, term, qualifier)
+      Add a term to an entity.
+  removeAnnotation (entity, namespace, term)
+      Remove a term from an entity.
+  replaceAnnotation (entity, namespace, term, new_term, new_namespace)
+      Replace a term of an entity, keeping its qualifier.
+  getRecord ()
+      Get the metrics of the model.
+  getMetricsRow ()
+      Get the metrics as a row, {'index', 'columns', 'data'}.
+  """
+
+  def __init__(self, model_file=None, annotations=None, memo=None, model_name=None):
+    """
+    Parameters
+    ----------
+    model_file: str
+        Address of the model file (.xml);
+        not needed if annotations is given.
+    annotations: sbml_annotation.SBMLAnnotation
+        Annotations of the model, if already extracted;
+        they are edited in place.
+    memo: analysis_memo.AnalysisMemo
+        Memo of analyzers, shared across sessions.
+    model_name: str
+        If None, the file name of model_file (or 'model').
+    """
+    if annotations is None:
+      if model_file is None:
+        raise ValueError("Either model_file or annotations should be given.")
+      annotations = sa.SBMLAnnotation(file=model_file)
+    self.annotations = annotations
+    if model_name is None:
+      model_name = 'model' if model_file is None else model_file.split('/')[-1]
+    self.model_name = model_name
+    self.context = mctx.ModelContext(annotations, memo=memo)
+    self.entity_scores = dict()
+    self._num_annotated = 0
+    self._num_consistent = 0
+    # sum of entity specificities, kept exactly,
+    # so that removals do not accumulate rounding errors
+    self._specificity_sum = fractions.Fraction(0)
+    for one_entity in self.annotations.annotations:
+      self._setEntityScore(one_entity, self._scoreEntity(one_entity))
+
+  def _scoreEntity(self, entity):
+    """
+    Score one entity, as MetricCalculator does.
+
+    Parameters
+    ----------
+    entity: str
+
+    Returns
+    -------
+    '': (bool, bool, float/None)
+        (annotated, consistent, specificity)
+    """
+    one_anot = self.annotations.annotations[entity]
+    if not any([one_anot[ont] for ont in cn.KNOWLEDGE_TYPES_REP]):
+      return (False, False, None)
+    if not self.context.isConsistent(entity):
+      return (True, False, None)
+    import numpy as np
+    specificity = np.mean([one_analyzer.getSpecificity(one_analyzer.term_id) \
+                           for one_analyzer in self.context.getAnalyzers(entity)])
+    return (True, True, specificity)
+
+  def _setEntityScore(self, entity, score):
+    """
+    Replace the score of an entity in the aggregates.
+
+    Parameters
+    ----------
+    entity: str
+    score: (bool, bool, float/None)
+    """
+    for one_score, sign in [(self.entity_scores.get(entity), -1), (score, 1)]:
+      if one_score is None:
+        continue
+      annotated, consistent, specificity = one_score
+      self._num_annotated += sign * annotated
+      self._num_consistent += sign * consistent
+      if consistent:
+        self._specificity_sum += sign * fractions.Fraction(specificity)
+    self.entity_scores[entity] = score
+
+  def _getQualifierDict(self, entity):
+    """
+    Copy of the annotations of an entity by qualifier.
+    """
+    if entity not in self.annotations.annotations:
+      raise ValueError("Unknown entity: %s." % entity)
+    return {k: (list(v) if k in cn.QUALIFIERS else v) \
+            for k, v in self.annotations.annotation_by_qualifier[entity].items()}
+
+  def _update(self, entity, qualifier_dict):
+    """
+    Set the annotations of an entity
+    and score it again.
+
+    Parameters
+    ----------
+    entity: str
+    qualifier_dict: dict
+        Dictionary of {qualifier: [(namespace, term)]},
+        with 'object_id' and 'object_type'.
+
+    Returns
+    -------
+    '': dict
+        Metrics of the model, see getRecord.
+    """
+    qualifier_dict = {k: v for k, v in qualifier_dict.items() \
+                      if k not in cn.QUALIFIERS or v}
+    self.annotations.annotation_by_qualifier[entity] = qualifier_dict
+    self.annotations.annotations[entity] = self.annotations.getAnnotationDictByOntology(qualifier_dict)
+    self.context.invalidate(entity)
+    self._setEntityScore(entity, self._scoreEntity(entity))
+    return self.getRecord()
+
+  def _findTerm(self, qualifier_dict, namespace, term):
+    """
+    Find the qualifier and position of a term.
+    """
+    for one_qual in cn.QUALIFIERS:
+      if (namespace, term) in qualifier_dict.get(one_qual, []):
+        return one_qual, qualifier_dict[one_qual].index((namespace, term))
+    raise ValueError("%s is not annotated with %s:%s." % (qualifier_dict['object_id'],
+                                                           namespace, term))
+
+  def addAnnotation(self, entity, namespace, term, qualifier='is'):
+    """
+    Add a term to an entity.
+    Adding a term already present has no effect.
+
+    Parameters
+    ----------
+    entity: str
+        Model entity id.
+    namespace: str
+        Knowledge resource of the identifiers.org URI,
+        e.g., 'chebi' or 'kegg.compound'; 'sbo' for SBO terms.
+    term: str
+        Identifier, e.g., 'CHEBI:17234'.
+    qualifier: str
+        'is' or 'isVersionOf'.
+
+    Returns
+    -------
+    '': dict
+        Metrics of the model, see getRecord.
+    """
+    if namespace not in cn.ALL_KNOWLEDGE_TYPES:
+      raise ValueError("Unknown knowledge resource: %s." % namespace)
+    if qualifier not in cn.QUALIFIERS:
+      raise ValueError("Qualifier should be one of %s." % cn.QUALIFIERS)
+    qualifier_dict = self._getQualifierDict(entity)
+    terms = qualifier_dict.setdefault(qualifier, [])
+    if (namespace, term) in terms:
+      return self.getRecord()
+    terms.append((namespace, term))
+    return self._update(entity, qualifier_dict)
+
+  def removeAnnotation(self, entity, namespace, term):
+    """
+    Remove a term from an entity.
+
+    Parameters
+    ----------
+    entity: str
+    namespace: str
+    term: str
+
+    Returns
+    -------
+    '': dict
+        Metrics of the model, see getRecord.
+    """
+    qualifier_dict = self._getQualifierDict(entity)
+    qualifier, position = self._findTerm(qualifier_dict, namespace, term)
+    del qualifier_dict[qualifier][position]
+    return self._update(entity, qualifier_dict)
+
+  def replaceAnnotation(self, entity, namespace, term, new_term, new_namespace=None):
+    """
+    Replace a term of an entity, keeping its qualifier.
+
+    Parameters
+    ----------
+    entity: str
+    namespace: str
+    term: str
+    new_term: str
+    new_namespace: str
+        If None, namespace.
+
+    Returns
+    -------
+    '': dict
+        Metrics of the model, see getRecord.
+    """
+    if new_namespace is None:
+      new_namespace = namespace
+    if new_namespace not in cn.ALL_KNOWLEDGE_TYPES:
+      raise ValueError("Unknown knowledge resource: %s." % new_namespace)
+    qualifier_dict = self._getQualifierDict(entity)
+    qualifier, position = self._findTerm(qualifier_dict, namespace, term)
+    qualifier_dict[qualifier][position] = (new_namespace, new_term)
+    return self._update(entity, qualifier_dict)
+
+  def getRecord(self):
+    """
+    Get the metrics of the model, in constant time.
+
+    Returns
+    -------
+    '': dict
+        Dictionary of {metric name: value}, as
+        MetricCalculator.calculateRecord.
+    """
+    import numpy as np
+    num_annotatable = len(self.annotations.annotations)
+    coverage = None
+    if num_annotatable:
+      coverage = np.round(float(self._num_annotated/num_annotatable), 2)
+    consistency = None
+    if self._num_annotated:
+      consistency = np.round(self._num_consistent/self._num_annotated, 2)
+    specificity = None
+    if self._num_consistent:
+      specificity = np.round(float(self._specificity_sum/self._num_consistent), 2)
+    return {'annotatable_elements': num_annotatable if num_annotatable else 0.0,
+            'annotated_elements': self._num_annotated if self._num_annotated else None,
+            'coverage': coverage,
+            'consistent_elements': self._num_consistent if self._num_consistent else None,
+            'consistency': consistency,
+            'specificity': specificity}
+
+  def getMetricsRow(self):
+    """
+    Get the metrics as a row, e.g., for
+    sbmate.AnnotationMetrics.fromMetricsRow.
+
+    Returns
+    -------
+    '': dict
+        Dictionary with keys 'index', 'columns' and 'data'.
+    """
+    record = self.getRecord()
+    return {'index': [self.model_name],
+            'columns': list(record.keys()),
+            'data': [list(record.values())]}
@@ -0,0 +1,171 @@
+# sharding.py
+"""
+Deterministic sharding of a corpus of models.
+Each model is assigned to a shard by hash of its path,
+so shards can be scored independently
+(e.g., on different machines sharing storage)
+and merged afterwards.
+Paths should be given the same way to every shard.
+"""
+
+import hashlib
+import json
+import os
+from SBMate import constants as cn
+from SBMate import manifest as mf
+
+SHARD_FORMAT = 1
+
+
+def getShardIndex(file_path, num_shards):
+  """
+  Get the shard of a model file.
+
+  Parameters
+  ----------
+  file_path: str
+  num_shards: int
+
+  Returns
+  -------
+  '': int
+      Shard index, 0 <= index < num_shards.
+  """
+  digest = hashlib.sha1(os.path.normpath(file_path).encode()).hexdigest()
+  return int(digest, 16) % num_shards
+
+
+def selectShard(file_list, shard_index, num_shards):
+  """
+  Get the model files of one shard.
+
+  Parameters
+  ----------
+  file_list: str-list
+      Model files of the whole corpus.
+  shard_index: int
+  num_shards: int
+
+  Returns
+  -------
+  '': str-list
+      Model files of the shard, in the order of file_list.
+  """
+  if num_shards < 1 or not 0 <= shard_index < num_shards:
+    raise ValueError("Shard index should be in [0, %d)." % num_shards)
+  return [one_file for one_file in file_list \
+          if getShardIndex(one_file, num_shards) == shard_index]
+
+
+def getCorpusId(file_list):
+  """
+  Get an identifier of a corpus,
+  so shards of different corpora are not merged.
+
+  Parameters
+  ----------
+  file_list: str-list
+
+  Returns
+  -------
+  '': str
+      Hexadecimal digest.
+  """
+  digest = hashlib.sha256()
+  for one_file in file_list:
+    digest.update((os.path.normpath(one_file) + '\n').encode())
+  return digest.hexdigest()
+
+
+def writeShard(path, rows, file_list, corpus_list, shard_index, num_shards):
+  """
+  Write the partial result file of a shard.
+  The file describes itself: corpus, shard,
+  and position of each model in the corpus.
+
+  Parameters
+  ----------
+  path: str
+      Location of the partial result file.
+  rows: dict-list
+      Metrics rows of the models in file_list.
+  file_list: str-list
+      Model files of the shard.
+  corpus_list: str-list
+      Model files of the whole corpus.
+  shard_index: int
+  num_shards: int
+  """
+  positions = dict()
+  for position, one_file in enumerate(corpus_list):
+    positions.setdefault(one_file, []).append(position)
+  entries = []
+  for one_file, one_row in zip(file_list, rows):
+    entries.append({'position': positions[one_file].pop(0),
+                    'file': one_file,
+                    'row': one_row})
+  mf.dumpJson({'format': SHARD_FORMAT,
+               'sbmate_version': cn.SBMATE_VERSION,
+               'corpus_id': getCorpusId(corpus_list),
+               'corpus_size': len(corpus_list),
+               'shard_index': shard_index,
+               'num_shards': num_shards,
+               'entries': entries},
+              path)
+
+
+def readShard(path):
+  """
+  Parameters
+  ----------
+  path: str
+      Location of a partial result file.
+
+  Returns
+  -------
+  '': dict
+  """
+  with open(path) as f:
+    shard = json.load(f)
+  if shard.get('format') != SHARD_FORMAT:
+    raise ValueError("%s is not a shard result file." % path)
+  return shard
+
+
+def mergeShards(shard_files):
+  """
+  Combine the rows of partial result files.
+
+  Parameters
+  ----------
+  shard_files: str-list
+      Locations of partial result files.
+
+  Returns
+  -------
+  '': dict-list
+      Metrics rows, in the order of the corpus.
+  """
+  if not shard_files:
+    raise ValueError("No shard files to merge.")
+  shards = [readShard(one_file) for one_file in shard_files]
+  corpus_keys = set([(one_shard['corpus_id'], one_shard['num_shards']) \
+                     for one_shard in shards])
+  if len(corpus_keys) > 1:
+    raise ValueError("Shards are from different corpora or shardings.")
+  num_shards = shards[0]['num_shards']
+  shard_to_files = dict()
+  for one_file, one_shard in zip(shard_files, shards):
+    shard_to_files.setdefault(one_shard['shard_index'], []).append(one_file)
+  duplicates = ["%d (%s)" % (idx, ', '.join(shard_to_files[idx])) \
+                for idx in sorted(shard_to_files) if len(shard_to_files[idx]) > 1]
+  if duplicates:
+    raise ValueError("Duplicate shards: %s." % '; '.join(duplicates))
+  missing = [str(idx) for idx in range(num_shards) if idx not in shard_to_files]
+  if missing:
+    raise ValueError("Missing shards: %s of %d." % (', '.join(missing), num_shards))
+  entries = [one_entry for one_shard in shards for one_entry in one_shard['entries']]
+  if len(entries) != shards[0]['corpus_size']:
+    raise ValueError("Shards have %d of %d models." % (len(entries), shards[0]['corpus_size']))
+  entries.sort(key=lambda one_entry: one_entry['position'])
+  return [one_entry['row'] for one_entry in entries]
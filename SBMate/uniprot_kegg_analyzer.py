@@ -4,15 +4,19 @@ Analyzer class for non-DAG knowledge resources
 such as UNIPROT and KEGG.
 The two classes calculate consistency & specificity, 
 and returns appropriate values. 
+requests is imported at the first remote lookup.
 """
 
 import collections
-import libsbml
-import numpy as np
+import json
 import os
 import re
-import requests
+import time
 from SBMate import constants as cn
+from SBMate import identifier_syntax as ids
+from SBMate import instrumentation as ins
+from SBMate import manifest as mf
+from SBMate import rate_limiter as rl
 
 
 ONT_TO_URL= {"uniprot":"https://www.uniprot.org/uniprot/",
@@ -20,6 +24,228 @@ ONT_TO_URL= {"uniprot":"https://www.uniprot.org/uniprot/",
              "kegg_species":"https://www.genome.jp/entry/",
             }
 KEGG_ERROR_MESSAGE = "No such data was found"
+# responses that do not tell whether a term exists
+TRANSIENT_STATUS_CODES = {408, 429}
+# seconds to wait for a connection or a response
+# of UniProt/KEGG, so a stalled server cannot hang scoring
+REQUEST_TIMEOUT = 30.0
+
+
+class ValidationCache(object):
+  """
+  Cache of remote lookup results,
+  so each term is queried only once.
+
+  Attributes
+  ----------
+  results: dict
+      Dictionary of {'ontology:term': bool}.
+
+  Methods
+  -------
+  get (ontology, term)
+      Get the cached result, or None.
+  set (ontology, term, result)
+      Store a result.
+  load (path)
+      Add results stored in a .json file.
+  save (path)
+      Write results to a .json file.
+  startRecording ()
+      Start recording the keys of stored results.
+  stopRecording ()
+      Get the results stored since startRecording.
+  """
+
+  def __init__(self):
+    self.results = dict()
+    # keys stored since startRecording(); None if not recording
+    self._recorded = None
+
+  def getKey(self, ontology, term):
+    """
+    Parameters
+    ----------
+    ontology: str
+    term: str
+
+    Returns
+    -------
+    '': str
+    """
+    return ontology + ':' + term
+
+  def get(self, ontology, term):
+    """
+    Parameters
+    ----------
+    ontology: str
+    term: str
+
+    Returns
+    -------
+    '': bool/None
+        None if the term was not queried yet.
+    """
+    return self.results.get(self.getKey(ontology, term))
+
+  def set(self, ontology, term, result):
+    """
+    Parameters
+    ----------
+    ontology: str
+    term: str
+    result: bool
+    """
+    key = self.getKey(ontology, term)
+    self.results[key] = result
+    if self._recorded is not None:
+      self._recorded[key] = None
+
+  def startRecording(self):
+    """
+    Start recording the keys of results stored by set(),
+    e.g., to send the lookups of one model to another process.
+    """
+    self._recorded = dict()
+
+  def stopRecording(self):
+    """
+    Stop recording.
+
+    Returns
+    -------
+    '': dict
+        Results stored (or overwritten) since startRecording.
+    """
+    recorded = self._recorded
+    self._recorded = None
+    if recorded is None:
+      return dict()
+    return {one_key: self.results[one_key] for one_key in recorded}
+
+  def load(self, path):
+    """
+    Add results stored by save().
+
+    Parameters
+    ----------
+    path: str
+    """
+    if os.path.isfile(path):
+      with open(path) as f:
+        self.results.update(json.load(f))
+
+  def save(self, path):
+    """
+    Atomically write results to path.
+
+    Parameters
+    ----------
+    path: str
+    """
+    mf.dumpJson(self.results, path)
+
+# shared by all NonDAGAnalyzer instances of a process
+VALIDATION_CACHE = ValidationCache()
+# rate_limiter.RateLimiter of remote lookups; None for no limit
+RATE_LIMITER = None
+
+
+def validateTerm(ontology, term, offline=False, budget=None):
+  """
+  Check whether a term exists in a remote knowledge resource.
+  Malformed terms are rejected without a query.
+  Queries are limited by RATE_LIMITER, if set.
+  Results are kept in VALIDATION_CACHE.
+
+  Parameters
+  ----------
+  ontology: str
+      One of ONT_TO_URL keys.
+  term: str
+      Identifier to check.
+  offline: bool
+      If True, the term is not queried,
+      and assumed valid if well-formed, unless cached.
+  budget: budget.TimeBudget
+      If given, the query is not made once the budget
+      has run out, and times out when it runs out.
+      Queries time out after REQUEST_TIMEOUT in any case.
+
+  Returns
+  -------
+  '': bool/None
+      True if the term exists;
+      None if unresolved (out of budget, timed out or failed);
+      unresolved terms are not cached.
+  """
+  reason = ids.checkIdentifier(ontology, term)
+  if reason is not None:
+    ins.count(ins.IDENTIFIERS_REJECTED)
+    ins.count('rejected.' + reason)
+    return False
+  cached = VALIDATION_CACHE.get(ontology, term)
+  if cached is not None:
+    ins.count(ins.VALIDATION_CACHE_HITS)
+    return cached
+  ins.count(ins.VALIDATION_CACHE_MISSES)
+  if offline:
+    return True
+  url = ONT_TO_URL[ontology]+term
+  if budget is not None and budget.isExpired():
+    return None
+  if RATE_LIMITER is not None:
+    RATE_LIMITER.acquire(url)
+  import requests
+  timeout = REQUEST_TIMEOUT
+  if budget is not None:
+    remaining = budget.getRemaining()
+    if remaining == 0.0:
+      return None
+    timeout = min(remaining, REQUEST_TIMEOUT)
+  start = time.perf_counter()
+  try:
+    r = requests.get(url, timeout=timeout)
+  except requests.exceptions.RequestException:
+    # timeouts, connection errors, etc. leave the term unresolved
+    ins.observe(ins.HTTP_LATENCY, time.perf_counter() - start)
+    return None
+  if ins.COLLECTOR is not None:
+    ins.observe(ins.HTTP_LATENCY, time.perf_counter() - start)
+    ins.count(ins.HTTP_REQUESTS)
+    ins.count(ins.HTTP_BYTES, len(r.content))
+  # for kegg, needs to check whether the text below is in the page
+  if KEGG_ERROR_MESSAGE in r.text:
+    res = False
+  else:
+    res = r.ok
+  # server errors are not cached, so the term is queried again
+  if r.status_code < 500 and r.status_code not in TRANSIENT_STATUS_CODES:
+    VALIDATION_CACHE.set(ontology, term, res)
+  return res
+
+
+def getRemoteTerms(one_annotation):
+  """
+  Get the terms of a model entity
+  that NonDAGAnalyzer would query.
+
+  Parameters
+  ----------
+  one_annotation: dict
+      Annotations of the entity per ontology,
+      i.e., one item of SBMLAnnotation.annotations.
+
+  Returns
+  -------
+  '': tuple-list
+      List of (ontology, term).
+  """
+  acceptable_onts = cn.OBJECT_ONT_MAP_FILT[one_annotation['object_type']]
+  return [(one_ont, one_term) for one_ont in ONT_TO_URL \
+          if one_annotation[one_ont] and one_ont in acceptable_onts \
+          for one_term in one_annotation[one_ont]]
 
 
 class NonDAGAnalyzer(object):
@@ -28,12 +254,21 @@ class NonDAGAnalyzer(object):
 
   Attributes
   ----------
+  offline: bool (class attribute)
+      If True, terms are never queried;
+      terms missing from VALIDATION_CACHE are assumed valid.
   term_id: str-list
       List of identifiers to analyze.
   ontology: str
       Appropriate ontology type.
   object_type: libsbml.AutoProperty
       Type of the model entity.
+  budget: budget.TimeBudget/None
+      Time budget of remote lookups.
+  unresolved: str-list
+      Terms not resolved (within budget, or
+      because the query failed); they are assumed
+      valid (provisionally).
   consistent: bool
       Bool determining whether the entity-object is consistent. 
   weight_dict: dict
@@ -55,9 +290,10 @@ class NonDAGAnalyzer(object):
       Get specificity of a list of terms.
       These ontologies are 1.0 if consistent. 
   """
+  offline = False
 
   def __init__(self, term_id, ontology,
-               object_type, qualifier_dict):
+               object_type, qualifier_dict, budget=None):
     """
     Parameters
     ----------
@@ -70,10 +306,14 @@ class NonDAGAnalyzer(object):
         Type of model entity. For example, libsbml.Reaction
     qualifier_dict: dict
         Dictionary of Qualifier {ontology_id: qualifier}
+    budget: budget.TimeBudget
+        If given, time budget of remote lookups.
     """
     self.term_id = term_id
     self.ontology = ontology
     self.object_type = object_type
+    self.budget = budget
+    self.unresolved = []
     self.consistent = self.getConsistency(inp_term=self.term_id)
     # create a dictionary of {term_id: weight}
     self.weight_dict = dict()
@@ -94,14 +334,14 @@ class NonDAGAnalyzer(object):
     Returns
     -------
     '': bool
-        True if consistent; otherwise False
+        True if consistent (or unresolved);
+        otherwise False
     """
-    r = requests.get(ONT_TO_URL[self.ontology]+one_term)
-    # for kegg, needs to check whether the text below is in the page
-    if KEGG_ERROR_MESSAGE in r.text:
-      return False
-    else:
-      return r.ok
+    res = validateTerm(self.ontology, one_term, offline=self.offline, budget=self.budget)
+    if res is None:
+      self.unresolved.append(one_term)
+      return True
+    return res
 
   def getConsistency(self, inp_term):
     """
@@ -134,12 +374,8 @@ class NonDAGAnalyzer(object):
     # second, check if the object type and ontology match
     if not self.ontology in cn.OBJECT_ONT_MAP_FILT[self.object_type]:
       return False
-    # finally, query the term and get consistency
-    res = [self.getOneTermConsistency(t) for t in inp_list]
-    if all(res):
-      return True
-    else:
-      return False
+    # finally, query the terms (until one fails) and get consistency
+    return all(self.getOneTermConsistency(t) for t in inp_list)
 
   def getSpecificity(self, inp_term):
     """
@@ -163,6 +399,7 @@ class NonDAGAnalyzer(object):
       inp_list = [inp_term]
     else:
       inp_list = inp_term
+    import numpy as np
     return np.mean([float(1.0)*self.weight_dict[val] for val in inp_list])
 
 
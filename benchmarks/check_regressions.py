@@ -0,0 +1,286 @@
+# check_regressions.py
+"""
+Performance regression gate: runs the benchmarks
+(run_benchmarks.py) with the configuration of a committed
+baseline, and compares the results to it.
+1. time: a stage regresses if its best time grows by more than
+   a relative threshold, and by more than the noise of
+   the two runs (standard deviation of repeats) and a minimum delta.
+2. scaling: the time of each stage on generated models of
+   increasing sizes is fitted as time ~ size^exponent;
+   a stage regresses if its exponent exceeds the maximum
+   (or the baseline exponent, plus a tolerance), e.g.,
+   when a linear stage becomes quadratic.
+Exits with 1 if any stage regressed.
+
+Example
+-------
+python benchmarks/check_regressions.py
+python benchmarks/check_regressions.py --results bench.json
+python benchmarks/check_regressions.py --update-baseline
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from SBMate import manifest as mf
+import run_benchmarks as rb
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+# configuration of a new baseline
+BASELINE_CONFIG = {'repeats': 5, 'num_species': 2000, 'num_reactions': 1000,
+                   'latency': 0.0, 'datasets': ['biomd', 'large'],
+                   'scaling_sizes': [250, 500, 1000, 2000]}
+# relative growth of time allowed
+REL_THRESHOLD = 0.25
+# growth should also exceed NOISE_FACTOR times the standard deviation
+NOISE_FACTOR = 3.0
+# and MIN_DELTA seconds
+MIN_DELTA = 0.005
+# exponents of size allowed; about 1.0 is linear, 2.0 quadratic
+MAX_EXPONENT = 1.25
+EXPONENT_TOLERANCE = 0.25
+# environment keys that should match for comparable times
+ENVIRONMENT_KEYS = ['python', 'platform', 'processor', 'libsbml']
+
+
+def compareTimes(baseline, candidate, rel_threshold=REL_THRESHOLD,
+                 noise_factor=NOISE_FACTOR, min_delta=MIN_DELTA):
+  """
+  Compare the timings of one stage.
+
+  Parameters
+  ----------
+  baseline: dict
+      Timings of the baseline (see run_benchmarks.timeRepeats).
+  candidate: dict
+      Timings of the new run.
+  rel_threshold: float
+  noise_factor: float
+  min_delta: float
+
+  Returns
+  -------
+  '': dict
+      Dictionary with keys 'baseline', 'value' (best times),
+      'ratio', 'limit' (time allowed) and 'regressed'.
+  """
+  noise = max(baseline['stdev'], candidate['stdev'])
+  limit = baseline['min'] + max(baseline['min'] * rel_threshold,
+                                noise_factor * noise,
+                                min_delta)
+  ratio = candidate['min'] / baseline['min'] if baseline['min'] > 0 else float('inf')
+  return {'baseline': baseline['min'],
+          'value': candidate['min'],
+          'ratio': ratio,
+          'limit': limit,
+          'regressed': candidate['min'] > limit}
+
+
+def getScalingExponent(sizes, times):
+  """
+  Fit time ~ size^exponent by least squares
+  on logarithms.
+
+  Parameters
+  ----------
+  sizes: int-list
+  times: float-list
+
+  Returns
+  -------
+  '': float/None
+      None if fewer than two sizes.
+  """
+  points = [(math.log(s), math.log(max(t, 1e-9))) for s, t in zip(sizes, times) if s > 0]
+  if len(points) < 2:
+    return None
+  mean_x = sum([p[0] for p in points]) / len(points)
+  mean_y = sum([p[1] for p in points]) / len(points)
+  var_x = sum([(p[0] - mean_x)**2 for p in points])
+  if var_x == 0:
+    return None
+  return sum([(p[0] - mean_x) * (p[1] - mean_y) for p in points]) / var_x
+
+
+def getScalingExponents(scaling):
+  """
+  Parameters
+  ----------
+  scaling: list
+      Results of run_benchmarks.runScaling.
+
+  Returns
+  -------
+  '': dict
+      Dictionary of {stage: exponent}.
+  """
+  sizes = [one_size['entities'] for one_size in scaling]
+  return {one_stage: getScalingExponent(sizes,
+                                        [s['results'][one_stage]['min'] for s in scaling]) \
+          for one_stage in rb.STAGES}
+
+
+def compareBenchmarks(baseline, bench, rel_threshold=REL_THRESHOLD,
+                      noise_factor=NOISE_FACTOR, min_delta=MIN_DELTA,
+                      max_exponent=MAX_EXPONENT,
+                      exponent_tolerance=EXPONENT_TOLERANCE):
+  """
+  Compare benchmark results to a baseline.
+
+  Parameters
+  ----------
+  baseline: dict
+  bench: dict
+      Results of run_benchmarks.runBenchmarks.
+  rel_threshold: float
+  noise_factor: float
+  min_delta: float
+  max_exponent: float
+  exponent_tolerance: float
+
+  Returns
+  -------
+  '': list
+      One dictionary per dataset and stage, with keys
+      'kind' ('time' or 'scaling'), 'dataset', 'stage',
+      'baseline', 'value', 'ratio', 'limit' and 'regressed'.
+  """
+  if bench['config'] != baseline['config']:
+    raise ValueError("Benchmarks were run with a different configuration "
+                     "than the baseline: %s, not %s." % (bench['config'], baseline['config']))
+  res = []
+  for one_dataset, stages in baseline['results'].items():
+    for one_stage in rb.STAGES:
+      one_res = compareTimes(stages[one_stage], bench['results'][one_dataset][one_stage],
+                             rel_threshold=rel_threshold, noise_factor=noise_factor,
+                             min_delta=min_delta)
+      one_res.update({'kind': 'time', 'dataset': one_dataset, 'stage': one_stage})
+      res.append(one_res)
+  if 'startup' in baseline and 'startup' in bench:
+    one_res = compareTimes(baseline['startup'], bench['startup'],
+                           rel_threshold=rel_threshold, noise_factor=noise_factor,
+                           min_delta=min_delta)
+    one_res.update({'kind': 'time', 'dataset': '-', 'stage': 'import'})
+    res.append(one_res)
+  if 'scaling' in bench:
+    exponents = getScalingExponents(bench['scaling'])
+    baseline_exponents = getScalingExponents(baseline['scaling']) if 'scaling' in baseline else {}
+    for one_stage in rb.STAGES:
+      exponent = exponents[one_stage]
+      baseline_exponent = baseline_exponents.get(one_stage)
+      limit = max_exponent
+      if baseline_exponent is not None:
+        limit = max(limit, baseline_exponent + exponent_tolerance)
+      res.append({'kind': 'scaling', 'dataset': 'scaling', 'stage': one_stage,
+                  'baseline': baseline_exponent,
+                  'value': exponent,
+                  'ratio': None,
+                  'limit': limit,
+                  'regressed': exponent is not None and exponent > limit})
+  return res
+
+
+def getReport(findings, baseline=None, bench=None):
+  """
+  Parameters
+  ----------
+  findings: list
+      Result of compareBenchmarks.
+  baseline: dict
+  bench: dict
+      If both are given, differences of environment are reported.
+
+  Returns
+  -------
+  '': str
+      One line per dataset and stage; regressions are marked.
+  """
+  def fmt(value, form):
+    return '-' if value is None else form % value
+  lines = []
+  if baseline is not None and bench is not None:
+    for one_key in ENVIRONMENT_KEYS:
+      if baseline['environment'].get(one_key) != bench['environment'].get(one_key):
+        lines.append("warning: %s differs from the baseline (%s, not %s)"
+                     % (one_key, bench['environment'].get(one_key),
+                        baseline['environment'].get(one_key)))
+  lines.append("%-8s %-8s %-12s %10s %10s %8s %10s" % ('kind', 'dataset', 'stage',
+                                                      'baseline', 'value', 'ratio', 'limit'))
+  for one_res in findings:
+    form = '%10.4f' if one_res['kind'] == 'time' else '%10.2f'
+    lines.append("%-8s %-8s %-12s %10s %10s %8s %10s%s"
+                 % (one_res['kind'], one_res['dataset'], one_res['stage'],
+                    fmt(one_res['baseline'], form), fmt(one_res['value'], form),
+                    fmt(one_res['ratio'], '%8.2f'), fmt(one_res['limit'], form),
+                    '  REGRESSED' if one_res['regressed'] else ''))
+  regressed = [r for r in findings if r['regressed']]
+  if regressed:
+    lines.append("%d regression(s): %s"
+                 % (len(regressed), ', '.join(['%s/%s' % (r['dataset'], r['stage']) \
+                                               for r in regressed])))
+  else:
+    lines.append("No regression.")
+  return '\n'.join(lines) + '\n'
+
+
+def loadJson(file_path):
+  with open(file_path) as f:
+    return json.load(f)
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Compare benchmarks of SBMate to a baseline.')
+  parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+      help='Baseline file (default: benchmarks/baseline.json).')
+  parser.add_argument('--results', default=None,
+      help='Results of run_benchmarks.py to check; if not given, benchmarks are run '
+           'with the configuration of the baseline.')
+  parser.add_argument('--update-baseline', action='store_true',
+      help='Run the benchmarks and write them as the baseline.')
+  parser.add_argument('--threshold', type=float, default=REL_THRESHOLD,
+      help='Relative growth of time allowed (default: %s).' % REL_THRESHOLD)
+  parser.add_argument('--noise-factor', type=float, default=NOISE_FACTOR,
+      help='Growth should exceed this many standard deviations (default: %s).' % NOISE_FACTOR)
+  parser.add_argument('--min-delta', type=float, default=MIN_DELTA,
+      help='Growth should exceed this many seconds (default: %s).' % MIN_DELTA)
+  parser.add_argument('--max-exponent', type=float, default=MAX_EXPONENT,
+      help='Scaling exponent allowed (default: %s).' % MAX_EXPONENT)
+  parser.add_argument('--exponent-tolerance', type=float, default=EXPONENT_TOLERANCE,
+      help='Growth of exponent over the baseline allowed (default: %s).' % EXPONENT_TOLERANCE)
+  parser.add_argument('-o', '--output', default=None,
+      help='Write the results of the run (.json).')
+  args = parser.parse_args(argv)
+  if args.update_baseline:
+    bench = rb.runBenchmarks(**BASELINE_CONFIG)
+    mf.dumpJson(bench, args.baseline)
+    sys.stdout.write(rb.getSummary(bench))
+    return 0
+  baseline = loadJson(args.baseline)
+  if args.results is None:
+    bench = rb.runBenchmarks(**baseline['config'])
+  else:
+    bench = loadJson(args.results)
+  if args.output is not None:
+    mf.dumpJson(bench, args.output)
+  try:
+    findings = compareBenchmarks(baseline, bench,
+                                 rel_threshold=args.threshold,
+                                 noise_factor=args.noise_factor,
+                                 min_delta=args.min_delta,
+                                 max_exponent=args.max_exponent,
+                                 exponent_tolerance=args.exponent_tolerance)
+  except ValueError as err:
+    sys.stderr.write("%s\n" % err)
+    return 2
+  sys.stdout.write(getReport(findings, baseline, bench))
+  return 1 if any([r['regressed'] for r in findings]) else 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
@@ -0,0 +1,338 @@
+# run_benchmarks.py
+"""
+Benchmarks of SBMate, timed separately per stage:
+  1. extraction: SBMLAnnotation of each model
+  2. roots: DAGAnalyzer (root finding) of each GO/SBO/ChEBI annotation
+  3. specificity: getSpecificity of consistent DAG analyzers
+  4. consistency: consistency of all annotated entities
+  5. end_to_end: AnnotationMetrics.getMetrics of all models
+on the bundled BioModels and on a large generated model
+(model_generator.ModelGenerator),
+and the startup (import of SBMate.sbmate in a new interpreter).
+With --scaling, the stages are also timed on generated models
+of increasing sizes, to check how they scale (check_regressions.py).
+UniProt/KEGG lookups are served by a local stand-in (stand_in.py).
+Results are written as .json, to compare runs.
+
+Example
+-------
+python benchmarks/run_benchmarks.py --repeats 5 --output bench.json
+"""
+
+import argparse
+import glob
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import libsbml
+from SBMate import constants as cn
+from SBMate import context as mctx
+from SBMate import dag_analyzer as da
+from SBMate import manifest as mf
+from SBMate import model_generator as mg
+from SBMate import sbml_annotation as sa
+from SBMate import sbmate
+from SBMate import uniprot_kegg_analyzer as uka
+import stand_in
+
+BENCHMARK_FORMAT = 1
+STAGES = ['extraction', 'roots', 'specificity', 'consistency', 'end_to_end']
+IMPORT_CODE = "import time; start = time.perf_counter(); import SBMate.sbmate; " + \
+              "print(time.perf_counter() - start)"
+
+
+def _getStatistics(times, num_items):
+  return {'items': num_items,
+          'times': times,
+          'min': min(times),
+          'median': statistics.median(times),
+          'mean': statistics.mean(times),
+          'stdev': statistics.stdev(times) if len(times) > 1 else 0.0}
+
+
+def timeRepeats(func, repeats):
+  """
+  Parameters
+  ----------
+  func: callable
+      Called with no argument;
+      it should return the number of items processed.
+  repeats: int
+
+  Returns
+  -------
+  '': dict
+      Times (seconds) of each repeat and their statistics.
+  """
+  times = []
+  num_items = None
+  for _ in range(repeats):
+    start = time.perf_counter()
+    num_items = func()
+    times.append(time.perf_counter() - start)
+  return _getStatistics(times, num_items)
+
+
+def timeImport(repeats):
+  """
+  Time the import of SBMate.sbmate,
+  each in a new interpreter.
+
+  Parameters
+  ----------
+  repeats: int
+
+  Returns
+  -------
+  '': dict
+      Times (seconds) of each repeat and their statistics.
+  """
+  env = dict(os.environ)
+  env['PYTHONPATH'] = os.pathsep.join([cn.PROJECT_DIR] + \
+                                      [p for p in [env.get('PYTHONPATH')] if p])
+  times = []
+  for _ in range(repeats):
+    res = subprocess.run([sys.executable, '-c', IMPORT_CODE],
+                         capture_output=True, text=True, env=env, check=True)
+    times.append(float(res.stdout))
+  return _getStatistics(times, 1)
+
+
+def _getDAGAnnotations(annotations_list):
+  """
+  List of (ontology, terms, object_type, qualifier_dict)
+  of GO/SBO/ChEBI annotations.
+  """
+  res = []
+  for annotations in annotations_list:
+    for one_entity, one_anot in annotations.annotations.items():
+      qualifier_dict = mctx.getQualifierDict(annotations.annotation_by_qualifier[one_entity])
+      for one_ont in mctx.LOCAL_ONTOLOGIES:
+        if one_anot[one_ont]:
+          res.append((one_ont, one_anot[one_ont], one_anot['object_type'], qualifier_dict))
+  return res
+
+
+def _mkDAGAnalyzers(dag_annotations):
+  return [da.DAGAnalyzer(term_id=terms, ontology=one_ont,
+                         object_type=object_type, qualifier_dict=qualifier_dict) \
+          for one_ont, terms, object_type, qualifier_dict in dag_annotations]
+
+
+def runDataset(file_list, repeats, latency=0.0):
+  """
+  Run the benchmarks of each stage on models.
+
+  Parameters
+  ----------
+  file_list: str-list
+  repeats: int
+  latency: float
+      Latency (seconds) of the stand-in of UniProt/KEGG.
+
+  Returns
+  -------
+  '': dict
+      Dictionary of {stage: timings}.
+  """
+  res = dict()
+  res['extraction'] = timeRepeats(
+      lambda: sum([len(sa.SBMLAnnotation(file=f).annotations) for f in file_list]),
+      repeats)
+  annotations_list = [sa.SBMLAnnotation(file=f) for f in file_list]
+  dag_annotations = _getDAGAnnotations(annotations_list)
+  res['roots'] = timeRepeats(lambda: len(_mkDAGAnalyzers(dag_annotations)), repeats)
+  analyzers = [r for r in _mkDAGAnalyzers(dag_annotations) if r.consistent]
+
+  def getSpecificity():
+    for one_analyzer in analyzers:
+      one_analyzer._specificity.clear()
+      one_analyzer.getSpecificity(one_analyzer.term_id)
+    return len(analyzers)
+  res['specificity'] = timeRepeats(getSpecificity, repeats)
+
+  def getConsistency():
+    # each repeat starts without cached lookups
+    uka.VALIDATION_CACHE.results.clear()
+    num_entities = 0
+    for annotations in annotations_list:
+      context = mctx.ModelContext(annotations)
+      for one_entity in context.annotated_entities:
+        context.isConsistent(one_entity)
+        num_entities += 1
+    return num_entities
+
+  def getMetrics():
+    uka.VALIDATION_CACHE.results.clear()
+    sbmate.AnnotationMetrics.getMetrics(file_list, output="table")
+    return len(file_list)
+  with stand_in.serveLookups(latency=latency):
+    res['consistency'] = timeRepeats(getConsistency, repeats)
+    res['end_to_end'] = timeRepeats(getMetrics, repeats)
+  return res
+
+
+def getEnvironment():
+  """
+  Returns
+  -------
+  '': dict
+      Versions and machine of the run.
+  """
+  return {'sbmate_version': cn.SBMATE_VERSION,
+          'python': platform.python_version(),
+          'platform': platform.platform(),
+          'processor': platform.processor(),
+          'libsbml': libsbml.getLibSBMLDottedVersion()}
+
+
+def runScaling(sizes, repeats, latency=0.0):
+  """
+  Run the benchmarks of each stage on generated models
+  of increasing sizes.
+
+  Parameters
+  ----------
+  sizes: int-list
+      Numbers of species; each model has half as many reactions.
+  repeats: int
+  latency: float
+
+  Returns
+  -------
+  '': list
+      One dictionary per size, with keys 'num_species',
+      'num_reactions', 'entities' (number of annotatable entities)
+      and 'results' (dictionary of {stage: timings}).
+  """
+  res = []
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    for one_size in sizes:
+      model_file = os.path.join(tmp_dir, 'model_%d.xml' % one_size)
+      mg.ModelGenerator(seed=0).write(model_file, num_compartments=3,
+                                      num_species=one_size,
+                                      num_reactions=one_size // 2)
+      one_res = runDataset([model_file], repeats, latency)
+      res.append({'num_species': one_size,
+                  'num_reactions': one_size // 2,
+                  'entities': one_res['extraction']['items'],
+                  'results': one_res})
+  return res
+
+
+def runBenchmarks(repeats=5, num_species=2000, num_reactions=1000,
+                  latency=0.0, datasets=None, scaling_sizes=None):
+  """
+  Run all benchmarks.
+
+  Parameters
+  ----------
+  repeats: int
+  num_species: int
+      Number of species of the model of the 'large' dataset.
+  num_reactions: int
+      Number of reactions of the model of the 'large' dataset.
+  latency: float
+  datasets: str-list/None
+      Names of datasets to run ('biomd', 'large'); if None, all.
+  scaling_sizes: int-list/None
+      If given, numbers of species of the models of runScaling.
+
+  Returns
+  -------
+  '': dict
+      Benchmark results, as written by main.
+  """
+  if datasets is None:
+    datasets = ['biomd', 'large']
+  results = dict()
+  with tempfile.TemporaryDirectory() as tmp_dir:
+    if 'biomd' in datasets:
+      biomd_files = sorted(glob.glob(os.path.join(cn.TEST_DIR, '*.xml')))
+      results['biomd'] = runDataset(biomd_files, repeats, latency)
+    if 'large' in datasets:
+      large_file = os.path.join(tmp_dir, 'large_model.xml')
+      mg.ModelGenerator(seed=0).write(large_file, num_compartments=3,
+                                      num_species=num_species,
+                                      num_reactions=num_reactions)
+      results['large'] = runDataset([large_file], repeats, latency)
+  bench = {'format': BENCHMARK_FORMAT,
+           'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+           'environment': getEnvironment(),
+           'config': {'repeats': repeats, 'num_species': num_species,
+                      'num_reactions': num_reactions, 'latency': latency,
+                      'datasets': datasets, 'scaling_sizes': scaling_sizes},
+           'startup': timeImport(repeats),
+           'results': results}
+  if scaling_sizes:
+    bench['scaling'] = runScaling(scaling_sizes, repeats, latency)
+  return bench
+
+
+def getSummary(bench):
+  """
+  Parameters
+  ----------
+  bench: dict
+      Benchmark results.
+
+  Returns
+  -------
+  '': str
+      One line per dataset and stage.
+  """
+  lines = ["%-8s %-12s %8s %10s %10s" % ('dataset', 'stage', 'items', 'min (s)', 'median (s)')]
+  for one_dataset, stages in bench['results'].items():
+    for one_stage in STAGES:
+      one_res = stages[one_stage]
+      lines.append("%-8s %-12s %8d %10.4f %10.4f" % (one_dataset, one_stage, one_res['items'],
+                                                     one_res['min'], one_res['median']))
+  if 'startup' in bench:
+    one_res = bench['startup']
+    lines.append("%-8s %-12s %8d %10.4f %10.4f" % ('-', 'import', one_res['items'],
+                                                   one_res['min'], one_res['median']))
+  for one_size in bench.get('scaling', []):
+    for one_stage in STAGES:
+      one_res = one_size['results'][one_stage]
+      lines.append("%-8s %-12s %8d %10.4f %10.4f" % ('n=%d' % one_size['entities'], one_stage,
+                                                     one_res['items'], one_res['min'],
+                                                     one_res['median']))
+  return '\n'.join(lines) + '\n'
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser(description='Benchmarks of SBMate.')
+  parser.add_argument('--repeats', type=int, default=5,
+      help='Number of runs of each benchmark (default: 5).')
+  parser.add_argument('--species', type=int, default=2000,
+      help='Species of the model of the large dataset (default: 2000).')
+  parser.add_argument('--reactions', type=int, default=1000,
+      help='Reactions of the model of the large dataset (default: 1000).')
+  parser.add_argument('--latency', type=float, default=0.0,
+      help='Latency (seconds) of the UniProt/KEGG stand-in (default: 0).')
+  parser.add_argument('--datasets', nargs='+', choices=['biomd', 'large'], default=None,
+      help='Datasets to run (default: all).')
+  parser.add_argument('--scaling', type=int, nargs='+', default=None,
+      help='Also time generated models with these numbers of species.')
+  parser.add_argument('-o', '--output', default=None,
+      help='Results file (.json).')
+  args = parser.parse_args(argv)
+  bench = runBenchmarks(repeats=args.repeats, num_species=args.species,
+                        num_reactions=args.reactions,
+                        latency=args.latency, datasets=args.datasets,
+                        scaling_sizes=args.scaling)
+  sys.stdout.write(getSummary(bench))
+  if args.output is not None:
+    mf.dumpJson(bench, args.output)
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(main())
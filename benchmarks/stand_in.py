@@ -0,0 +1,81 @@
+# stand_in.py
+"""
+Local stand-in for the UniProt and KEGG entry pages,
+so that benchmarks of consistency (remote lookups)
+do not depend on the network.
+Every well-formed term exists, except those listed
+in INVALID_TERMS; an optional latency simulates
+the remote servers.
+"""
+
+import contextlib
+import http.server
+import threading
+import time
+from SBMate import uniprot_kegg_analyzer as uka
+
+INVALID_TERMS = {'C99999', 'R99999', 'P99999'}
+
+
+class _LookupHandler(http.server.BaseHTTPRequestHandler):
+  """
+  Answers GET /uniprot/<term> and GET /entry/<term>.
+  """
+  latency = 0.0
+
+  def do_GET(self):
+    if self.latency:
+      time.sleep(self.latency)
+    term = self.path.rstrip('/').split('/')[-1]
+    if term in INVALID_TERMS:
+      status = 404 if self.path.startswith('/uniprot/') else 200
+      body = uka.KEGG_ERROR_MESSAGE.encode()
+    else:
+      status = 200
+      body = ("Entry %s" % term).encode()
+    self.send_response(status)
+    self.send_header('Content-Type', 'text/plain')
+    self.send_header('Content-Length', str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def log_message(self, format, *args):
+    pass
+
+
+@contextlib.contextmanager
+def serveLookups(latency=0.0):
+  """
+  Serve the stand-in on a free local port,
+  pointing uka.ONT_TO_URL to it.
+  The validation cache is emptied before and restored after.
+
+  Parameters
+  ----------
+  latency: float
+      Seconds of delay of each response.
+
+  Yields
+  ------
+  '': str
+      Base URL of the stand-in.
+  """
+  handler = type('LookupHandler', (_LookupHandler,), {'latency': latency})
+  server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+  thread = threading.Thread(target=server.serve_forever, daemon=True)
+  thread.start()
+  base_url = "http://127.0.0.1:%d" % server.server_address[1]
+  old_urls = dict(uka.ONT_TO_URL)
+  old_results = dict(uka.VALIDATION_CACHE.results)
+  uka.ONT_TO_URL.update({'uniprot': base_url + '/uniprot/',
+                         'kegg_process': base_url + '/entry/',
+                         'kegg_species': base_url + '/entry/'})
+  uka.VALIDATION_CACHE.results.clear()
+  try:
+    yield base_url
+  finally:
+    uka.ONT_TO_URL.update(old_urls)
+    uka.VALIDATION_CACHE.results.clear()
+    uka.VALIDATION_CACHE.results.update(old_results)
+    server.shutdown()
+    server.server_close()
@@ -12,8 +12,12 @@ INSTALL_REQUIRES = [
     "pyyaml",
     "requests"
     ]
+# optional dependencies
+EXTRAS_REQUIRE = {
+    "parquet": ["pyarrow"],
+    }
 
-def doSetup(install_requires):
+def doSetup(install_requires, extras_require=None):
   setup(
       name='SBMate',
       version='1.1.3',
@@ -26,7 +30,11 @@ def doSetup(install_requires):
       long_description_content_type='text/markdown',
       package_dir={'SBMate': 'SBMate'},
       install_requires=install_requires,
+      extras_require=extras_require,
       include_package_data=True,
+      entry_points={
+          'console_scripts': ['sbmate=SBMate.cli:main'],
+        },
       classifiers=[
           'Development Status :: 3 - Alpha',
           'Intended Audience :: Developers',      # Define that your audience are developers
@@ -38,4 +46,4 @@ def doSetup(install_requires):
       )
 
 if __name__ == '__main__':
-  doSetup(INSTALL_REQUIRES)
+  doSetup(INSTALL_REQUIRES, EXTRAS_REQUIRE)
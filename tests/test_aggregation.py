@@ -0,0 +1,60 @@
+# test_aggregation.py
+
+import numpy as np
+import os
+import unittest
+from SBMate import aggregation as agg
+from SBMate import constants as cn
+from SBMate import sbml_annotation as sa
+from SBMate.metric_calculator import MetricCalculator
+
+
+MODEL_NAMES = ['BIOMD0000000012.xml', 'BIOMD0000000013.xml',
+               'BIOMD0000000015.xml', 'BIOMD0000000970.xml']
+
+
+class TestAggregation(unittest.TestCase):
+
+  def setUp(self):
+    self.calculators = [MetricCalculator(annotations=sa.SBMLAnnotation(
+                                           file=os.path.join(cn.TEST_DIR, one_name)),
+                                         model_name=one_name) \
+                        for one_name in MODEL_NAMES]
+
+  def testAggregate(self):
+    for one_calculator in self.calculators:
+      record = one_calculator.calculateRecord()
+      self.assertEqual(record, one_calculator._calculateRecordByEntity())
+      self.assertEqual(list(record.keys()), ['annotatable_elements', 'annotated_elements',
+                                             'coverage', 'consistent_elements',
+                                             'consistency', 'specificity'])
+
+  def testAggregateCorpus(self):
+    table = agg.EntityTable()
+    for one_calculator in self.calculators:
+      table.extend(one_calculator.getEntityTable())
+    self.assertEqual(table.model_names, MODEL_NAMES)
+    self.assertEqual(agg.aggregate(table),
+                     [one_calculator.calculateRecord() for one_calculator in self.calculators])
+    empty_table = agg.EntityTable()
+    empty_table.model_names.append('empty.xml')
+    empty_table.num_entities.append(0)
+    with self.assertRaises(ValueError):
+      agg.aggregate(empty_table)
+
+  def testGetGroupMeans(self):
+    rng = np.random.default_rng(0)
+    groups = [list(rng.random(one_size)) for one_size in [1, 3, 0, 8, 9, 17, 3, 130, 300]]
+    values = np.array([val for one_group in groups for val in one_group])
+    group_ids = np.repeat(np.arange(len(groups)), [len(one_group) for one_group in groups])
+    means = agg.getGroupMeans(values, group_ids, len(groups))
+    for idx, one_group in enumerate(groups):
+      if one_group:
+        # exactly, not approximately
+        self.assertEqual(means[idx], np.mean(one_group))
+      else:
+        self.assertTrue(np.isnan(means[idx]))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,62 @@
+# test_analysis_memo.py
+
+import libsbml
+import unittest
+from SBMate import analysis_memo as am
+from SBMate import uniprot_kegg_analyzer as uka
+
+
+class CountingAnalyzer(object):
+  num_created = 0
+
+  def __init__(self, term_id, ontology, object_type, qualifier_dict):
+    CountingAnalyzer.num_created += 1
+    self.term_id = term_id
+    self.consistent = True
+
+
+class TestAnalysisMemo(unittest.TestCase):
+
+  def setUp(self):
+    CountingAnalyzer.num_created = 0
+    self.memo = am.AnalysisMemo(max_size=2)
+
+  def getAnalyzer(self, term, qualifier='is', object_type=libsbml.Species):
+    return self.memo.getAnalyzer(CountingAnalyzer,
+                                 term_id=[term],
+                                 ontology='chebi',
+                                 object_type=object_type,
+                                 qualifier_dict={term: qualifier, 'other': 'is'})
+
+  def testGetKey(self):
+    key = self.memo.getKey(['CHEBI:1'], 'chebi', libsbml.Species,
+                           {'CHEBI:1': 'is', 'GO:1': 'isVersionOf'})
+    self.assertEqual(key, (libsbml.Species, 'chebi', ('CHEBI:1',), ('is',)))
+    self.assertEqual(self.memo.getKey('CHEBI:1', 'chebi', libsbml.Species, {}),
+                     (libsbml.Species, 'chebi', ('CHEBI:1',), (None,)))
+
+  def testGetAnalyzer(self):
+    one_analyzer = self.getAnalyzer('CHEBI:1')
+    self.assertTrue(one_analyzer is self.getAnalyzer('CHEBI:1'))
+    self.assertFalse(one_analyzer is self.getAnalyzer('CHEBI:1', qualifier='isVersionOf'))
+    self.assertEqual(CountingAnalyzer.num_created, 2)
+    self.assertEqual(self.memo.getStats(),
+                     {'hits': 1, 'misses': 2, 'size': 2, 'hit_rate': 1/3})
+
+  def testEviction(self):
+    self.getAnalyzer('CHEBI:1')
+    self.getAnalyzer('CHEBI:2')
+    # CHEBI:1 is used most recently, so CHEBI:2 is evicted
+    self.getAnalyzer('CHEBI:1')
+    self.getAnalyzer('CHEBI:3')
+    self.assertEqual(self.memo.getStats()['size'], 2)
+    self.getAnalyzer('CHEBI:1')
+    self.assertEqual(CountingAnalyzer.num_created, 3)
+    self.getAnalyzer('CHEBI:2')
+    self.assertEqual(CountingAnalyzer.num_created, 4)
+    self.memo.clear()
+    self.assertEqual(self.memo.getStats()['hit_rate'], None)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,42 @@
+# test_benchmarks.py
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from SBMate import constants as cn
+
+
+BENCHMARK_SCRIPT = os.path.join(cn.PROJECT_DIR, 'benchmarks', 'run_benchmarks.py')
+
+
+class TestBenchmarks(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def testRunBenchmarks(self):
+    output_file = os.path.join(self.tmp_dir, 'bench.json')
+    res = subprocess.run([sys.executable, BENCHMARK_SCRIPT, '--repeats', '1',
+                          '--datasets', 'biomd', '--output', output_file],
+                         capture_output=True, text=True, cwd=cn.PROJECT_DIR)
+    self.assertEqual(res.returncode, 0, res.stderr)
+    with open(output_file) as f:
+      bench = json.load(f)
+    self.assertEqual(list(bench['results'].keys()), ['biomd'])
+    stages = bench['results']['biomd']
+    self.assertEqual(set(stages.keys()),
+                     {'extraction', 'roots', 'specificity', 'consistency', 'end_to_end'})
+    self.assertEqual(stages['end_to_end']['items'], 4)
+    self.assertEqual(len(stages['extraction']['times']), 1)
+    self.assertEqual(len(bench['startup']['times']), 1)
+
+
+if __name__ == '__main__':
+  unittest.main()
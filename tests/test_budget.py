@@ -0,0 +1,39 @@
+# test_budget.py
+
+import time
+import unittest
+from SBMate import budget as bd
+
+
+class TestTimeBudget(unittest.TestCase):
+
+  def testGetRemaining(self):
+    self.assertEqual(bd.TimeBudget().getRemaining(), None)
+    self.assertFalse(bd.TimeBudget().isExpired())
+    budget = bd.TimeBudget(seconds=60.0)
+    self.assertTrue(0.0 < budget.getRemaining() <= 60.0)
+    self.assertTrue(bd.TimeBudget(seconds=0.0).isExpired())
+    with self.assertRaises(ValueError):
+      bd.TimeBudget(seconds=-1.0)
+
+  def testGetChild(self):
+    batch = bd.TimeBudget(seconds=0.05)
+    model = batch.getChild(60.0)
+    self.assertTrue(model.getRemaining() <= 0.05)
+    self.assertTrue(batch.getChild().getRemaining() <= 0.05)
+    time.sleep(0.06)
+    self.assertTrue(model.isExpired())
+    self.assertTrue(bd.TimeBudget().getChild(0.0).isExpired())
+
+  def testIsProvisional(self):
+    row = {'index': ['m'], 'columns': ['coverage'], 'data': [[1.0]]}
+    self.assertFalse(bd.isProvisional(row))
+    row = {'index': ['m'], 'columns': ['coverage', bd.PROVISIONAL, bd.UNRESOLVED_TERMS],
+           'data': [[1.0, True, 2]]}
+    self.assertTrue(bd.isProvisional(row))
+    row['data'] = [[1.0, False, 0]]
+    self.assertFalse(bd.isProvisional(row))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,104 @@
+# test_check_regressions.py
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from SBMate import constants as cn
+
+BENCHMARK_DIR = os.path.join(cn.PROJECT_DIR, 'benchmarks')
+sys.path.insert(0, BENCHMARK_DIR)
+import check_regressions as cr
+
+
+CHECK_SCRIPT = os.path.join(BENCHMARK_DIR, 'check_regressions.py')
+
+
+def mkTimings(best, stdev=0.0):
+  return {'items': 1, 'times': [best], 'min': best, 'median': best,
+          'mean': best, 'stdev': stdev}
+
+
+def mkBench(factor=1.0, exponent=1.0):
+  """
+  Benchmark results with stage times
+  multiplied by factor, and scaling as size^exponent.
+  """
+  stages = {one_stage: mkTimings(0.1 * factor) for one_stage in cr.rb.STAGES}
+  scaling = [{'num_species': n, 'num_reactions': n // 2, 'entities': n,
+              'results': {one_stage: mkTimings(1e-4 * n**exponent) \
+                          for one_stage in cr.rb.STAGES}} \
+             for n in [100, 200, 400, 800]]
+  return {'format': cr.rb.BENCHMARK_FORMAT,
+          'environment': {'python': '3'},
+          'config': {'repeats': 1},
+          'startup': mkTimings(0.02),
+          'results': {'biomd': stages},
+          'scaling': scaling}
+
+
+class TestCheckRegressions(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.baseline = mkBench()
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def testCompareTimes(self):
+    self.assertFalse(cr.compareTimes(mkTimings(0.1), mkTimings(0.12))['regressed'])
+    self.assertTrue(cr.compareTimes(mkTimings(0.1), mkTimings(0.2))['regressed'])
+    # within the noise of the runs
+    self.assertFalse(cr.compareTimes(mkTimings(0.1, 0.05), mkTimings(0.2))['regressed'])
+    # below the minimum delta
+    self.assertFalse(cr.compareTimes(mkTimings(0.001), mkTimings(0.004))['regressed'])
+
+  def testGetScalingExponent(self):
+    sizes = [100, 200, 400]
+    self.assertAlmostEqual(cr.getScalingExponent(sizes, [0.1, 0.2, 0.4]), 1.0)
+    self.assertAlmostEqual(cr.getScalingExponent(sizes, [0.1, 0.4, 1.6]), 2.0)
+    self.assertEqual(cr.getScalingExponent([100], [0.1]), None)
+
+  def testCompareBenchmarks(self):
+    findings = cr.compareBenchmarks(self.baseline, mkBench())
+    self.assertFalse(any([r['regressed'] for r in findings]))
+    findings = cr.compareBenchmarks(self.baseline, mkBench(factor=2.0))
+    self.assertEqual(set([(r['dataset'], r['stage']) for r in findings if r['regressed']]),
+                     set([('biomd', one_stage) for one_stage in cr.rb.STAGES]))
+    # quadratic scaling regresses, even if faster on fixed inputs
+    findings = cr.compareBenchmarks(self.baseline, mkBench(factor=0.5, exponent=2.0))
+    regressed = [r for r in findings if r['regressed']]
+    self.assertEqual(set([r['kind'] for r in regressed]), {'scaling'})
+    self.assertAlmostEqual(regressed[0]['value'], 2.0)
+    self.assertTrue('REGRESSED' in cr.getReport(findings))
+    other_config = mkBench()
+    other_config['config'] = {'repeats': 2}
+    with self.assertRaises(ValueError):
+      cr.compareBenchmarks(self.baseline, other_config)
+
+  def testMain(self):
+    baseline_file = os.path.join(self.tmp_dir, 'baseline.json')
+    results_file = os.path.join(self.tmp_dir, 'bench.json')
+    with open(baseline_file, 'w') as f:
+      json.dump(self.baseline, f)
+    for bench, returncode in [(mkBench(), 0), (mkBench(factor=2.0), 1)]:
+      with open(results_file, 'w') as f:
+        json.dump(bench, f)
+      res = subprocess.run([sys.executable, CHECK_SCRIPT, '--baseline', baseline_file,
+                            '--results', results_file],
+                           capture_output=True, text=True, cwd=cn.PROJECT_DIR)
+      self.assertEqual(res.returncode, returncode, res.stderr)
+
+  def testBaseline(self):
+    with open(cr.DEFAULT_BASELINE) as f:
+      baseline = json.load(f)
+    self.assertEqual(baseline['config'], cr.BASELINE_CONFIG)
+    self.assertEqual(len(baseline['scaling']), len(cr.BASELINE_CONFIG['scaling_sizes']))
+
+
+if __name__ == '__main__':
+  unittest.main()
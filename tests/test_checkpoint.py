@@ -0,0 +1,112 @@
+# test_checkpoint.py
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from SBMate import checkpoint as ck
+from SBMate import constants as cn
+from SBMate import uniprot_kegg_analyzer as uka
+
+
+BIOMD_12 = 'BIOMD0000000012.xml'
+BIOMD_13 = 'BIOMD0000000013.xml'
+ROW_12 = {'index': [BIOMD_12],
+          'columns': ['annotatable_elements', 'coverage'],
+          'data': [[20, 1.0]]}
+
+
+class TestBatchCheckpoint(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.checkpoint_file = os.path.join(self.tmp_dir, 'checkpoint.json')
+    self.model_file = os.path.join(cn.TEST_DIR, BIOMD_12)
+    self.model_file2 = os.path.join(cn.TEST_DIR, BIOMD_13)
+    self.orig_cache = dict(uka.VALIDATION_CACHE.results)
+
+  def tearDown(self):
+    uka.VALIDATION_CACHE.results = self.orig_cache
+    shutil.rmtree(self.tmp_dir)
+
+  def testAdd(self):
+    checkpoint = ck.BatchCheckpoint(path=self.checkpoint_file, every=2)
+    checkpoint.add(self.model_file, ROW_12)
+    self.assertEqual(checkpoint.getRow(self.model_file), ROW_12)
+    self.assertEqual(checkpoint.getRow(self.model_file2), None)
+    self.assertFalse(os.path.isfile(self.checkpoint_file))
+    checkpoint.add(self.model_file2, ROW_12)
+    self.assertTrue(os.path.isfile(self.checkpoint_file))
+
+  def testResume(self):
+    checkpoint = ck.BatchCheckpoint(path=self.checkpoint_file)
+    checkpoint.add(self.model_file, ROW_12)
+    uka.VALIDATION_CACHE.set('uniprot', 'P03023', True)
+    checkpoint.save()
+    uka.VALIDATION_CACHE.results = dict()
+    resumed = ck.BatchCheckpoint(path=self.checkpoint_file, resume=True)
+    self.assertEqual(resumed.getRow(self.model_file), ROW_12)
+    self.assertTrue(uka.VALIDATION_CACHE.get('uniprot', 'P03023'))
+    restarted = ck.BatchCheckpoint(path=self.checkpoint_file, resume=False)
+    self.assertEqual(restarted.getRow(self.model_file), None)
+
+  def testSaveAppends(self):
+    checkpoint = ck.BatchCheckpoint(path=self.checkpoint_file)
+    checkpoint.add(self.model_file, ROW_12)
+    uka.VALIDATION_CACHE.set('uniprot', 'P03023', True)
+    checkpoint.save()
+    with open(self.checkpoint_file) as f:
+      num_lines = len(f.readlines())
+    checkpoint.add(self.model_file2, ROW_12)
+    uka.VALIDATION_CACHE.set('uniprot', 'P12345', False)
+    checkpoint.save()
+    with open(self.checkpoint_file) as f:
+      new_lines = f.readlines()[num_lines:]
+    # only the new row and the new validation result
+    self.assertEqual(len(new_lines), 2)
+    self.assertEqual(json.loads(new_lines[0])['file'], os.path.abspath(self.model_file2))
+    self.assertEqual(json.loads(new_lines[1])['validation_cache'],
+                     {uka.VALIDATION_CACHE.getKey('uniprot', 'P12345'): False})
+    # a partial last line, from a crash while saving, is ignored
+    with open(self.checkpoint_file, 'a') as f:
+      f.write('{"file": ')
+    uka.VALIDATION_CACHE.results = dict()
+    resumed = ck.BatchCheckpoint(path=self.checkpoint_file, resume=True)
+    self.assertEqual(resumed.getRow(self.model_file2), ROW_12)
+    self.assertFalse(uka.VALIDATION_CACHE.get('uniprot', 'P12345'))
+    resumed.save()
+    self.assertEqual(ck.BatchCheckpoint(path=self.checkpoint_file, resume=True).rows,
+                     resumed.rows)
+
+  def testChangedFile(self):
+    model_file = os.path.join(self.tmp_dir, BIOMD_12)
+    shutil.copy(self.model_file, model_file)
+    checkpoint = ck.BatchCheckpoint(path=self.checkpoint_file)
+    checkpoint.add(model_file, ROW_12)
+    checkpoint.save()
+    self.assertEqual(ck.BatchCheckpoint(path=self.checkpoint_file,
+                                        resume=True).getRow(model_file), ROW_12)
+    with open(model_file, 'a') as f:
+      f.write('\n')
+    # an edited model is scored again
+    self.assertEqual(ck.BatchCheckpoint(path=self.checkpoint_file,
+                                        resume=True).getRow(model_file), None)
+
+  def testOffline(self):
+    orig_offline = uka.NonDAGAnalyzer.offline
+    uka.NonDAGAnalyzer.offline = True
+    try:
+      checkpoint = ck.BatchCheckpoint(path=self.checkpoint_file)
+      checkpoint.add(self.model_file, ROW_12)
+      checkpoint.save()
+    finally:
+      uka.NonDAGAnalyzer.offline = orig_offline
+    resumed = ck.BatchCheckpoint(path=self.checkpoint_file, resume=True)
+    self.assertEqual(resumed.getRow(self.model_file, offline=True), ROW_12)
+    # rows scored offline are scored again online
+    self.assertEqual(resumed.getRow(self.model_file), None)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,89 @@
+# test_cli.py
+
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from SBMate import cli
+from SBMate import constants as cn
+from SBMate import sharding as sh
+
+
+BIOMD_12 = 'BIOMD0000000012.xml'
+BIOMD_13 = 'BIOMD0000000013.xml'
+MODEL_FILE = os.path.join(cn.TEST_DIR, BIOMD_12)
+MODEL_FILE2 = os.path.join(cn.TEST_DIR, BIOMD_13)
+
+
+class TestCli(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def testGetModelFiles(self):
+    dir_files = cli.getModelFiles([cn.TEST_DIR])
+    self.assertTrue(MODEL_FILE in dir_files)
+    self.assertTrue(all([f.endswith('.xml') for f in dir_files]))
+    glob_files = cli.getModelFiles([os.path.join(cn.TEST_DIR, 'BIOMD000000001[23].xml')])
+    self.assertEqual(glob_files, [MODEL_FILE, MODEL_FILE2])
+    dup_files = cli.getModelFiles([MODEL_FILE2, MODEL_FILE, MODEL_FILE2])
+    self.assertEqual(dup_files, [MODEL_FILE2, MODEL_FILE])
+    self.assertEqual(cli.getModelFiles([os.path.join(self.tmp_dir, '*.xml')]), [])
+
+  def testGetParser(self):
+    args = cli.getParser().parse_args([MODEL_FILE, '-w', '4', '-f', 'csv', '--offline'])
+    self.assertEqual(args.inputs, [MODEL_FILE])
+    self.assertEqual(args.workers, 4)
+    self.assertEqual(args.format, 'csv')
+    self.assertTrue(args.offline)
+    with self.assertRaises(SystemExit):
+      cli.main([MODEL_FILE, '-f', 'parquet'])
+
+  def testParseRate(self):
+    self.assertEqual(cli.parseRate('www.genome.jp=2.5'), ('www.genome.jp', 2.5))
+    for one_value in ['www.genome.jp', 'www.genome.jp=0', '=3', 'www.genome.jp=x']:
+      with self.assertRaises(cli.argparse.ArgumentTypeError):
+        cli.parseRate(one_value)
+
+  def testImportIsLight(self):
+    code = "import sys; import SBMate.cli; print('pandas' in sys.modules)"
+    res = subprocess.run([sys.executable, '-c', code], capture_output=True,
+                         text=True, cwd=cn.PROJECT_DIR)
+    self.assertEqual(res.stdout.strip(), 'False')
+
+  def testMain(self):
+    output_file = os.path.join(self.tmp_dir, 'metrics.jsonl')
+    self.assertEqual(cli.main([MODEL_FILE, '-f', 'jsonl', '-o', output_file,
+                               '--no-rate-limit']), 0)
+    with open(output_file) as f:
+      rows = [json.loads(line) for line in f]
+    self.assertEqual(len(rows), 1)
+    self.assertEqual(rows[0]['model'], BIOMD_12)
+    self.assertEqual(rows[0]['annotatable_elements'], 20)
+
+  def testMainTiming(self):
+    output_file = os.path.join(self.tmp_dir, 'metrics.jsonl')
+    file_list = [MODEL_FILE, MODEL_FILE2]
+    num_scored = len(sh.selectShard(file_list, 0, 2))
+    orig_stderr = sys.stderr
+    sys.stderr = io.StringIO()
+    try:
+      self.assertEqual(cli.main(file_list + ['-f', 'jsonl', '-o', output_file,
+                                             '--shard', '0/2', '--timing',
+                                             '--no-rate-limit']), 0)
+      timing = sys.stderr.getvalue()
+    finally:
+      sys.stderr = orig_stderr
+    # only the models of the shard are counted
+    self.assertTrue(timing.startswith("Scored %d models" % num_scored))
+
+
+if __name__ == '__main__':
+  unittest.main()
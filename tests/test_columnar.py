@@ -0,0 +1,108 @@
+# test_columnar.py
+
+import os
+import shutil
+import tempfile
+import unittest
+from SBMate import budget as bd
+from SBMate import cli
+from SBMate import columnar as cl
+from SBMate import constants as cn
+from SBMate import instrumentation as ins
+from SBMate import sbmate
+
+try:
+  import pyarrow as pa
+except ImportError:
+  pa = None
+
+
+BIOMD_12 = 'BIOMD0000000012.xml'
+BIOMD_13 = 'BIOMD0000000013.xml'
+MODEL_FILES = [os.path.join(cn.TEST_DIR, BIOMD_12), os.path.join(cn.TEST_DIR, BIOMD_13)]
+ROW = {'index': ['model1.xml'],
+       'columns': ['annotatable_elements', 'annotated_elements', 'coverage',
+                   'consistent_elements', 'consistency', 'specificity'],
+       'data': [[3, None, 0.0, None, None, None]]}
+
+
+@unittest.skipIf(pa is None, "pyarrow is not installed")
+class TestColumnar(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.rows = [sbmate.AnnotationMetrics(model_file=f).metrics_row for f in MODEL_FILES]
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def testGetArrowTable(self):
+    table = cl.getArrowTable(self.rows + [ROW])
+    self.assertEqual(table.schema.names, [cl.MODEL_COLUMN] + ROW['columns'])
+    self.assertTrue(pa.types.is_dictionary(table.schema.field(cl.MODEL_COLUMN).type))
+    self.assertEqual(table.column(cl.MODEL_COLUMN).to_pylist(),
+                     [BIOMD_12, BIOMD_13, 'model1.xml'])
+    # missing values are null, and counts keep their type
+    self.assertEqual(table.schema.field('annotated_elements').type, pa.int64())
+    self.assertEqual(table.column('annotated_elements').to_pylist()[2], None)
+    df = sbmate.AnnotationMetrics.getMetrics(MODEL_FILES, output="table")
+    for one_col in ROW['columns']:
+      self.assertEqual(table.column(one_col).to_pylist()[:2], list(df[one_col]))
+    # the schema does not depend on the values
+    self.assertEqual(cl.getArrowTable([ROW]).schema, table.schema)
+    self.assertEqual(sbmate.AnnotationMetrics.getMetrics(MODEL_FILES, output="arrow"),
+                     cl.getArrowTable(self.rows))
+    with self.assertRaises(ValueError):
+      cl.getArrowTable([{'index': ['model2.xml'], 'columns': [cl.MODEL_COLUMN],
+                         'data': [[0.5]]}])
+
+  def testMixedColumns(self):
+    # rows stored by a run with other options have other columns
+    row = {'index': ['model2.xml'], 'columns': ['coverage', bd.PROVISIONAL],
+           'data': [[0.5, False]]}
+    table = cl.getArrowTable([ROW, row])
+    self.assertEqual(table.schema.names, [cl.MODEL_COLUMN] + ROW['columns'] + [bd.PROVISIONAL])
+    self.assertEqual(table.column('coverage').to_pylist(), [0.0, 0.5])
+    self.assertEqual(table.column('annotatable_elements').to_pylist(), [3, None])
+    self.assertEqual(table.column(bd.PROVISIONAL).to_pylist(), [None, False])
+    # a fixed schema takes rows lacking columns, not adding columns
+    self.assertEqual(cl.getArrowTable([row], schema=table.schema).num_rows, 1)
+    with self.assertRaises(ValueError):
+      cl.getArrowTable([row], schema=cl.getSchema([ROW]))
+
+  def testStoredRows(self):
+    manifest = os.path.join(self.tmp_dir, 'manifest.json')
+    sbmate.AnnotationMetrics.getMetrics(MODEL_FILES[:1], output="table", manifest=manifest,
+                                        collector=ins.Collector(columns=True))
+    table = sbmate.AnnotationMetrics.getMetrics(MODEL_FILES, output="arrow",
+                                                manifest=manifest)
+    df = sbmate.AnnotationMetrics.getMetrics(MODEL_FILES, output="table",
+                                             manifest=manifest)
+    self.assertEqual(table.schema.names[1:], list(df.columns))
+    self.assertEqual(table.column('coverage').to_pylist(), list(df['coverage']))
+    self.assertEqual(table.column('time_parse').null_count, 1)
+
+  def testParquetMetricsWriter(self):
+    path = os.path.join(self.tmp_dir, 'metrics.parquet')
+    with cl.ParquetMetricsWriter(path) as writer:
+      writer.write(self.rows)
+      writer.write([ROW])
+    self.assertEqual(writer.num_rows, 3)
+    import pyarrow.parquet as pq
+    self.assertEqual(pq.ParquetFile(path).num_row_groups, 2)
+    table = cl.readMetrics(path, columns=[cl.MODEL_COLUMN, 'coverage'])
+    self.assertEqual(table.schema.names, [cl.MODEL_COLUMN, 'coverage'])
+    self.assertTrue(pa.types.is_dictionary(table.schema.field(cl.MODEL_COLUMN).type))
+    # one dictionary of model names per row group
+    self.assertEqual(cl.readMetrics(path).to_pydict(),
+                     cl.getArrowTable(self.rows + [ROW]).to_pydict())
+
+  def testMain(self):
+    output_file = os.path.join(self.tmp_dir, 'metrics.parquet')
+    self.assertEqual(cli.main(MODEL_FILES + ['-f', 'parquet', '-o', output_file,
+                                             '--no-rate-limit']), 0)
+    self.assertEqual(cl.readMetrics(output_file).num_rows, 2)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,108 @@
+# test_context.py
+
+import os
+import unittest
+from SBMate import constants as cn
+from SBMate import context as mctx
+from SBMate import sbml_annotation as sa
+from SBMate import sbmate
+from SBMate import uniprot_kegg_analyzer as uka
+from SBMate.metric_calculator import MetricCalculator
+
+
+BIOMD_12 = 'BIOMD0000000012.xml'
+MODEL_FILE = os.path.join(cn.TEST_DIR, BIOMD_12)
+CONTEXTS = []
+
+
+class ContextRecorder(object):
+  REQUIRES = [mctx.ENTITY_ANALYZERS, mctx.ROOT_MAPS]
+
+  def __init__(self, annotations, model_name, context=None):
+    self.context = context
+    CONTEXTS.append(context)
+
+  def calculateRecord(self):
+    return {'num_analyzers': sum([len(v) for v in self.context.entity_analyzers.values()])}
+
+
+class TestModelContext(unittest.TestCase):
+
+  def setUp(self):
+    self.annotations = sa.SBMLAnnotation(file=MODEL_FILE)
+    self.context = mctx.ModelContext(self.annotations)
+
+  def testGetQualifierDict(self):
+    qual_dict = mctx.getQualifierDict({'is': [('uniprot', 'P03023')],
+                                       'isVersionOf': [('go', 'GO:0006402')]})
+    self.assertEqual(qual_dict, {'P03023': 'is', 'GO:0006402': 'isVersionOf'})
+
+  def testGetAnalyzers(self):
+    analyzers = self.context.getAnalyzers('Reaction1')
+    self.assertTrue(analyzers)
+    # computed once
+    self.assertTrue(analyzers is self.context.getAnalyzers('Reaction1'))
+    self.assertEqual(set(self.context.annotated_entities),
+                     set(self.annotations.annotations.keys()))
+
+  def testRootMaps(self):
+    root_maps = self.context.root_maps
+    self.assertEqual(root_maps['Reaction1']['sbo'], {'SBO:0000179': cn.ENTITY_REP})
+    for one_entity in root_maps:
+      self.assertTrue(set(root_maps[one_entity].keys()) <= {'go', 'sbo', 'chebi'})
+
+  def testRequire(self):
+    self.context.require([mctx.VALIDATION_RESULTS])
+    self.assertEqual(set(self.context.validation_results.keys()),
+                     set(self.context.annotated_entities))
+    with self.assertRaises(ValueError):
+      self.context.require(['unknown'])
+
+  def testIsConsistentLocalFirst(self):
+    # an inconsistent DAG annotation stops before remote lookups
+    self.annotations.annotations['Reaction1']['sbo'] = ['SBO:0000247']
+    self.annotations.annotations['Reaction1']['uniprot'] = ['Q99999']
+    self.assertFalse(self.context.isLocallyConsistent('Reaction1'))
+    self.assertFalse(self.context.isConsistent('Reaction1'))
+    self.assertFalse(('Reaction1', 'uniprot') in self.context._analyzers)
+    self.assertFalse(('uniprot', 'Q99999') in self.context.getPendingRemoteTerms())
+    # all analyzers are still available on request
+    self.assertTrue('uniprot' in [r.ontology for r in self.context.getAnalyzers('Reaction1')])
+
+  def testIsConsistentUnacceptableOntology(self):
+    # kegg_species is not acceptable for reactions; decided without lookup
+    self.annotations.annotations['Reaction1']['kegg_species'] = ['C00002']
+    self.assertFalse(self.context.isLocallyConsistent('Reaction1'))
+    self.assertEqual(self.context._analyzers, dict())
+
+  def testGetPendingRemoteTerms(self):
+    old_cache = uka.VALIDATION_CACHE
+    uka.VALIDATION_CACHE = uka.ValidationCache()
+    # malformed terms are not looked up
+    self.annotations.annotations['PX']['uniprot'] = ['P03023', 'P0302"']
+    try:
+      pending = self.context.getPendingRemoteTerms()
+      self.assertTrue(('uniprot', 'P03023') in pending)
+      self.assertFalse(('uniprot', 'P0302"') in pending)
+      self.assertEqual(len(pending), len(set(pending)))
+      for one_ont, one_term in pending:
+        uka.VALIDATION_CACHE.set(one_ont, one_term, True)
+      self.assertEqual(self.context.getPendingRemoteTerms(), [])
+    finally:
+      uka.VALIDATION_CACHE = old_cache
+
+  def testSharedContext(self):
+    del CONTEXTS[:]
+    metrics = sbmate.AnnotationMetrics(MODEL_FILE,
+                                       metric_calculator_classes=[ContextRecorder])
+    self.assertEqual(len(CONTEXTS), 1)
+    self.assertEqual(metrics.metrics_row['columns'][0], 'num_analyzers')
+    calculator = MetricCalculator(annotations=CONTEXTS[0].annotations,
+                                  model_name=BIOMD_12,
+                                  context=CONTEXTS[0])
+    self.assertTrue(calculator.context.getAnalyzers('Reaction1') is \
+                    CONTEXTS[0].getAnalyzers('Reaction1'))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,47 @@
+# test_identifier_syntax.py
+
+import unittest
+from SBMate import constants as cn
+from SBMate import identifier_syntax as ids
+
+
+class TestIdentifierSyntax(unittest.TestCase):
+
+  def testRegistry(self):
+    self.assertEqual(set(ids.REGISTRY.keys()), cn.ALL_KNOWLEDGE_TYPES)
+    self.assertEqual(set(ids.REP_NAMESPACES.keys()), set(cn.KNOWLEDGE_TYPES_REP))
+
+  def testCheckIdentifier(self):
+    self.assertEqual(ids.checkIdentifier('obo.go', 'GO:0006402'), None)
+    self.assertEqual(ids.checkIdentifier('biomodels.sbo', 'SBO:0000179'), None)
+    self.assertEqual(ids.checkIdentifier('chebi', 'CHEBI:17234'), None)
+    self.assertEqual(ids.checkIdentifier('uniprot', 'P03023'), None)
+    self.assertEqual(ids.checkIdentifier('uniprot', 'A0A022YWF9'), None)
+    self.assertEqual(ids.checkIdentifier('uniprot.isoform', 'P03023-2'), None)
+    self.assertEqual(ids.checkIdentifier('kegg.genes', 'hsa:7157'), None)
+    self.assertEqual(ids.checkIdentifier('kegg.pathway', 'map00010'), None)
+    self.assertEqual(ids.checkIdentifier('go', 'GO:0006402"'), ids.REASON_STRAY_QUOTE)
+    self.assertEqual(ids.checkIdentifier('go', '0006402'), ids.REASON_WRONG_PREFIX)
+    self.assertEqual(ids.checkIdentifier('go', 'GO:64'), ids.REASON_BAD_FORMAT)
+    self.assertEqual(ids.checkIdentifier('kegg.compound', 'D00001'), ids.REASON_WRONG_PREFIX)
+    self.assertEqual(ids.checkIdentifier('uniprot', 'P0302'), ids.REASON_BAD_FORMAT)
+    self.assertEqual(ids.checkIdentifier('uniprot', ' P03023'), ids.REASON_WHITESPACE)
+    self.assertEqual(ids.checkIdentifier('uniprot', ''), ids.REASON_EMPTY)
+    self.assertEqual(ids.checkIdentifier('pubmed', '123'), ids.REASON_UNKNOWN_NAMESPACE)
+
+  def testCheckRepresentative(self):
+    # any namespace of the representative ontology is accepted
+    for one_term in ['C00002', 'D00001', 'K00844', 'hsa:7157']:
+      self.assertEqual(ids.checkIdentifier('kegg_species', one_term), None)
+    for one_term in ['R00200', 'map00010']:
+      self.assertEqual(ids.checkIdentifier('kegg_process', one_term), None)
+    self.assertEqual(ids.checkIdentifier('kegg_process', 'C00002'), ids.REASON_BAD_FORMAT)
+
+  def testCheckIdentifiers(self):
+    pairs = [('uniprot', 'P03023'), ('uniprot', 'P0302'), ('uniprot', 'P03023')]
+    self.assertEqual(ids.checkIdentifiers(pairs), [None, ids.REASON_BAD_FORMAT, None])
+    self.assertEqual(ids.getRejections(pairs), {('uniprot', 'P0302'): ids.REASON_BAD_FORMAT})
+
+
+if __name__ == '__main__':
+  unittest.main()
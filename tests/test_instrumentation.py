@@ -0,0 +1,117 @@
+# test_instrumentation.py
+
+import os
+import tracemalloc
+import unittest
+from SBMate import constants as cn
+from SBMate import instrumentation as ins
+from SBMate import sbmate
+
+
+BIOMD_12 = 'BIOMD0000000012.xml'
+MODEL_FILE = os.path.join(cn.TEST_DIR, BIOMD_12)
+
+
+class TestCollector(unittest.TestCase):
+
+  def setUp(self):
+    self.events = []
+    self.collector = ins.Collector(callbacks=[lambda *args: self.events.append(args)])
+
+  def testCountObserve(self):
+    self.collector.count(ins.HTTP_REQUESTS)
+    self.collector.count(ins.HTTP_BYTES, 100)
+    self.collector.observe(ins.HTTP_LATENCY, 0.03)
+    self.collector.observe(ins.HTTP_LATENCY, 20.0)
+    with self.collector.stage('parse'):
+      pass
+    snapshot = self.collector.getSnapshot()
+    self.assertEqual(snapshot['counters'], {ins.HTTP_REQUESTS: 1, ins.HTTP_BYTES: 100})
+    histogram = snapshot['histograms'][ins.HTTP_LATENCY]
+    self.assertEqual(histogram['count'], 2)
+    self.assertEqual(histogram['counts'][1], 1)
+    self.assertEqual(histogram['counts'][-1], 1)
+    self.assertEqual(snapshot['stage_counts'], {'parse': 1})
+    self.assertEqual([e[0] for e in self.events], ['count', 'count', 'observe', 'observe', 'stage'])
+
+  def testMerge(self):
+    self.collector.count(ins.GRAPH_HAS_PATH, 2)
+    other = ins.Collector()
+    other.count(ins.GRAPH_HAS_PATH, 3)
+    other.observe(ins.HTTP_LATENCY, 0.2)
+    self.collector.merge(other.getSnapshot())
+    snapshot = self.collector.getSnapshot()
+    self.assertEqual(snapshot['counters'][ins.GRAPH_HAS_PATH], 5)
+    self.assertEqual(snapshot['histograms'][ins.HTTP_LATENCY]['count'], 1)
+
+  def testDisabled(self):
+    self.assertEqual(ins.COLLECTOR, None)
+    with ins.stage('parse'):
+      ins.count(ins.HTTP_REQUESTS)
+      ins.observe(ins.HTTP_LATENCY, 1.0)
+    self.assertEqual(ins.COLLECTOR, None)
+
+  def testGetMetrics(self):
+    collector = ins.Collector(columns=True)
+    res_df = sbmate.AnnotationMetrics.getMetrics(MODEL_FILE, output="table",
+                                                 collector=collector)
+    self.assertEqual(ins.COLLECTOR, None)
+    self.assertTrue(res_df.loc[BIOMD_12, 'time_parse'] > 0.0)
+    snapshot = collector.getSnapshot()
+    for one_ont in cn.KNOWLEDGE_TYPES_REP:
+      self.assertEqual(res_df.loc[BIOMD_12, 'terms_' + one_ont],
+                       snapshot['counters'].get('terms.' + one_ont, 0))
+    self.assertEqual(res_df.loc[BIOMD_12, 'graph_has_path'],
+                     snapshot['counters'][ins.GRAPH_HAS_PATH])
+    # without columns, only the collector gets the measurements
+    res_df = sbmate.AnnotationMetrics.getMetrics(MODEL_FILE, output="table",
+                                                 collector=ins.Collector())
+    self.assertFalse('time_parse' in res_df.columns)
+
+  def checkModelPeak(self):
+    collector = ins.Collector(memory=True)
+    collector.startMemory()
+    try:
+      large = [0] * 10**6
+      del large
+      collector.startModel()
+      small = [0] * 10**4
+      peak = collector.endModel('model')
+    finally:
+      collector.stopMemory()
+    # the peak of an earlier model is not counted
+    self.assertTrue(8 * 10**4 <= peak < 8 * 10**5)
+    self.assertEqual(collector.model_peaks, {'model': peak})
+
+  def testModelPeak(self):
+    self.checkModelPeak()
+    # Python 3.8 has no tracemalloc.reset_peak
+    reset_peak = getattr(tracemalloc, 'reset_peak', None)
+    if reset_peak is not None:
+      del tracemalloc.reset_peak
+    try:
+      self.checkModelPeak()
+    finally:
+      if reset_peak is not None:
+        tracemalloc.reset_peak = reset_peak
+
+  def testMemory(self):
+    collector = ins.Collector(columns=True, memory=True)
+    res_df = sbmate.AnnotationMetrics.getMetrics(MODEL_FILE, output="table",
+                                                 collector=collector)
+    # tracing started by getMetrics is stopped
+    self.assertFalse(tracemalloc.is_tracing())
+    self.assertTrue(res_df.loc[BIOMD_12, 'mem_peak'] > 0)
+    self.assertTrue(res_df.loc[BIOMD_12, 'mem_extraction'] > 0)
+    self.assertTrue('rss_parse' in res_df.columns)
+    self.assertTrue(res_df.loc[BIOMD_12, 'rss_max'] > 0)
+    snapshot = collector.getSnapshot()
+    self.assertEqual(snapshot['model_peaks'], {BIOMD_12: res_df.loc[BIOMD_12, 'mem_peak']})
+    self.assertEqual(snapshot['stage_memory']['parse'], res_df.loc[BIOMD_12, 'mem_parse'])
+    # memory columns are only added in memory mode
+    self.assertFalse('mem_peak' in sbmate.AnnotationMetrics.getMetrics(
+        MODEL_FILE, output="table", collector=ins.Collector(columns=True)).columns)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,75 @@
+# test_manifest.py
+
+import os
+import shutil
+import tempfile
+import unittest
+from SBMate import constants as cn
+from SBMate import manifest as mf
+from SBMate import uniprot_kegg_analyzer as uka
+
+
+BIOMD_12 = 'BIOMD0000000012.xml'
+BIOMD_13 = 'BIOMD0000000013.xml'
+ROW_12 = {'index': [BIOMD_12],
+          'columns': ['annotatable_elements', 'coverage'],
+          'data': [[20, 1.0]]}
+
+
+class TestResultsManifest(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.model_file = os.path.join(self.tmp_dir, BIOMD_12)
+    shutil.copy(os.path.join(cn.TEST_DIR, BIOMD_12), self.model_file)
+    self.manifest_file = os.path.join(self.tmp_dir, 'manifest.json')
+    self.manifest = mf.ResultsManifest(path=self.manifest_file,
+                                       ontology_version='v1')
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def testGetFileHash(self):
+    hash_12 = mf.getFileHash(self.model_file)
+    self.assertEqual(hash_12, mf.getFileHash(os.path.join(cn.TEST_DIR, BIOMD_12)))
+    self.assertNotEqual(hash_12, mf.getFileHash(os.path.join(cn.TEST_DIR, BIOMD_13)))
+
+  def testGetOntologyVersion(self):
+    self.assertEqual(mf.getOntologyVersion(), mf.getOntologyVersion())
+    self.assertNotEqual(mf.getOntologyVersion(), mf.getOntologyVersion(self.tmp_dir))
+
+  def testGetRow(self):
+    self.assertEqual(self.manifest.getRow(self.model_file), None)
+    self.manifest.update(self.model_file, ROW_12)
+    self.assertEqual(self.manifest.getRow(self.model_file), ROW_12)
+    # saved and loaded again
+    self.manifest.save()
+    loaded = mf.ResultsManifest(path=self.manifest_file, ontology_version='v1')
+    self.assertEqual(loaded.getRow(self.model_file), ROW_12)
+    # ontology artifacts changed
+    updated = mf.ResultsManifest(path=self.manifest_file, ontology_version='v2')
+    self.assertEqual(updated.getRow(self.model_file), None)
+    # model file changed
+    with open(self.model_file, 'a') as f:
+      f.write('\n')
+    self.assertEqual(loaded.getRow(self.model_file), None)
+
+  def testGetRowRemoteResults(self):
+    # a row scored offline, with one term assumed valid
+    self.manifest.update(self.model_file, ROW_12, offline=True,
+                         remote_results={'uniprot:P03023': True, 'uniprot:P12345': None})
+    self.assertEqual(self.manifest.getRow(self.model_file, offline=True), ROW_12)
+    self.assertEqual(self.manifest.getRow(self.model_file, offline=False), None)
+    # a row scored online is used while the validation cache agrees
+    self.manifest.update(self.model_file, ROW_12,
+                         remote_results={'uniprot:P03023': True})
+    cache = uka.ValidationCache()
+    self.assertEqual(self.manifest.getRow(self.model_file, validation_cache=cache), ROW_12)
+    self.assertEqual(self.manifest.getRow(self.model_file, offline=True,
+                                          validation_cache=cache), ROW_12)
+    cache.set('uniprot', 'P03023', False)
+    self.assertEqual(self.manifest.getRow(self.model_file, validation_cache=cache), None)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -46,6 +46,15 @@ class TestMetricCalculator(unittest.TestCase):
     self.assertEqual(non_metrics_df['consistency'][0], None)
     self.assertEqual(non_metrics_df['specificity'][0], None)
 
+  def testCalculateRecord(self):
+    record = self.calculator.calculateRecord()
+    self.assertEqual(list(record.keys()), list(self.calculator.calculate().columns))
+    self.assertEqual(record['annotatable_elements'], 20)
+    self.assertEqual(record['consistency'], 0.95)
+    none_record = self.none_calculator.calculateRecord()
+    self.assertEqual(none_record['annotated_elements'], None)
+    self.assertEqual(none_record['specificity'], None)
+
   def testMkDataframe(self):
     df = self.calculator.mkDataframe({'one_val': 10})
     self.assertEqual(df.shape, (1,1))
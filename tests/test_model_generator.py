@@ -0,0 +1,65 @@
+# test_model_generator.py
+
+import libsbml
+import os
+import shutil
+import tempfile
+import unittest
+from SBMate import identifier_syntax as ids
+from SBMate import model_generator as mg
+from SBMate import sbml_annotation as sa
+
+
+class TestModelGenerator(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.model_file = os.path.join(self.tmp_dir, 'synthetic.xml')
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def testGenerate(self):
+    document = mg.ModelGenerator(seed=1).generate(num_compartments=2,
+                                                  num_species=30,
+                                                  num_reactions=20)
+    self.assertEqual(document.getNumErrors(libsbml.LIBSBML_SEV_ERROR), 0)
+    model = document.getModel()
+    self.assertEqual(model.getNumCompartments(), 2)
+    self.assertEqual(model.getNumSpecies(), 30)
+    self.assertEqual(model.getNumReactions(), 20)
+    # same seed, same model
+    other = mg.ModelGenerator(seed=1).generate(num_compartments=2,
+                                               num_species=30,
+                                               num_reactions=20)
+    self.assertEqual(libsbml.writeSBMLToString(document),
+                     libsbml.writeSBMLToString(other))
+
+  def testWrite(self):
+    generator = mg.ModelGenerator(annotation_density=1.0, duplicate_rate=0.0,
+                                  ontology_mix={'species': {'chebi': 0.5, 'uniprot': 0.5},
+                                                'reaction': {'go': 1.0}})
+    generator.write(self.model_file, num_species=40, num_reactions=10)
+    annotations = sa.SBMLAnnotation(file=self.model_file)
+    species = [v for v in annotations.annotations.values() if v['object_id'].startswith('S')]
+    self.assertEqual(len(species), 40)
+    for one_anot in species:
+      self.assertTrue(one_anot['chebi'] or one_anot['uniprot'])
+      for one_ont in ['chebi', 'uniprot']:
+        for one_term in (one_anot[one_ont] or []):
+          self.assertEqual(ids.checkIdentifier(one_ont, one_term), None)
+
+  def testMalformedRate(self):
+    generator = mg.ModelGenerator(annotation_density=1.0, malformed_rate=1.0,
+                                  ontology_mix={'species': {'kegg_species': 1.0}})
+    generator.write(self.model_file, num_species=20, num_reactions=0)
+    annotations = sa.SBMLAnnotation(file=self.model_file)
+    terms = [t for v in annotations.annotations.values() for t in (v['kegg_species'] or [])]
+    self.assertTrue(terms)
+    self.assertTrue(all([ids.checkIdentifier('kegg_species', t) is not None for t in terms]))
+    with self.assertRaises(ValueError):
+      mg.ModelGenerator(malformed_rate=2.0)
+
+
+if __name__ == '__main__':
+  unittest.main()
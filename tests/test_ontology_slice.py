@@ -0,0 +1,75 @@
+# test_ontology_slice.py
+
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+from SBMate import constants as cn
+from SBMate import dag_analyzer as da
+from SBMate import ontology_slice as osl
+from SBMate import sbmate
+
+
+MODEL_FILES = [os.path.join(cn.TEST_DIR, one_name) \
+               for one_name in ['BIOMD0000000012.xml', 'BIOMD0000000013.xml',
+                                'BIOMD0000000015.xml', 'BIOMD0000000970.xml']]
+
+
+class TestOntologySlice(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.slice_path = os.path.join(self.tmp_dir, 'slice.pickle')
+
+  def tearDown(self):
+    da.setSlice(None)
+    shutil.rmtree(self.tmp_dir)
+
+  def testGetCorpusTerms(self):
+    terms = osl.getCorpusTerms(MODEL_FILES[:1])
+    self.assertEqual(set(terms.keys()), set(da.ONT_TO_FILE.keys()))
+    self.assertTrue('SBO:0000290' in terms['sbo'])
+    self.assertTrue('GO:0006402' in terms['go'])
+
+  def testSliceGraph(self):
+    graph = da.getGraph('sbo')
+    terms = {'SBO:0000290', 'SBO:9999999'}
+    sliced = osl.sliceGraph(graph, terms, da.ONT_TO_ROOT['sbo'])
+    self.assertTrue(sliced.number_of_nodes() < graph.number_of_nodes())
+    self.assertEqual(sliced.graph[da.SLICE_TERMS], terms)
+    self.assertEqual(da.getSubtreeSize(sliced, 'SBO:0000290'),
+                     da.getSubtreeSize(graph, 'SBO:0000290'))
+    for one_root in da.ONT_TO_ROOT['sbo']:
+      if one_root in graph:
+        self.assertEqual(da.getSubtreeSize(sliced, one_root),
+                         da.getSubtreeSize(graph, one_root))
+
+  def testMakeSlice(self):
+    full_df = sbmate.AnnotationMetrics.getMetrics(MODEL_FILES, output="table")
+    sizes = osl.makeSlice(MODEL_FILES, self.slice_path)
+    self.assertTrue(sizes['sbo'][1] < da.getGraph('sbo').number_of_nodes())
+    da.setSlice(self.slice_path)
+    self.assertTrue(da.SLICE_TERMS in da.getGraph('sbo').graph)
+    slice_df = sbmate.AnnotationMetrics.getMetrics(MODEL_FILES, output="table")
+    self.assertTrue(full_df.equals(slice_df))
+    # terms outside of the slice are not scored
+    with self.assertRaises(ValueError):
+      da.DAGAnalyzer(term_id=['SBO:0000001'], ontology='sbo',
+                     object_type=cn.REACTION, qualifier_dict={'SBO:0000001': 'is'})
+
+  def testLoadSlice(self):
+    osl.makeSlice(MODEL_FILES[:1], self.slice_path)
+    self.assertEqual(set(osl.loadSlice(self.slice_path).keys()), set(da.ONT_TO_FILE.keys()))
+    # made from other ontology artifacts
+    with open(self.slice_path, 'rb') as f:
+      artifact = pickle.load(f)
+    artifact['ontology_version'] = 'other'
+    with open(self.slice_path, 'wb') as f:
+      pickle.dump(artifact, f)
+    with self.assertRaises(ValueError):
+      osl.loadSlice(self.slice_path)
+
+
+if __name__ == '__main__':
+  unittest.main()
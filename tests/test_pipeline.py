@@ -0,0 +1,86 @@
+# test_pipeline.py
+
+import multiprocessing
+import os
+import threading
+import time
+import unittest
+from SBMate import constants as cn
+from SBMate import pipeline as pl
+from SBMate import sbmate
+from SBMate import uniprot_kegg_analyzer as uka
+
+
+BIOMD_12 = 'BIOMD0000000012.xml'
+BIOMD_13 = 'BIOMD0000000013.xml'
+BIOMD_970 = 'BIOMD0000000970.xml'
+MODEL_FILES = [os.path.join(cn.TEST_DIR, one_file) \
+               for one_file in [BIOMD_12, BIOMD_13, BIOMD_970]]
+
+
+class TestStageStats(unittest.TestCase):
+
+  def testAdd(self):
+    stats = pl.StageStats('parse')
+    self.assertEqual(stats.getThroughput(), None)
+    stats.add(busy_time=0.5, wait_time=0.1, queue_size=3)
+    stats.add(busy_time=1.5, queue_size=1)
+    self.assertEqual(stats.num_items, 2)
+    self.assertEqual(stats.busy_time, 2.0)
+    self.assertEqual(stats.max_queue_size, 3)
+    self.assertEqual(stats.getThroughput(), 1.0)
+
+
+class TestScoringPipeline(unittest.TestCase):
+
+  def setUp(self):
+    self.orig_offline = uka.NonDAGAnalyzer.offline
+    uka.NonDAGAnalyzer.offline = True
+    self.pipeline = pl.ScoringPipeline(parse_workers=2, validation_workers=2, queue_size=1)
+
+  def tearDown(self):
+    uka.NonDAGAnalyzer.offline = self.orig_offline
+
+  def testRun(self):
+    res = dict(self.pipeline.run(MODEL_FILES, metrics_class=sbmate.AnnotationMetrics))
+    self.assertEqual(set(res.keys()), set(MODEL_FILES))
+    for one_file in MODEL_FILES:
+      self.assertEqual(res[one_file].metrics_row,
+                       sbmate.AnnotationMetrics(one_file).metrics_row)
+    for name in ['parse', 'validate', 'aggregate']:
+      self.assertEqual(self.pipeline.stats[name].num_items, len(MODEL_FILES))
+      self.assertTrue(self.pipeline.stats[name].max_queue_size <= 1)
+
+  def testGetMetrics(self):
+    df = sbmate.AnnotationMetrics.getMetrics(MODEL_FILES, output="table",
+                                             pipeline=self.pipeline)
+    self.assertEqual(list(df.index), [BIOMD_12, BIOMD_13, BIOMD_970])
+
+  def checkStopped(self):
+    self.assertEqual([t.name for t in threading.enumerate() \
+                      if t.name.startswith(pl.THREAD_PREFIX)], [])
+    # parse processes are shut down without waiting
+    for _ in range(100):
+      if not multiprocessing.active_children():
+        break
+      time.sleep(0.1)
+    self.assertEqual(multiprocessing.active_children(), [])
+
+  def testRunError(self):
+    with self.assertRaises(Exception):
+      list(self.pipeline.run([os.path.join(cn.TEST_DIR, 'no_such_file.xml')] + MODEL_FILES * 3,
+                             metrics_class=sbmate.AnnotationMetrics))
+    self.checkStopped()
+
+  def testStopEarly(self):
+    results = self.pipeline.run(MODEL_FILES * 5, metrics_class=sbmate.AnnotationMetrics)
+    model_file, _ = next(results)
+    self.assertTrue(model_file in MODEL_FILES)
+    # stages are blocked on the full queues
+    self.assertTrue(any([t.name.startswith(pl.THREAD_PREFIX) for t in threading.enumerate()]))
+    results.close()
+    self.checkStopped()
+
+
+if __name__ == '__main__':
+  unittest.main()
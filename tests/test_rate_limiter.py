@@ -0,0 +1,58 @@
+# test_rate_limiter.py
+
+from concurrent import futures
+import pickle
+import shutil
+import tempfile
+import unittest
+from SBMate import rate_limiter as rl
+
+
+URL = 'https://www.genome.jp/entry/C00002'
+
+
+def _reserve(limiter):
+  return limiter.reserve(URL)
+
+
+class TestRateLimiter(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.limiter = rl.RateLimiter(rates={'www.genome.jp': 2.0},
+                                  state_dir=self.tmp_dir)
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def testReserve(self):
+    # burst of one second of requests, then one token per 0.5 s
+    self.assertEqual(self.limiter.reserve(URL, now=100.0), 0.0)
+    self.assertEqual(self.limiter.reserve(URL, now=100.0), 0.0)
+    self.assertEqual(self.limiter.reserve(URL, now=100.0), 0.5)
+    self.assertEqual(self.limiter.reserve(URL, now=100.0), 1.0)
+    # refilled, but not beyond the burst
+    self.assertEqual(self.limiter.reserve(URL, now=110.0), 0.0)
+    self.assertEqual(self.limiter.reserve(URL, now=110.0), 0.0)
+    self.assertEqual(self.limiter.reserve(URL, now=110.0), 0.5)
+
+  def testUnlimitedHost(self):
+    self.assertEqual(self.limiter.getRate('www.uniprot.org'), None)
+    for _ in range(5):
+      self.assertEqual(self.limiter.reserve('https://www.uniprot.org/uniprot/P03023'), 0.0)
+    with self.assertRaises(ValueError):
+      rl.RateLimiter(rates={'www.genome.jp': 0})
+
+  def testSharedAcrossProcesses(self):
+    limiter = pickle.loads(pickle.dumps(self.limiter))
+    self.assertEqual(limiter.state_dir, self.tmp_dir)
+    with futures.ProcessPoolExecutor(max_workers=2) as executor:
+      waits = sorted(executor.map(_reserve, [self.limiter] * 6))
+    # two tokens of the burst, then the others are spaced by 0.5 s
+    self.assertEqual(waits[:2], [0.0, 0.0])
+    for idx in range(2, 6):
+      self.assertAlmostEqual(waits[idx], 0.5 * (idx - 1), delta=0.2)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,139 @@
+# test_sampling.py
+
+import os
+import shutil
+import tempfile
+import unittest
+from SBMate import cli
+from SBMate import constants as cn
+from SBMate import pipeline as pl
+from SBMate import sampling as sp
+from SBMate import sbmate
+
+
+BIOMD_12 = 'BIOMD0000000012.xml'
+BIOMD_15 = 'BIOMD0000000015.xml'
+MODEL_FILES = [os.path.join(cn.TEST_DIR, BIOMD_12), os.path.join(cn.TEST_DIR, BIOMD_15)]
+METRICS = ['annotatable_elements', 'annotated_elements', 'coverage',
+           'consistent_elements', 'consistency', 'specificity']
+
+
+class TestSamplingPlan(unittest.TestCase):
+
+  def testInit(self):
+    with self.assertRaises(ValueError):
+      sp.SamplingPlan()
+    with self.assertRaises(ValueError):
+      sp.SamplingPlan(sample_size=10, error_bound=0.05)
+    with self.assertRaises(ValueError):
+      sp.SamplingPlan(sample_size=0)
+    with self.assertRaises(ValueError):
+      sp.SamplingPlan(error_bound=1.5)
+    with self.assertRaises(ValueError):
+      sp.SamplingPlan(sample_size=10, confidence=1.0)
+
+  def testGetSampleSize(self):
+    self.assertEqual(sp.SamplingPlan(sample_size=10).getSampleSize(46), 10)
+    self.assertEqual(sp.SamplingPlan(sample_size=100).getSampleSize(46), 46)
+    plan = sp.SamplingPlan(error_bound=0.05)
+    self.assertEqual(plan.getSampleSize(10**9), 385)
+    # finite population correction
+    self.assertEqual(plan.getSampleSize(1000), 278)
+    self.assertEqual(plan.getSampleSize(0), 0)
+
+  def testGetRandom(self):
+    plan = sp.SamplingPlan(sample_size=10, seed=1)
+    self.assertEqual(plan.getRandom('a').random(), plan.getRandom('a').random())
+    self.assertNotEqual(plan.getRandom('a').random(), plan.getRandom('b').random())
+
+
+class TestEstimators(unittest.TestCase):
+
+  def testSelectSample(self):
+    strata = {cn.SPECIES: list(range(90)), cn.REACTION: list(range(10))}
+    sample = sp.selectSample(strata, 10, sp.SamplingPlan(sample_size=10).getRandom('m'))
+    self.assertEqual(len(sample[cn.SPECIES]), 9)
+    # at least two entities per stratum
+    self.assertEqual(len(sample[cn.REACTION]), 2)
+
+  def testEstimateProportion(self):
+    estimate, variance = sp.estimateProportion({'a': 4, 'b': 4},
+                                               {'a': [1.0, 1.0], 'b': [0.0, 1.0]})
+    self.assertEqual(estimate, 0.75)
+    self.assertAlmostEqual(variance, 0.25 * 0.5 * 0.5 / 2)
+    # a census has no sampling error
+    _, variance = sp.estimateProportion({'a': 2}, {'a': [0.0, 1.0]})
+    self.assertEqual(variance, 0.0)
+
+  def testEstimateRatio(self):
+    estimate, _ = sp.estimateRatio({'a': 3}, {'a': [0.5, 0.0, 0.7]},
+                                   {'a': [1.0, 0.0, 1.0]})
+    self.assertAlmostEqual(estimate, 0.6)
+    self.assertEqual(sp.estimateRatio({'a': 3}, {'a': [0.0]}, {'a': [0.0]}), (None, None))
+
+  def testGetInterval(self):
+    self.assertEqual(sp.getInterval(0.5, 0.0, 1.96), (0.5, 0.5))
+    self.assertEqual(sp.getInterval(0.95, 0.01, 1.96), (0.754, 1.0))
+
+
+class TestSampledMetrics(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def testExactSample(self):
+    exact_df = sbmate.AnnotationMetrics.getMetrics(MODEL_FILES, output="table")
+    df = sbmate.AnnotationMetrics.getMetrics(MODEL_FILES, output="table",
+                                             sampling=sp.SamplingPlan(sample_size=1000))
+    self.assertEqual(list(df.columns), METRICS + sp.COLUMNS)
+    self.assertTrue(df[METRICS].equals(exact_df))
+    self.assertFalse(any(df[sp.APPROXIMATE]))
+    self.assertEqual(list(df[sp.SAMPLE_SIZE]), list(exact_df['annotated_elements']))
+    self.assertEqual(list(df[sp.CONSISTENCY_LOW]), list(exact_df['consistency']))
+
+  def testApproximateSample(self):
+    exact_row = sbmate.AnnotationMetrics(model_file=MODEL_FILES[1]).metrics_df.loc[BIOMD_15]
+    plan = sp.SamplingPlan(sample_size=12, seed=3)
+    row = sbmate.AnnotationMetrics(model_file=MODEL_FILES[1],
+                                   sampling=plan).metrics_df.loc[BIOMD_15]
+    self.assertTrue(row[sp.APPROXIMATE])
+    self.assertTrue(12 <= row[sp.SAMPLE_SIZE] < exact_row['annotated_elements'])
+    # coverage is exact
+    for one_col in ['annotatable_elements', 'annotated_elements', 'coverage']:
+      self.assertEqual(row[one_col], exact_row[one_col])
+    self.assertTrue(row[sp.CONSISTENCY_LOW] <= row['consistency'] <= row[sp.CONSISTENCY_HIGH])
+    self.assertTrue(row[sp.SPECIFICITY_LOW] <= row['specificity'] <= row[sp.SPECIFICITY_HIGH])
+    # the same seed gives the same sample
+    same_row = sbmate.AnnotationMetrics(model_file=MODEL_FILES[1],
+                                        sampling=plan).metrics_df.loc[BIOMD_15]
+    self.assertTrue(row.equals(same_row))
+
+  def testStoredRows(self):
+    manifest = os.path.join(self.tmp_dir, 'manifest.json')
+    plan = sp.SamplingPlan(sample_size=12)
+    sbmate.AnnotationMetrics.getMetrics(MODEL_FILES, output="table", manifest=manifest)
+    # exact rows are not used by a sampled run, and the other way around
+    df = sbmate.AnnotationMetrics.getMetrics(MODEL_FILES, output="table",
+                                             manifest=manifest, sampling=plan)
+    self.assertEqual(list(df.columns), METRICS + sp.COLUMNS)
+    df = sbmate.AnnotationMetrics.getMetrics(MODEL_FILES, output="table", manifest=manifest)
+    self.assertEqual(list(df.columns), METRICS)
+    with self.assertRaises(ValueError):
+      sbmate.AnnotationMetrics.getMetrics(MODEL_FILES, output="table",
+                                          pipeline=pl.ScoringPipeline(), sampling=plan)
+
+  def testMain(self):
+    output_file = os.path.join(self.tmp_dir, 'metrics.csv')
+    self.assertEqual(cli.main(MODEL_FILES + ['-f', 'csv', '-o', output_file,
+                                             '--sample-size', '12', '--no-rate-limit']), 0)
+    with open(output_file) as f:
+      self.assertTrue(sp.APPROXIMATE in f.readline())
+    with self.assertRaises(SystemExit):
+      cli.main(MODEL_FILES + ['--sample-size', '12', '--error-bound', '0.1'])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -4,11 +4,17 @@ import copy
 import libsbml
 import numpy as np
 import os
+import shutil
 import sys
+import tempfile
 import unittest
+from SBMate import aggregation as agg
+from SBMate import analysis_memo as am
+from SBMate import budget as bd
 from SBMate import constants as cn
 from SBMate.metric_calculator import MetricCalculator
 from SBMate import sbmate
+from SBMate import uniprot_kegg_analyzer as uka
 
 
 BIOMD_12 = 'BIOMD0000000012.xml'
@@ -115,6 +121,140 @@ class TestAnnotatinoMetrics(unittest.TestCase):
     with self.assertRaisesRegex(ValueError, "Should be a valid file name."): 
       self.annotation_metrics.getMetrics([123, 'abc'], output="table")  
 
+  def testGetMetricsIncremental(self):
+    if IGNORE_TEST:
+      return
+    tmp_dir = tempfile.mkdtemp()
+    manifest_file = os.path.join(tmp_dir, 'manifest.json')
+    res_df = sbmate.AnnotationMetrics.getMetrics([MODEL_FILE, MODEL_FILE2],
+                                                 output="table",
+                                                 manifest=manifest_file)
+    self.assertTrue(os.path.isfile(manifest_file))
+    stored_df = sbmate.AnnotationMetrics.getMetrics([MODEL_FILE, MODEL_FILE2],
+                                                    output="table",
+                                                    manifest=manifest_file)
+    self.assertEqual(list(stored_df.columns), METRIC_NAMES)
+    self.assertEqual(list(stored_df.loc[BIOMD_12,:]), list(res_df.loc[BIOMD_12,:]))
+    self.assertEqual(list(stored_df.loc[BIOMD_13,:]), list(res_df.loc[BIOMD_13,:]))
+    shutil.rmtree(tmp_dir)
+
+  def testGetMetricsDeadline(self):
+    if IGNORE_TEST:
+      return
+    tmp_dir = tempfile.mkdtemp()
+    manifest_file = os.path.join(tmp_dir, 'manifest.json')
+    old_cache = uka.VALIDATION_CACHE
+    uka.VALIDATION_CACHE = uka.ValidationCache()
+    try:
+      # no time for remote lookups
+      res_df = sbmate.AnnotationMetrics.getMetrics(MODEL_FILE, output="table",
+                                                   manifest=manifest_file,
+                                                   deadline=0.0)
+      self.assertEqual(list(res_df.columns), METRIC_NAMES + [bd.PROVISIONAL, bd.UNRESOLVED_TERMS])
+      self.assertTrue(res_df.loc[BIOMD_12, bd.PROVISIONAL])
+      self.assertTrue(res_df.loc[BIOMD_12, bd.UNRESOLVED_TERMS] > 0)
+      # provisional rows are scored again, without budget
+      resolved_df = sbmate.AnnotationMetrics.resolveProvisional(manifest_file)
+      self.assertEqual(list(resolved_df.columns), METRIC_NAMES)
+      full_df = sbmate.AnnotationMetrics.getMetrics(MODEL_FILE, output="table")
+      self.assertEqual(list(resolved_df.loc[BIOMD_12,:]), list(full_df.loc[BIOMD_12,:]))
+      self.assertEqual(len(sbmate.AnnotationMetrics.resolveProvisional(manifest_file)), 0)
+    finally:
+      uka.VALIDATION_CACHE = old_cache
+      shutil.rmtree(tmp_dir)
+
+  def testGetMetricsRequestError(self):
+    if IGNORE_TEST:
+      return
+    import requests
+    def failingGet(url, timeout=None):
+      raise requests.exceptions.ConnectionError(url)
+    old_cache = uka.VALIDATION_CACHE
+    uka.VALIDATION_CACHE = uka.ValidationCache()
+    orig_get = requests.get
+    requests.get = failingGet
+    try:
+      # failed lookups make the row provisional, even without budget
+      res_df = sbmate.AnnotationMetrics.getMetrics(MODEL_FILE, output="table")
+      self.assertEqual(list(res_df.columns), METRIC_NAMES + [bd.PROVISIONAL, bd.UNRESOLVED_TERMS])
+      self.assertTrue(res_df.loc[BIOMD_12, bd.PROVISIONAL])
+      self.assertTrue(res_df.loc[BIOMD_12, bd.UNRESOLVED_TERMS] > 0)
+    finally:
+      requests.get = orig_get
+      uka.VALIDATION_CACHE = old_cache
+
+  def testGetMetricsResume(self):
+    if IGNORE_TEST:
+      return
+    tmp_dir = tempfile.mkdtemp()
+    checkpoint_file = os.path.join(tmp_dir, 'checkpoint.json')
+    res_df = sbmate.AnnotationMetrics.getMetrics(MODEL_FILE,
+                                                 output="table",
+                                                 checkpoint=checkpoint_file)
+    self.assertTrue(os.path.isfile(checkpoint_file))
+    resumed_df = sbmate.AnnotationMetrics.getMetrics([MODEL_FILE, MODEL_FILE2],
+                                                     output="table",
+                                                     checkpoint=checkpoint_file,
+                                                     resume=True)
+    self.assertEqual(resumed_df.shape, (2,6))
+    self.assertEqual(list(resumed_df.loc[BIOMD_12,:]), list(res_df.loc[BIOMD_12,:]))
+    shutil.rmtree(tmp_dir)
+
+  def testGetMetricsMemo(self):
+    if IGNORE_TEST:
+      return
+    memo = am.AnalysisMemo()
+    res_df = sbmate.AnnotationMetrics.getMetrics([MODEL_FILE, MODEL_FILE2, MODEL_FILE],
+                                                 output="table", memo=memo)
+    self.assertEqual(list(res_df.loc[BIOMD_12,:].iloc[0]),
+                     list(self.annotation_metrics.metrics_df.loc[BIOMD_12,:]))
+    self.assertTrue(memo.getStats()['hits'] > 0)
+
+  def testSummaryOnly(self):
+    if IGNORE_TEST:
+      return
+    summary = sbmate.AnnotationMetrics(MODEL_FILE, keep_annotations=False,
+                                       keep_entities=True)
+    self.assertEqual(summary.annotations, None)
+    self.assertEqual(summary.metrics_row, self.annotation_metrics.metrics_row)
+    self.assertEqual(self.annotation_metrics.entity_table, None)
+    table = summary.entity_table
+    self.assertEqual(table.model_names, [BIOMD_12])
+    self.assertEqual([len(table.entities), sum(table.annotated), sum(table.consistent)],
+                     summary.metrics_row['data'][0][:2] + summary.metrics_row['data'][0][3:4])
+    self.assertEqual(list(agg.aggregate(table)[0].values()),
+                     self.annotation_metrics.metrics_row['data'][0])
+    # getMetrics keeps only the metrics rows
+    metrics_list = sbmate.AnnotationMetrics._getMetricsList([MODEL_FILE, MODEL_FILE2])
+    self.assertEqual([m.annotations for m in metrics_list], [None, None])
+
+  def testAggregateMetrics(self):
+    if IGNORE_TEST:
+      return
+    deferred = [sbmate.AnnotationMetrics(one_file, keep_annotations=False,
+                                         defer_aggregation=True) \
+                for one_file in [MODEL_FILE, MODEL_FILE2]]
+    self.assertEqual(deferred[0].metrics_row['data'][0], [None] * len(METRIC_NAMES))
+    self.assertEqual(deferred[0].entity_table.model_names, [BIOMD_12])
+    # one pass over both models, same metrics as each model alone
+    sbmate.AnnotationMetrics.aggregateMetrics(deferred)
+    self.assertEqual(deferred[0].metrics_row, self.annotation_metrics.metrics_row)
+    self.assertEqual(deferred[1].metrics_row, sbmate.AnnotationMetrics(MODEL_FILE2).metrics_row)
+    self.assertEqual(deferred[0].entity_table, None)
+
+  def testMkMetricsTable(self):
+    if IGNORE_TEST:
+      return
+    row_12 = {'index': [BIOMD_12], 'columns': ['n', 'score'], 'data': [[20, 0.7]]}
+    row_13 = {'index': [BIOMD_13], 'columns': ['n', 'score'], 'data': [[None, None]]}
+    df = sbmate.mkMetricsTable([row_12, row_13])
+    self.assertEqual(list(df.index), [BIOMD_12, BIOMD_13])
+    self.assertEqual(df['n'][BIOMD_13], None)
+    self.assertTrue(np.isnan(df['score'][BIOMD_13]))
+    one_df = sbmate.mkMetricsTable([row_13])
+    self.assertEqual(one_df['score'][BIOMD_13], None)
+    self.assertEqual(self.annotation_metrics._getMetricsRow()['columns'], METRIC_NAMES)
+
   def checkReport(self, report=None):
     if report is None:
       report = self.annotation_metrics._getMetricsReport()
@@ -0,0 +1,89 @@
+# test_server.py
+
+import os
+import threading
+import unittest
+from pandas import testing as pdt
+from SBMate import constants as cn
+from SBMate import sbmate
+from SBMate import server as sv
+from SBMate import uniprot_kegg_analyzer as uka
+
+
+BIOMD_12 = 'BIOMD0000000012.xml'
+BIOMD_13 = 'BIOMD0000000013.xml'
+MODEL_FILE = os.path.join(cn.TEST_DIR, BIOMD_12)
+MODEL_FILE2 = os.path.join(cn.TEST_DIR, BIOMD_13)
+
+
+class TestSharedValidator(unittest.TestCase):
+
+  def setUp(self):
+    self.old_cache = uka.VALIDATION_CACHE
+    uka.VALIDATION_CACHE = uka.ValidationCache()
+    self.validator = sv.SharedValidator(workers=2)
+
+  def tearDown(self):
+    self.validator.shutdown()
+    uka.VALIDATION_CACHE = self.old_cache
+
+  def testValidate(self):
+    pairs = [('uniprot', 'P03023'), ('kegg_species', 'C00011')]
+    self.validator.validate(pairs)
+    self.assertEqual(self.validator.num_lookups, 2)
+    self.assertTrue(all([uka.VALIDATION_CACHE.get(*p) is not None for p in pairs]))
+    # cached terms are not queried again
+    self.validator.validate(pairs)
+    self.assertEqual(self.validator.num_lookups, 2)
+
+
+class TestScoringServer(unittest.TestCase):
+
+  @classmethod
+  def setUpClass(cls):
+    cls.service = sv.ScoringService(validation_workers=2)
+    cls.server = sv.ScoringServer(cls.service, port=0)
+    cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+    cls.thread.start()
+
+  @classmethod
+  def tearDownClass(cls):
+    cls.server.shutdown()
+    cls.server.server_close()
+    cls.service.shutdown()
+
+  def testGetMetrics(self):
+    res = sv.requestMetrics(self.server.url, files=[MODEL_FILE, MODEL_FILE2])
+    self.assertEqual(res, sbmate.AnnotationMetrics.getMetrics([MODEL_FILE, MODEL_FILE2]))
+    res_df = sv.requestMetrics(self.server.url, files=[MODEL_FILE, MODEL_FILE2], output="table")
+    expected_df = sbmate.AnnotationMetrics.getMetrics([MODEL_FILE, MODEL_FILE2], output="table")
+    pdt.assert_frame_equal(res_df, expected_df)
+
+  def testGetMetricsDocument(self):
+    with open(MODEL_FILE) as f:
+      document = f.read()
+    res_df = sv.requestMetrics(self.server.url, models=[(BIOMD_12, document)], output="table")
+    expected_df = sbmate.AnnotationMetrics.getMetrics(MODEL_FILE, output="table")
+    pdt.assert_frame_equal(res_df, expected_df)
+    with self.assertRaises(ValueError):
+      sv.requestMetrics(self.server.url, models=[('../' + BIOMD_12, document)])
+
+  def testBadRequest(self):
+    with self.assertRaises(ValueError):
+      sv.requestMetrics(self.server.url, files=[os.path.join(cn.TEST_DIR, 'not_a_model.xml')])
+    with self.assertRaises(ValueError):
+      sv.requestMetrics(self.server.url, files=[MODEL_FILE], output="not_an_output")
+    with self.assertRaises(ValueError):
+      sv.requestMetrics(self.server.url)
+
+  def testGetStatus(self):
+    num_requests = self.service.getStatus()['requests']
+    sv.requestMetrics(self.server.url, files=[MODEL_FILE])
+    status = self.service.getStatus()
+    self.assertEqual(status['requests'], num_requests + 1)
+    self.assertTrue(status['models'] >= 1)
+    self.assertTrue(status['memo']['hits'] >= 0)
+
+
+if __name__ == '__main__':
+  unittest.main()
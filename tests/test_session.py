@@ -0,0 +1,76 @@
+# test_session.py
+
+import os
+import unittest
+from SBMate import constants as cn
+from SBMate import sbml_annotation as sa
+from SBMate import sbmate
+from SBMate import session as ss
+from SBMate.metric_calculator import MetricCalculator
+
+
+BIOMD_12 = 'BIOMD0000000012.xml'
+BIOMD_970 = 'BIOMD0000000970.xml'
+
+
+class TestScoringSession(unittest.TestCase):
+
+  def setUp(self):
+    self.session = ss.ScoringSession(model_file=os.path.join(cn.TEST_DIR, BIOMD_12))
+
+  def getExpected(self):
+    # metrics of the edited annotations, scored from scratch
+    return MetricCalculator(annotations=self.session.annotations,
+                            model_name=BIOMD_12).calculateRecord()
+
+  def testInit(self):
+    self.assertEqual(self.session.model_name, BIOMD_12)
+    self.assertEqual(self.session.getRecord(), self.getExpected())
+    row = sbmate.AnnotationMetrics(model_file=os.path.join(cn.TEST_DIR, BIOMD_12))._getMetricsRow()
+    self.assertEqual(self.session.getMetricsRow(), row)
+
+  def testAddAnnotation(self):
+    record = self.session.addAnnotation('PX', 'chebi', 'CHEBI:36080', qualifier='isVersionOf')
+    self.assertEqual(self.session.annotations.annotations['PX']['chebi'], ['CHEBI:36080'])
+    self.assertEqual(record, self.getExpected())
+    # adding again has no effect
+    self.assertEqual(self.session.addAnnotation('PX', 'chebi', 'CHEBI:36080',
+                                                qualifier='isVersionOf'), record)
+    with self.assertRaises(ValueError):
+      self.session.addAnnotation('PX', 'not_a_resource', 'A1')
+    with self.assertRaises(ValueError):
+      self.session.addAnnotation('not_an_entity', 'chebi', 'CHEBI:36080')
+
+  def testRemoveAnnotation(self):
+    self.session.removeAnnotation('cell', 'obo.go', 'GO:0005623')
+    record = self.session.removeAnnotation('cell', 'sbo', 'SBO:0000290')
+    self.assertEqual(self.session.entity_scores['cell'], (False, False, None))
+    self.assertEqual(record, self.getExpected())
+    self.assertFalse('is' in self.session.annotations.annotation_by_qualifier['cell'])
+    with self.assertRaises(ValueError):
+      self.session.removeAnnotation('cell', 'sbo', 'SBO:0000290')
+
+  def testReplaceAnnotation(self):
+    record = self.session.replaceAnnotation('Reaction1', 'obo.go', 'GO:0006402',
+                                            'GO:0005623')
+    qualifier_dict = self.session.annotations.annotation_by_qualifier['Reaction1']
+    self.assertEqual(qualifier_dict['isVersionOf'], [('obo.go', 'GO:0005623')])
+    self.assertEqual(record, self.getExpected())
+    # and back to the original metrics
+    record = self.session.replaceAnnotation('Reaction1', 'obo.go', 'GO:0005623',
+                                            'GO:0006402')
+    self.assertEqual(record, ss.ScoringSession(
+        model_file=os.path.join(cn.TEST_DIR, BIOMD_12)).getRecord())
+
+  def testManyEdits(self):
+    annotations = sa.SBMLAnnotation(file=os.path.join(cn.TEST_DIR, BIOMD_970))
+    session = ss.ScoringSession(annotations=annotations, model_name=BIOMD_970)
+    for one_entity in list(annotations.annotations.keys())[:10]:
+      session.addAnnotation(one_entity, 'sbo', 'SBO:0000252')
+      session.addAnnotation(one_entity, 'kegg.compound', 'C00046', qualifier='isVersionOf')
+    expected = MetricCalculator(annotations=annotations, model_name=BIOMD_970).calculateRecord()
+    self.assertEqual(session.getRecord(), expected)
+
+
+if __name__ == '__main__':
+  unittest.main()
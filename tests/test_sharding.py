@@ -0,0 +1,81 @@
+# test_sharding.py
+
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from SBMate import constants as cn
+from SBMate import sbmate
+from SBMate import sharding as sh
+
+
+MODEL_FILES = sorted(glob.glob(os.path.join(cn.TEST_DIR, '*.xml')))
+NUM_SHARDS = 3
+
+
+def mkRow(one_file):
+  return {'index': [os.path.basename(one_file)],
+          'columns': ['annotatable_elements'],
+          'data': [[len(one_file)]]}
+
+
+class TestSharding(unittest.TestCase):
+
+  def setUp(self):
+    self.tmp_dir = tempfile.mkdtemp()
+    self.shard_files = []
+    for idx in range(NUM_SHARDS):
+      shard_list = sh.selectShard(MODEL_FILES, idx, NUM_SHARDS)
+      shard_file = os.path.join(self.tmp_dir, 'shard%d.json' % idx)
+      sh.writeShard(shard_file,
+                    rows=[mkRow(one_file) for one_file in shard_list],
+                    file_list=shard_list,
+                    corpus_list=MODEL_FILES,
+                    shard_index=idx,
+                    num_shards=NUM_SHARDS)
+      self.shard_files.append(shard_file)
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def testSelectShard(self):
+    shards = [sh.selectShard(MODEL_FILES, idx, NUM_SHARDS) for idx in range(NUM_SHARDS)]
+    self.assertEqual(sorted(sum(shards, [])), MODEL_FILES)
+    self.assertEqual(sh.getShardIndex(MODEL_FILES[0], NUM_SHARDS),
+                     sh.getShardIndex(MODEL_FILES[0], NUM_SHARDS))
+    with self.assertRaises(ValueError):
+      sh.selectShard(MODEL_FILES, NUM_SHARDS, NUM_SHARDS)
+
+  def testMergeShards(self):
+    rows = sh.mergeShards(list(reversed(self.shard_files)))
+    self.assertEqual(rows, [mkRow(one_file) for one_file in MODEL_FILES])
+    with self.assertRaisesRegex(ValueError, "Missing shards"):
+      sh.mergeShards(self.shard_files[1:])
+    with self.assertRaisesRegex(ValueError, "Duplicate shards"):
+      sh.mergeShards(self.shard_files + self.shard_files[:1])
+    other_file = os.path.join(self.tmp_dir, 'other.json')
+    sh.writeShard(other_file, rows=[], file_list=[], corpus_list=MODEL_FILES[:1],
+                  shard_index=0, num_shards=NUM_SHARDS)
+    with self.assertRaisesRegex(ValueError, "different corpora"):
+      sh.mergeShards(self.shard_files + [other_file])
+
+  def testShardProcesses(self):
+    # each shard is scored by a separate process
+    shard_files = [os.path.join(self.tmp_dir, 'process%d.json' % idx) \
+                   for idx in range(NUM_SHARDS)]
+    processes = [subprocess.Popen([sys.executable, '-m', 'SBMate.cli'] + MODEL_FILES + \
+                                  ['--offline', '--shard', '%d/%d' % (idx, NUM_SHARDS),
+                                   '--shard-output', shard_files[idx], '-f', 'csv'],
+                                  cwd=cn.PROJECT_DIR,
+                                  stdout=subprocess.DEVNULL) \
+                 for idx in range(NUM_SHARDS)]
+    self.assertEqual([p.wait() for p in processes], [0]*NUM_SHARDS)
+    df = sbmate.AnnotationMetrics.mergeShards(shard_files, output="table")
+    self.assertEqual(list(df.index), [os.path.basename(f) for f in MODEL_FILES])
+
+
+if __name__ == '__main__':
+  unittest.main()
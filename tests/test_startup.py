@@ -0,0 +1,70 @@
+# test_startup.py
+
+import json
+import os
+import subprocess
+import sys
+import unittest
+from SBMate import constants as cn
+
+
+# seconds; importing SBMate.sbmate took about 0.02 s,
+# and about 0.4 s when heavy modules were imported
+IMPORT_BUDGET = 0.15
+HEAVY_MODULES = ['libsbml', 'networkx', 'numpy', 'pandas', 'pickle5', 'requests']
+IMPORT_CODE = """
+import json, sys, time
+start = time.perf_counter()
+import SBMate.sbmate, SBMate.cli
+elapsed = time.perf_counter() - start
+print(json.dumps({'time': elapsed,
+                  'modules': [m for m in %r if m in sys.modules]}))
+""" % HEAVY_MODULES
+
+
+def importInSubprocess():
+  """
+  Import SBMate.sbmate and SBMate.cli in a new interpreter.
+
+  Returns
+  -------
+  '': dict
+      {'time': seconds, 'modules': heavy modules imported}
+  """
+  env = dict(os.environ)
+  env['PYTHONPATH'] = os.pathsep.join([cn.PROJECT_DIR] + \
+                                      [p for p in [env.get('PYTHONPATH')] if p])
+  res = subprocess.run([sys.executable, '-c', IMPORT_CODE],
+                       capture_output=True, text=True, env=env, check=True)
+  return json.loads(res.stdout)
+
+
+class TestStartup(unittest.TestCase):
+
+  def testHeavyModules(self):
+    self.assertEqual(importInSubprocess()['modules'], [])
+
+  def testImportTime(self):
+    # best of three runs, against noise of the machine
+    elapsed = min([importInSubprocess()['time'] for _ in range(3)])
+    self.assertLess(elapsed, IMPORT_BUDGET)
+
+
+class TestLazyResources(unittest.TestCase):
+
+  def testGraphs(self):
+    from SBMate import dag_analyzer as da
+    self.assertIs(da.getGraph('go'), da.GO_G)
+    self.assertIs(da.ONT_TO_G['sbo'], da.getGraph('sbo'))
+    with self.assertRaises(AttributeError):
+      da.NOT_A_GRAPH
+
+  def testConstants(self):
+    import libsbml
+    self.assertIs(cn.REACTION, libsbml.Reaction)
+    self.assertEqual(cn.OBJECT_ONT_MAP_FILT[cn.SPECIES], cn.SPECIES_ROOTS)
+    self.assertEqual(len(cn.BIOMODEL_OBJECTS), 4)
+
+
+if __name__ == '__main__':
+  unittest.main()
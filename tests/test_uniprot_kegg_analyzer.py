@@ -3,9 +3,16 @@
 import libsbml
 import numpy as np
 import os
+import shutil
+import socket
+import tempfile
 import unittest
 import sys
+import time
+from SBMate import budget as bd
 from SBMate import constants as cn
+from SBMate import identifier_syntax as ids
+from SBMate import instrumentation as ins
 from SBMate import sbml_annotation as sa
 from SBMate import uniprot_kegg_analyzer as uka
 
@@ -52,5 +59,103 @@ class TestNonDAGAnalyzer(unittest.TestCase):
   	self.assertEqual(self.px_analyzer.getSpecificity('P03023'), 1.0)
 
 
+class TestValidationCache(unittest.TestCase):
+
+  def setUp(self):
+    self.cache = uka.ValidationCache()
+    self.tmp_dir = tempfile.mkdtemp()
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp_dir)
+
+  def testGetSet(self):
+    self.assertEqual(self.cache.get('uniprot', 'P03023'), None)
+    self.cache.set('uniprot', 'P03023', True)
+    self.cache.set('kegg_species', 'C99999', False)
+    self.assertTrue(self.cache.get('uniprot', 'P03023'))
+    self.assertFalse(self.cache.get('kegg_species', 'C99999'))
+    self.assertEqual(self.cache.get('kegg_species', 'P03023'), None)
+
+  def testRecording(self):
+    self.cache.set('uniprot', 'P03023', True)
+    self.assertEqual(self.cache.stopRecording(), dict())
+    self.cache.startRecording()
+    self.cache.set('uniprot', 'P03023', False)
+    self.cache.set('kegg_species', 'C99999', False)
+    # overwritten results are recorded too
+    self.assertEqual(self.cache.stopRecording(), {'uniprot:P03023': False,
+                                                  'kegg_species:C99999': False})
+    self.cache.set('uniprot', 'P12345', True)
+    self.assertEqual(self.cache.stopRecording(), dict())
+
+  def testSaveLoad(self):
+    cache_file = os.path.join(self.tmp_dir, 'cache.json')
+    self.cache.set('uniprot', 'P03023', True)
+    self.cache.save(cache_file)
+    loaded = uka.ValidationCache()
+    loaded.load(cache_file)
+    self.assertEqual(loaded.results, self.cache.results)
+
+  def testValidateTermMalformed(self):
+    # rejected locally, even offline, and not cached
+    self.assertFalse(uka.validateTerm('uniprot', 'P03023"', offline=True))
+    self.assertFalse(uka.validateTerm('kegg_species', 'CHEBI:17234', offline=True))
+    self.assertTrue(uka.validateTerm('kegg_species', 'C00002', offline=True))
+    self.assertEqual(uka.VALIDATION_CACHE.get('uniprot', 'P03023"'), None)
+    # rejections are counted per reason code
+    ins.COLLECTOR = ins.Collector()
+    try:
+      uka.validateTerm('uniprot', 'P03023"')
+      uka.validateTerm('uniprot', 'P0302')
+      counters = ins.COLLECTOR.getSnapshot()['counters']
+    finally:
+      ins.COLLECTOR = None
+    self.assertEqual(counters[ins.IDENTIFIERS_REJECTED], 2)
+    self.assertEqual(counters['rejected.' + ids.REASON_STRAY_QUOTE], 1)
+    self.assertEqual(counters['rejected.' + ids.REASON_BAD_FORMAT], 1)
+
+  def testValidateTermTimeout(self):
+    # a server that accepts connections and never responds
+    server = socket.socket()
+    server.bind(('127.0.0.1', 0))
+    server.listen(8)
+    orig_url = uka.ONT_TO_URL['uniprot']
+    orig_timeout = uka.REQUEST_TIMEOUT
+    uka.ONT_TO_URL['uniprot'] = 'http://127.0.0.1:%d/' % server.getsockname()[1]
+    uka.REQUEST_TIMEOUT = 0.2
+    try:
+      start = time.perf_counter()
+      self.assertEqual(uka.validateTerm('uniprot', 'P12345'), None)
+      # unresolved within budget
+      self.assertEqual(uka.validateTerm('uniprot', 'P12345',
+                                        budget=bd.TimeBudget(seconds=60.0)), None)
+      self.assertTrue(time.perf_counter() - start < 5.0)
+      self.assertEqual(uka.VALIDATION_CACHE.get('uniprot', 'P12345'), None)
+    finally:
+      uka.ONT_TO_URL['uniprot'] = orig_url
+      uka.REQUEST_TIMEOUT = orig_timeout
+      server.close()
+
+  def testValidateTermRequestError(self):
+    import requests
+    def failingGet(url, timeout=None):
+      raise requests.exceptions.ConnectionError(url)
+    orig_get = requests.get
+    requests.get = failingGet
+    try:
+      self.assertEqual(uka.validateTerm('uniprot', 'P99999'), None)
+      self.assertEqual(uka.validateTerm('uniprot', 'P99999',
+                                        budget=bd.TimeBudget(seconds=60.0)), None)
+      self.assertEqual(uka.VALIDATION_CACHE.get('uniprot', 'P99999'), None)
+      # the term is unresolved, and assumed valid
+      analyzer = uka.NonDAGAnalyzer(term_id=['P99999'], ontology='uniprot',
+                                    object_type=libsbml.Species,
+                                    qualifier_dict={'P99999': 'is'})
+      self.assertTrue(analyzer.consistent)
+      self.assertEqual(analyzer.unresolved, ['P99999'])
+    finally:
+      requests.get = orig_get
+
+
 if __name__ == '__main__':
   unittest.main()
\ No newline at end of file